@@ -1,10 +1,16 @@
 import os
+import time
+import dataclasses
 import random
+import asyncio
 import sqlite3
 import logging
 import discord
+from collections import deque
 
-from redbot.core import commands
+from discord import app_commands
+from discord.ext import tasks
+from redbot.core import Config, commands
 
 from .commands.NodeEditCommands import (
     edit_node,
@@ -13,9 +19,66 @@ from .commands.NodeEditCommands import (
     register_node,
     edit_additional_node_info,
     clear_additional_node_info,
+    handle_questionnaire_interaction,
+    resume_questionnaire,
+    retire_questionnaire_message,
 )
-from .commands.InfoCommands import list_my_nodes, total_nodes, full_node_info, node_info
-from .commands.DatabaseCommands import drop_database, create_database, delete_node
+from .commands.InfoCommands import (
+    list_my_nodes,
+    total_nodes,
+    full_node_info,
+    node_info,
+    node_stats,
+    resolve_nodes,
+    resolve_traceroute_message,
+)
+from .commands.DatabaseCommands import (
+    drop_database,
+    create_database,
+    delete_node,
+    undelete_node,
+    reassign_nodes,
+    node_changes,
+    outbound_stats,
+    list_jobs,
+    stall_report,
+    db_explain,
+    db_health,
+    backup_database,
+    restore_database,
+)
+from .commands.SheetCommands import sheet_settings, sheet_sync_now
+from .commands.GuildCommands import guild_settings
+from .commands.DuplicateCommands import duplicate_report, shortname_report
+from .commands.MapCommands import node_map
+from .shared.AdditionalNodeInfo import ChoiceQuestion, additional_info_questions
+from .shared.OutboundScheduler import OutboundScheduler
+from .shared.NodeIndex import NodeIndex
+from .shared.NodeJournal import compact_journal
+from .shared.SheetSync import FileSheetBackend, GoogleSheetsBackend, sync_nodes_to_sheet
+from .shared.Backups import BACKUP_DIR_NAME, create_snapshot, rotate_snapshots
+from .shared.Migrations import migrate
+from .shared.JobManager import JobManager
+from .shared.NodeArchive import PRUNE_BATCH_SIZE, PRUNE_PAUSE, prune_stale_nodes
+from .shared.OwnerNames import OwnerNameCache
+from .shared.StallWatchdog import StallWatchdog
+from .shared.Queries import execute
+from .shared.Maintenance import (
+    MAINTENANCE_HISTORY,
+    QUIET_AFTER,
+    VACUUM_MAX_STEPS,
+    VACUUM_STEP_PAUSE,
+    TASK_FUNCTIONS,
+    MaintenanceRun,
+    auto_vacuum_mode,
+    due_tasks,
+    enable_incremental_vacuum,
+    incremental_vacuum_step,
+    last_runs,
+    set_last_run,
+    timed,
+)
+from .shared.QuestionnaireSessions import CUSTOM_ID_PREFIX, SessionIndex, expire_sessions
 
 
 # Set up logging
@@ -26,13 +89,33 @@ logger = logging.getLogger(__name__)
 class MeshNodes(commands.Cog):
     """Mesh Node Management Cog"""
 
-    def get_db_path(self):
-        """Returns the path to the SQLite database file."""
-        return os.path.join(self.base_dir, "meshnodes.db")
-
-    def connect_db(self):
-        """Connects to the SQLite database."""
-        return sqlite3.connect(self.get_db_path())
+    def partition_for(self, guild=None):
+        """
+        Returns the partition key for a guild: its ID if it has its own node directory, otherwise None.
+        The shared directory (None) is used by every other guild and by commands run in DMs.
+        """
+        if guild is not None and self.guild_settings.get(guild.id, {}).get("separate_directory"):
+            return guild.id
+        return None
+
+    def all_partitions(self):
+        """One guild-like object per node directory, for background tasks; None is the shared directory."""
+        separate = [guild_id for guild_id, settings in self.guild_settings.items() if settings.get("separate_directory")]
+        return [None] + [discord.Object(id=guild_id) for guild_id in separate]
+
+    def get_partition_dir(self, guild=None):
+        partition = self.partition_for(guild)
+        if partition is None:
+            return self.base_dir
+        return os.path.join(self.base_dir, "guilds", str(partition))
+
+    def get_db_path(self, guild=None):
+        """Returns the path to the SQLite database file holding `guild`'s node directory."""
+        return os.path.join(self.get_partition_dir(guild), "meshnodes.db")
+
+    def connect_db(self, guild=None):
+        """Connects to the SQLite database holding `guild`'s node directory."""
+        return sqlite3.connect(self.get_db_path(guild))
 
     def __init__(self, bot):
         self.bot = bot
@@ -42,6 +125,412 @@ class MeshNodes(commands.Cog):
         # This can be changed in the future, just want to be extra careful with who can access the database
         self.database_admin_ids = {196412468262600707, 173669080388075528}
 
+        # All loading messages, DMs and their edits go through here so bursts stay inside Discord's rate limits
+        self.outbound = OutboundScheduler()
+
+        # Worker processes for CPU-heavy commands, so they never add latency to lookups
+        self.jobs = JobManager()
+
+        # Sorted in-memory index of node IDs, names and owners per partition for autocomplete; kept in sync by every write
+        self.node_indexes = {}
+
+        # Open additional info questionnaires per partition; their answers live in SQLite, see QuestionnaireSessions
+        self.questionnaire_sessions = {}
+
+        # Owner display names for listings and reports, so they never need a fetch_user per node
+        self.owner_names = OwnerNameCache()
+
+        self.config = Config.get_conf(self, identifier=5403784611, force_registration=True)
+        self.config.register_global(
+            sheet_backend="none",
+            sheet_id="",
+            sheet_name="Nodes",
+            credentials_path="credentials.json",
+            prune_after_days=0,  # archive shared-directory nodes untouched for this long; 0 disables pruning
+            stall_threshold_ms=0,  # report event loop stalls longer than this; 0 disables the watchdog
+        )
+        self.config.register_guild(
+            separate_directory=False,
+            admin_ids=[],
+            question_choices={},
+            prune_after_days=0,  # the same, for a separate directory
+        )
+        # Mirror of the per-guild settings, so partition and permission lookups stay synchronous
+        self.guild_settings = {}
+
+        # Sheet sync backs off exponentially after failures instead of retrying every interval
+        self.sheet_sync_failures = 0
+        self.sheet_sync_retry_at = 0.0
+
+        # Only one backup, restore or maintenance task touches the database file at a time
+        self.backup_lock = asyncio.Lock()
+
+        # Database upkeep runs when nobody has used the bot for a while; see Maintenance and !dbhealth
+        self.last_activity = time.monotonic()
+        self.maintenance_runs = deque(maxlen=MAINTENANCE_HISTORY)
+
+        # Opt-in event loop stall detector, see !stalls
+        self.stall_watchdog = None
+
+    async def cog_load(self):
+        self.jobs.start()
+        self.guild_settings = await self.config.all_guilds()
+        for guild in self.all_partitions():
+            try:
+                version = await self.migrate_database(guild)
+                logger.info(f"Database schema for partition {self.partition_for(guild)} is at version {version}.")
+                self.refresh_node_index(guild)
+                self.refresh_questionnaire_sessions(guild)
+            except Exception as e:
+                logger.error(f"Failed to migrate the database or load the node index: {e}", exc_info=True)
+        self.compact_journal_task.start()
+        self.sheet_sync_task.start()
+        self.backup_task.start()
+        self.prune_task.start()
+        self.questionnaire_sweep_task.start()
+        self.maintenance_task.start()
+        stall_threshold_ms = await self.config.stall_threshold_ms()
+        if stall_threshold_ms:
+            self.start_stall_watchdog(stall_threshold_ms)
+
+    async def migrate_database(self, guild=None) -> int:
+        """Apply any pending schema migrations, creating the database if needed. Returns the schema version."""
+        os.makedirs(self.get_partition_dir(guild), exist_ok=True)
+        return await migrate(lambda: self.connect_db(guild))
+
+    async def update_guild_settings(self, guild, **values):
+        """Persists per-guild settings and refreshes the in-memory mirror."""
+        for key, value in values.items():
+            await getattr(self.config.guild(guild), key).set(value)
+        self.guild_settings[guild.id] = await self.config.guild(guild).all()
+
+    def is_guild_admin(self, user_id, guild=None) -> bool:
+        """Bot-wide database admins, plus the admins a guild has configured for its own settings."""
+        if user_id in self.database_admin_ids:
+            return True
+        return guild is not None and user_id in self.guild_settings.get(guild.id, {}).get("admin_ids", [])
+
+    def is_database_admin(self, user_id, guild=None) -> bool:
+        """
+        Who may change `guild`'s node directory as a whole. A guild's own admins count only for a separate directory;
+        the shared directory belongs to every server using it, so only bot-wide database admins manage that.
+        """
+        if self.partition_for(guild) is None:
+            return user_id in self.database_admin_ids
+        return self.is_guild_admin(user_id, guild)
+
+    def get_questions(self, guild=None):
+        """The additional info questions for a guild, with its own choices for any choice questions it overrides."""
+        overrides = self.guild_settings.get(guild.id, {}).get("question_choices") if guild is not None else None
+        if not overrides:
+            return additional_info_questions
+        return [
+            dataclasses.replace(q, choices=overrides[q.json_name])
+            if isinstance(q, ChoiceQuestion) and q.json_name in overrides
+            else q
+            for q in additional_info_questions
+        ]
+
+    async def cog_unload(self):
+        self.compact_journal_task.cancel()
+        self.sheet_sync_task.cancel()
+        self.backup_task.cancel()
+        self.prune_task.cancel()
+        self.questionnaire_sweep_task.cancel()
+        self.maintenance_task.cancel()
+        self.stop_stall_watchdog()
+        await self.outbound.close()
+        await self.jobs.shutdown()
+
+    @tasks.loop(hours=24)
+    async def compact_journal_task(self):
+        """Checkpoints the change journal once a day so it doesn't grow unbounded."""
+        for guild in self.all_partitions():
+            if not os.path.exists(self.get_db_path(guild)):
+                continue
+            try:
+                with self.connect_db(guild) as conn:
+                    removed = compact_journal(conn.cursor())
+                    conn.commit()
+                logger.info(f"Compacted change journal of partition {self.partition_for(guild)}, removed {removed} entries.")
+            except Exception as e:
+                logger.error(f"Failed to compact change journal: {e}", exc_info=True)
+
+    def start_stall_watchdog(self, threshold_ms: int):
+        """(Re)starts the stall watchdog, attributing stalls to this cog's commands, listeners and tasks."""
+        entry_points = {command.callback.__code__: f"!{command.qualified_name}" for command in self.walk_commands()}
+        for name, method in self.get_listeners():
+            entry_points[method.__code__] = f"{name} listener"
+        tasks_to_watch = (
+            self.compact_journal_task,
+            self.sheet_sync_task,
+            self.backup_task,
+            self.prune_task,
+            self.questionnaire_sweep_task,
+            self.maintenance_task,
+        )
+        for task in tasks_to_watch:
+            entry_points[task.coro.__code__] = f"{task.coro.__name__}"
+        previous = self.stall_watchdog
+        self.stop_stall_watchdog()
+        self.stall_watchdog = StallWatchdog(entry_points, threshold_ms)
+        if previous is not None:
+            # Keep what was recorded when only the threshold changes
+            self.stall_watchdog.stalls.extend(previous.stalls)
+        self.stall_watchdog.start()
+
+    def stop_stall_watchdog(self):
+        if self.stall_watchdog is not None:
+            self.stall_watchdog.stop()
+            self.stall_watchdog = None
+
+    async def get_prune_after_days(self, guild=None) -> int:
+        """Stale-node age for a partition: the shared directory's is global, a separate directory's is its guild's."""
+        if self.partition_for(guild) is None:
+            return await self.config.prune_after_days()
+        return self.guild_settings.get(guild.id, {}).get("prune_after_days", 0)
+
+    @tasks.loop(hours=24)
+    async def prune_task(self):
+        """Archives nodes nobody has updated within the configured age, a small batch per transaction."""
+        for guild in self.all_partitions():
+            max_age_days = await self.get_prune_after_days(guild)
+            if not max_age_days or not os.path.exists(self.get_db_path(guild)):
+                continue
+
+            def prune_batch():
+                with self.connect_db(guild) as conn:
+                    return prune_stale_nodes(conn, max_age_days)
+
+            archived = 0
+            try:
+                while True:
+                    node_ids = await asyncio.to_thread(prune_batch)
+                    for node_id in node_ids:
+                        self.get_node_index(guild).remove(node_id)
+                    archived += len(node_ids)
+                    if len(node_ids) < PRUNE_BATCH_SIZE:
+                        break
+                    await asyncio.sleep(PRUNE_PAUSE)
+            except Exception as e:
+                logger.error(f"Failed to prune stale nodes: {e}", exc_info=True)
+            if archived:
+                partition = self.partition_for(guild)
+                logger.info(f"Archived {archived} nodes older than {max_age_days} days in partition {partition}.")
+
+    def is_quiet(self) -> bool:
+        """Nobody used the bot for QUIET_AFTER seconds and nothing is waiting in the worker pool or outbound queues."""
+        idle = time.monotonic() - self.last_activity >= QUIET_AFTER
+        return idle and not self.jobs.list_jobs() and not self.outbound.queue_depths()
+
+    def record_maintenance(self, run: MaintenanceRun):
+        self.maintenance_runs.append(run)
+        status = "finished" if run.ok else "FAILED"
+        logger.info(
+            f"Maintenance {run.task} on partition {run.partition} {status} in {run.duration:.2f}s: {run.detail}"
+            + (f", {run.pages_reclaimed} pages reclaimed" if run.pages_reclaimed else "")
+        )
+
+    def run_in_db(self, guild, func, *args):
+        """Calls func(conn, *args) on a new connection to a partition's database, for worker threads."""
+        with self.connect_db(guild) as conn:
+            return func(conn, *args)
+
+    async def vacuum_database(self, guild=None) -> MaintenanceRun:
+        """Hands free pages back to the filesystem a step at a time, so writers get a turn between steps."""
+        partition = self.partition_for(guild)
+        if await asyncio.to_thread(self.run_in_db, guild, auto_vacuum_mode) != "incremental":
+            # One full VACUUM first; after that, free pages can be released in steps
+            return await asyncio.to_thread(self.run_in_db, guild, timed, "vacuum", partition, enable_incremental_vacuum)
+
+        run = MaintenanceRun("vacuum", partition, time.time())
+        started = time.perf_counter()
+        try:
+            for _ in range(VACUUM_MAX_STEPS):
+                released, left = await asyncio.to_thread(self.run_in_db, guild, incremental_vacuum_step)
+                run.pages_reclaimed += released
+                if not left or not released:
+                    break
+                await asyncio.sleep(VACUUM_STEP_PAUSE)
+            run.detail = f"{left} free pages left"
+        except Exception as e:
+            run.ok, run.detail = False, f"{type(e).__name__}: {e}"
+        run.duration = time.perf_counter() - started
+        return run
+
+    async def run_maintenance(self, guild, task: str) -> MaintenanceRun:
+        """Runs one maintenance task on a partition's database off the event loop."""
+        partition = self.partition_for(guild)
+        async with self.backup_lock:
+            if task == "vacuum":
+                run = await self.vacuum_database(guild)
+            else:
+                run = await asyncio.to_thread(self.run_in_db, guild, timed, task, partition, TASK_FUNCTIONS[task])
+            await asyncio.to_thread(self.run_in_db, guild, set_last_run, task, time.time())
+        self.record_maintenance(run)
+        return run
+
+    @tasks.loop(minutes=5)
+    async def maintenance_task(self):
+        """Runs whichever maintenance tasks are due, preferring moments when nobody is using the bot."""
+        for guild in self.all_partitions():
+            if not os.path.exists(self.get_db_path(guild)):
+                continue
+            try:
+                with self.connect_db(guild) as conn:
+                    runs = last_runs(conn)
+                    # Switching to incremental auto-vacuum rewrites the whole file, so it never jumps the quiet check
+                    quiet_only = () if auto_vacuum_mode(conn) == "incremental" else ("vacuum",)
+                for task in due_tasks(runs, time.time(), self.is_quiet(), quiet_only):
+                    await self.run_maintenance(guild, task)
+            except Exception as e:
+                logger.error(f"Database maintenance failed: {e}", exc_info=True)
+
+    def get_backup_dir(self, guild=None):
+        return os.path.join(self.get_partition_dir(guild), BACKUP_DIR_NAME)
+
+    async def create_backup(self, label, locked=False, guild=None):
+        """Takes a compressed, checksummed online snapshot in a worker thread and applies the retention policy."""
+        if not locked:
+            async with self.backup_lock:
+                return await self.create_backup(label, locked=True, guild=guild)
+        snapshot = await asyncio.to_thread(create_snapshot, self.get_db_path(guild), self.get_backup_dir(guild), label)
+        removed = await asyncio.to_thread(rotate_snapshots, self.get_backup_dir(guild))
+        logger.info(f"Created snapshot {snapshot.name} in {snapshot.duration:.2f}s, rotated out {len(removed)} old snapshots.")
+        return snapshot
+
+    @tasks.loop(hours=24)
+    async def backup_task(self):
+        for guild in self.all_partitions():
+            if not os.path.exists(self.get_db_path(guild)):
+                continue
+            try:
+                await self.create_backup("auto", guild=guild)
+            except Exception as e:
+                logger.error(f"Scheduled backup failed: {e}", exc_info=True)
+
+    async def make_sheet_backend(self):
+        """Builds the configured spreadsheet backend, or None when sheet sync is disabled."""
+        settings = await self.config.all()
+        backend = settings["sheet_backend"]
+        if backend == "google":
+            if not settings["sheet_id"]:
+                raise RuntimeError("No Sheet ID configured. Set one with `!sheetset id <sheet id>`.")
+            credentials_path = os.path.join(self.base_dir, settings["credentials_path"])
+            return await asyncio.to_thread(GoogleSheetsBackend, credentials_path, settings["sheet_id"], settings["sheet_name"])
+        if backend == "file":
+            return FileSheetBackend(os.path.join(self.base_dir, f"{settings['sheet_name']}.sheet.json"))
+        return None
+
+    async def run_sheet_sync(self, full=False):
+        """Mirrors the nodes table into the spreadsheet off the event loop. Returns None when sync is disabled."""
+        backend = await self.make_sheet_backend()
+        if backend is None:
+            return None
+        # Every owner in the directory at once, which the name cache resolves in a handful of member requests
+        owner_names = await self.resolve_owner_names(list(self.get_node_index().owners))
+
+        def sync():
+            with self.connect_db() as conn:
+                return sync_nodes_to_sheet(conn, backend, full=full, owner_names=owner_names)
+
+        return await asyncio.to_thread(sync)
+
+    def reset_sheet_sync_state(self, guild=None):
+        """Forgets what was last synced so the next sync rewrites the whole sheet."""
+        # Only the shared directory is mirrored to the sheet
+        if self.partition_for(guild) is not None:
+            return
+        self.sheet_sync_failures = 0
+        self.sheet_sync_retry_at = 0.0
+        if not os.path.exists(self.get_db_path()):
+            return
+        with self.connect_db() as conn:
+            execute(conn, "delete_journal_meta", ("sheet_synced_seq",))
+            conn.commit()
+
+    @tasks.loop(minutes=5)
+    async def sheet_sync_task(self):
+        if time.monotonic() < self.sheet_sync_retry_at or not os.path.exists(self.get_db_path()):
+            return
+        try:
+            result = await self.run_sheet_sync()
+            self.sheet_sync_failures = 0
+            if result and not result.skipped:
+                logger.info(f"Synced sheet: {result.changed} changed, {result.added} added, {result.removed} removed.")
+        except Exception as e:
+            self.sheet_sync_failures += 1
+            delay = min(60 * 2**self.sheet_sync_failures, 3600)
+            self.sheet_sync_retry_at = time.monotonic() + delay
+            logger.error(f"Sheet sync failed ({self.sheet_sync_failures} in a row), retrying in {delay}s: {e}")
+
+    def get_node_index(self, guild=None) -> NodeIndex:
+        return self.node_indexes.setdefault(self.partition_for(guild), NodeIndex())
+
+    def refresh_node_index(self, guild=None):
+        """Rebuilds a partition's in-memory node index from its database with a single query."""
+        node_index = self.get_node_index(guild)
+        if not os.path.exists(self.get_db_path(guild)):
+            node_index.clear()
+            return
+        with self.connect_db(guild) as conn:
+            node_index.load(execute(conn, "node_index_rows").fetchall())
+        logger.debug(f"Loaded {len(node_index)} nodes into the node index of partition {self.partition_for(guild)}.")
+
+    def get_questionnaire_sessions(self, guild=None) -> SessionIndex:
+        return self.questionnaire_sessions.setdefault(self.partition_for(guild), SessionIndex())
+
+    def refresh_questionnaire_sessions(self, guild=None):
+        """Reloads a partition's index of open questionnaires from its database."""
+        sessions = self.get_questionnaire_sessions(guild)
+        if not os.path.exists(self.get_db_path(guild)):
+            sessions.clear()
+            return
+        with self.connect_db(guild) as conn:
+            sessions.load(execute(conn, "questionnaire_index_rows").fetchall())
+
+    @tasks.loop(minutes=10)
+    async def questionnaire_sweep_task(self):
+        """Closes questionnaires nobody answered within SESSION_TTL, so abandoned ones don't pile up."""
+        for guild in self.all_partitions():
+            sessions = self.get_questionnaire_sessions(guild)
+            # The in-memory index says whether there is anything to sweep, so idle partitions cost no query
+            if not sessions.pop_expired():
+                continue
+            try:
+                with self.connect_db(guild) as conn:
+                    expired = expire_sessions(conn)
+            except Exception as e:
+                logger.error(f"Failed to sweep expired questionnaires: {e}", exc_info=True)
+                continue
+            for session_id, channel_id, message_id in expired:
+                sessions.remove(session_id)
+                await retire_questionnaire_message(
+                    self, channel_id, message_id, "⌛ This questionnaire expired. Nothing was saved."
+                )
+            if expired:
+                logger.info(f"Closed {len(expired)} expired questionnaires in partition {self.partition_for(guild)}.")
+
+    async def resolve_owner_names(self, owner_ids, guild=None) -> dict:
+        """
+        Display names of node owners, from the guilds sharing `guild`'s node directory (asking guild first).
+        Returns owner id -> name, None for owners who have left; owners that couldn't be looked up are left out.
+        """
+        partition = self.partition_for(guild)
+        guilds = [g for g in self.bot.guilds if self.partition_for(g) == partition]
+        if guild is not None:
+            guilds.sort(key=lambda g: g.id != guild.id)
+        return await self.owner_names.resolve(owner_ids, guilds)
+
+    async def node_id_autocomplete(self, interaction: discord.Interaction, current: str):
+        """Suggests the user's own nodes first, then directory matches by ID prefix/suffix or name prefix."""
+        node_index = self.get_node_index(interaction.guild)
+        choices = []
+        for node_id in node_index.suggest(interaction.user.id, current):
+            _, short_name, long_name = node_index.get(node_id)
+            choices.append(app_commands.Choice(name=f"{node_id} · {short_name} · {long_name}"[:100], value=node_id))
+        return choices
+
     def get_random_loading_message(self):
         """Get a random loading message from a text file."""
         self.loading_messages_path = os.path.join(self.base_dir, "loading_messages.txt")
@@ -73,6 +562,13 @@ class MeshNodes(commands.Cog):
 
         return "Loading, please wait... ⏳"  # Default message in case of failure
 
+    def send_loading_message(self, destination, text=None):
+        """
+        Returns a loading message handle for `destination` that commands `.edit(...)` with their result.
+        The loading text is only actually sent if the result takes longer than a moment.
+        """
+        return self.outbound.loading(destination, text or self.get_random_loading_message())
+
     #############################
     # Node Information Commands #
     #############################
@@ -80,6 +576,10 @@ class MeshNodes(commands.Cog):
     async def nodetotal(self, ctx):
         await total_nodes(self, ctx)
 
+    @commands.command(name="nodestats")
+    async def nodestats(self, ctx):
+        await node_stats(self, ctx)
+
     @commands.command(name="nodelist", aliases=["lsn"])
     async def nodelist(self, ctx, user: discord.User = None):
         await list_my_nodes(self, ctx, user)
@@ -92,6 +592,43 @@ class MeshNodes(commands.Cog):
     async def nodefull(self, ctx, *identifier: str):
         await full_node_info(self, ctx, *identifier)
 
+    @commands.command(name="nodemap")
+    async def nodemap(self, ctx, *, selection: str = None):
+        await node_map(self, ctx, selection)
+
+    @commands.command(name="resolve", aliases=["traceroute"])
+    async def resolve(self, ctx, *text: str):
+        await resolve_nodes(self, ctx, *text)
+
+    @commands.Cog.listener()
+    async def on_message_without_command(self, message: discord.Message):
+        if message.author.bot or not message.guild:
+            return
+        if await self.bot.cog_disabled_in_guild(self, message.guild):
+            return
+        await resolve_traceroute_message(self, message)
+
+    async def cog_before_invoke(self, ctx):
+        self.last_activity = time.monotonic()
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        self.last_activity = time.monotonic()
+        # Every questionnaire component, including ones sent before a restart, is handled here by custom ID
+        custom_id = (interaction.data or {}).get("custom_id", "")
+        if custom_id.startswith(f"{CUSTOM_ID_PREFIX}:"):
+            await handle_questionnaire_interaction(self, interaction)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.display_name != after.display_name:
+            self.owner_names.forget(after.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        # They may be cached as no longer a member
+        self.owner_names.forget(member.id)
+
     #############################
     # Node Information Commands #
     #############################
@@ -99,24 +636,43 @@ class MeshNodes(commands.Cog):
     #########################
     # Node Editing Commands #
     #########################
-    @commands.command(name="paperwork")
+    @commands.group(name="paperwork", invoke_without_command=True)
     async def paperwork(self, ctx, user: discord.User = None):
         await register_node(self, ctx, user)
 
-    @commands.command(name="editnode")
+    @paperwork.command(name="resume")
+    async def paperwork_resume(self, ctx):
+        """Re-send your unfinished additional info questionnaire."""
+        await resume_questionnaire(self, ctx)
+
+    @commands.hybrid_command(name="editnode")
+    @app_commands.describe(node_id="The node you want to rename")
+    @app_commands.autocomplete(node_id=node_id_autocomplete)
     async def editnode(self, ctx, node_id: str):
+        """Edit the short and/or long name of a node you own."""
         await edit_node(self, ctx, node_id)
 
-    @commands.command(name="editnodeinfo")
-    async def editnode(self, ctx, node_id: str):
+    @commands.hybrid_command(name="editnodeinfo")
+    @app_commands.describe(node_id="The node you want to update")
+    @app_commands.autocomplete(node_id=node_id_autocomplete)
+    async def editnodeinfo(self, ctx, node_id: str):
+        """Answer the additional info questions for a node you own."""
         await edit_additional_node_info(self, ctx, node_id)
 
-    @commands.command(name="clearinfo")
+    @commands.hybrid_command(name="clearinfo")
+    @app_commands.describe(node_id="The node whose additional info should be cleared")
+    @app_commands.autocomplete(node_id=node_id_autocomplete)
     async def clearinfo(self, ctx, node_id: str):
+        """Clear the additional info of a node you own."""
         await clear_additional_node_info(self, ctx, node_id)
 
-    @commands.command(name="transfer")
+    @commands.hybrid_command(name="transfer")
+    @app_commands.describe(
+        node_id="The node to hand over, several separated by commas, or all", new_owner="Who should own the nodes"
+    )
+    @app_commands.autocomplete(node_id=node_id_autocomplete)
     async def transfer(self, ctx, node_id: str, new_owner: discord.User):
+        """Transfer ownership of one, several (comma separated) or all of your nodes to another user."""
         await transfer_node(self, ctx, node_id, new_owner)
 
     #########################
@@ -136,11 +692,74 @@ class MeshNodes(commands.Cog):
     async def dropdb(self, ctx):
         await drop_database(self, ctx)
 
+    @commands.command(name="backupdb")
+    @commands.has_permissions(administrator=True)
+    async def backupdb(self, ctx):
+        await backup_database(self, ctx)
+
+    @commands.command(name="restoredb")
+    @commands.has_permissions(administrator=True)
+    async def restoredb(self, ctx, snapshot: str = None):
+        await restore_database(self, ctx, snapshot)
+
     @commands.command(name="deletenode")
     #@commands.has_permissions(administrator=True)
     async def deletenode(self, ctx, node_id: str):
         await delete_node(self, ctx, node_id)
+
+    @commands.command(name="undelete")
+    async def undelete(self, ctx, node_id: str = None):
+        await undelete_node(self, ctx, node_id)
+
+    @commands.command(name="dupes")
+    async def dupes(self, ctx, action: str = None, keep_id: str = None, drop_id: str = None):
+        await duplicate_report(self, ctx, action, keep_id, drop_id)
+
+    @commands.command(name="shortnames")
+    async def shortnames(self, ctx):
+        await shortname_report(self, ctx)
+
+    @commands.command(name="reassign")
+    async def reassign(self, ctx, old_owner: discord.User, new_owner: discord.User):
+        await reassign_nodes(self, ctx, old_owner, new_owner)
     
+    @commands.command(name="nodechanges")
+    async def nodechanges(self, ctx, *args: str):
+        await node_changes(self, ctx, *args)
+
+    @commands.command(name="sheetsync")
+    async def sheetsync(self, ctx, mode: str = None):
+        await sheet_sync_now(self, ctx, mode)
+
+    @commands.command(name="sheetset")
+    async def sheetset(self, ctx, setting: str = None, *, value: str = None):
+        await sheet_settings(self, ctx, setting, value)
+
+    @commands.command(name="guildset")
+    @commands.guild_only()
+    async def guildset(self, ctx, setting: str = None, *values: str):
+        await guild_settings(self, ctx, setting, *values)
+
+    @commands.command(name="jobs")
+    async def jobs_command(self, ctx, action: str = None, job_id: str = None):
+        await list_jobs(self, ctx, action, job_id)
+
+    @commands.command(name="dbexplain")
+    async def dbexplain(self, ctx, name: str = None):
+        await db_explain(self, ctx, name)
+
+    @commands.command(name="dbhealth")
+    async def dbhealth(self, ctx, action: str = None, task: str = None):
+        await db_health(self, ctx, action, task)
+
+    @commands.command(name="stalls")
+    async def stalls(self, ctx, action: str = None, value: str = None):
+        await stall_report(self, ctx, action, value)
+
+    @commands.command(name="outboundstats")
+    async def outboundstats(self, ctx):
+        await outbound_stats(self, ctx)
+
     @commands.command(name="importnodes")
     @commands.has_permissions(administrator=True)
     async def import_nodes(self, ctx, user: discord.User = None):
@@ -1,7 +1,34 @@
+import io
 import os
+import asyncio
 import discord
 from discord.ui import Button, View
-from MeshNodes.shared.ParsingTools import filter_node_ids_length, parse_csv_string
+from MeshNodes.shared.ParsingTools import filter_node_ids_length, parse_csv_string, parse_node_id_list
+from MeshNodes.shared.Backups import find_snapshot, list_snapshots, remove_sidecar_files, restore_snapshot
+from MeshNodes.shared.JobManager import JobError
+from MeshNodes.shared.Maintenance import TASK_INTERVALS, database_health, last_runs
+from MeshNodes.shared.NodeRecord import (
+    NodeConflict,
+    delete_node_row,
+    delete_nodes,
+    restore_node,
+    transfer_nodes,
+    format_bulk_result,
+)
+from MeshNodes.shared.NodeArchive import archived_nodes
+from MeshNodes.shared.StallWatchdog import DEFAULT_THRESHOLD_MS, format_stack
+from MeshNodes.shared.Queries import QUERIES, check_query_plans, explain, query_sql
+from MeshNodes.shared.NodeJournal import (
+    MAX_EXPORT_CHANGES,
+    change_owner_ids,
+    changes_since,
+    compacted_through_seq,
+    export_changes_jsonl,
+    latest_seq,
+    parse_since,
+    record_change,
+    record_changes,
+)
 
 
 async def double_confirm(ctx, step1_text, step2_text, cancel_text):
@@ -23,7 +50,7 @@ async def double_confirm(ctx, step1_text, step2_text, cancel_text):
 
 
 async def create_database(mesh_nodes, ctx):
-    if ctx.author.id not in mesh_nodes.database_admin_ids:
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
         await ctx.send("You do not have permission to perform this action.")
         return
 
@@ -33,30 +60,19 @@ async def create_database(mesh_nodes, ctx):
     if not msg:
         return
 
-    db_path = mesh_nodes.get_db_path()
+    # The schema is migrated automatically when the cog loads; this is only needed again after !dropdb
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     try:
-        with mesh_nodes.connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS nodes (
-                    node_id TEXT PRIMARY KEY,
-                    discord_id TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    short_name TEXT NOT NULL,
-                    long_name TEXT NOT NULL,
-                    additional_node_data_json TEXT NOT NULL
-                )
-            """
-            )
-            conn.commit()
-        await msg.edit(content=f"Database created at `{db_path}`.", view=None)
+        version = await mesh_nodes.migrate_database(ctx.guild)
+        mesh_nodes.refresh_node_index(ctx.guild)
+        mesh_nodes.refresh_questionnaire_sessions(ctx.guild)
+        await msg.edit(content=f"Database created at `{db_path}` (schema version {version}).", view=None)
     except Exception as e:
         await msg.edit(content=f"Failed to create database: {e}", view=None)
 
 
 async def drop_database(mesh_nodes, ctx):
-    if ctx.author.id not in mesh_nodes.database_admin_ids:
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
         await ctx.send("You do not have permission to perform this action.")
         return
 
@@ -66,41 +82,532 @@ async def drop_database(mesh_nodes, ctx):
     if not msg:
         return
 
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     try:
         if os.path.exists(db_path):
-            os.remove(db_path)
-            await msg.edit(content=f"Database at `{db_path}` has been dropped.", view=None)
+            # Held from the snapshot to the reset, so no backup, restore or maintenance run sees a half-dropped database
+            async with mesh_nodes.backup_lock:
+                # Always keep a way back
+                snapshot = await mesh_nodes.create_backup("pre-drop", locked=True, guild=ctx.guild)
+                os.remove(db_path)
+                remove_sidecar_files(db_path)
+                mesh_nodes.get_node_index(ctx.guild).clear()
+                mesh_nodes.get_questionnaire_sessions(ctx.guild).clear()
+            await msg.edit(
+                content=f"Database at `{db_path}` has been dropped. A snapshot was saved as `{snapshot.name}`.", view=None
+            )
         else:
             await msg.edit(content="Database file does not exist.", view=None)
     except Exception as e:
         await msg.edit(content=f"Failed to drop database: {e}", view=None)
 
 
+async def backup_database(mesh_nodes, ctx):
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    if not os.path.exists(mesh_nodes.get_db_path(ctx.guild)):
+        await ctx.send("Database not initialized.")
+        return
+
+    loading_message = mesh_nodes.send_loading_message(ctx, "Backing up the database... 💾")
+    try:
+        snapshot = await mesh_nodes.create_backup("manual", guild=ctx.guild)
+    except Exception as e:
+        await loading_message.edit(content=f"❌ Backup failed: {e}")
+        return
+
+    embed = discord.Embed(title="Database Backup", color=discord.Color.green())
+    embed.add_field(name="Snapshot", value=f"`{snapshot.name}`", inline=False)
+    embed.add_field(name="Size", value=f"{snapshot.size / 1024:.1f} KiB", inline=True)
+    embed.add_field(name="Duration", value=f"{snapshot.duration:.2f}s", inline=True)
+    embed.add_field(name="SHA-256", value=f"`{snapshot.sha256[:16]}…`", inline=True)
+    await loading_message.edit(content=None, embed=embed)
+
+
+async def restore_database(mesh_nodes, ctx, snapshot_name: str = None):
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    backup_dir = mesh_nodes.get_backup_dir(ctx.guild)
+    if not snapshot_name:
+        snapshots = list_snapshots(backup_dir)
+        if not snapshots:
+            await ctx.send("No snapshots found. Create one with `!backupdb`.")
+            return
+        lines = [f"`{snapshot.name}` ({snapshot.size / 1024:.1f} KiB)" for snapshot in snapshots[:20]]
+        embed = discord.Embed(title="Database Snapshots", description="\n".join(lines), color=discord.Color.blue())
+        embed.set_footer(text="Restore one with !restoredb <snapshot>")
+        await ctx.send(embed=embed)
+        return
+
+    snapshot = find_snapshot(backup_dir, snapshot_name)
+    if not snapshot:
+        await ctx.send(f"No single snapshot matches `{snapshot_name}`. Run `!restoredb` to list them.")
+        return
+
+    msg = await double_confirm(
+        ctx,
+        f"This will replace the database with `{snapshot.name}`. Please confirm.",
+        "Final confirmation required.",
+        "Database restore cancelled.",
+    )
+    if not msg:
+        return
+
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    try:
+        async with mesh_nodes.backup_lock:
+            pre_restore = None
+            if os.path.exists(db_path):
+                pre_restore = await mesh_nodes.create_backup("pre-restore", locked=True, guild=ctx.guild)
+            await asyncio.to_thread(restore_snapshot, snapshot, db_path)
+        # Snapshots taken before a schema change are brought up to date before anything reads them
+        await mesh_nodes.migrate_database(ctx.guild)
+        mesh_nodes.refresh_node_index(ctx.guild)
+        mesh_nodes.refresh_questionnaire_sessions(ctx.guild)
+        mesh_nodes.reset_sheet_sync_state(ctx.guild)
+    except Exception as e:
+        await msg.edit(content=f"❌ Failed to restore database: {e}", view=None)
+        return
+
+    note = f" The previous database was saved as `{pre_restore.name}`." if pre_restore else ""
+    await msg.edit(content=f"✅ Database restored from `{snapshot.name}`.{note}", view=None)
+
+
 async def delete_node(mesh_nodes, ctx, node_id: str):
     # await ctx.send(node_id)  
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
+    # Allow if user is owner OR an admin; the ownership check is part of the DELETE itself
+    owner_id = None if mesh_nodes.is_database_admin(ctx.author.id, ctx.guild) else ctx.author.id
+    if "," in node_id:
+        await _delete_many(mesh_nodes, ctx, loading_message, node_id, owner_id)
+        return
     try:
-        with mesh_nodes.connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT discord_id FROM nodes WHERE LOWER(node_id) = LOWER(?)", (node_id,))
-            row = cursor.fetchone()
-            if not row:
-                await loading_message.edit(content=f"No node found with node_id `{node_id}`.")
-                return
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            node = delete_node_row(conn, node_id, owner_id, actor_id=ctx.author.id)
+            record_change(conn.cursor(), node.node_id, "delete", ctx.author.id)
+            conn.commit()
+            mesh_nodes.get_node_index(ctx.guild).remove(node.node_id)
+            await loading_message.edit(
+                content=f"Node with node_id `{node_id}` has been deleted from the database. Undo: `!undelete {node.node_id}`"
+            )
+    except NodeConflict as e:
+        await loading_message.edit(content=str(e))
+    except Exception as e:
+        await loading_message.edit(content=f"Failed to delete node: {e}")
 
-            owner_id = row[0]
-            # Allow if user is owner OR an admin
-            if str(ctx.author.id) != str(owner_id) and ctx.author.id not in mesh_nodes.database_admin_ids:
-                await loading_message.edit(content="You do not have permission to perform this action.")
-                return
 
-            cursor.execute("DELETE FROM nodes WHERE LOWER(node_id) = LOWER(?)", (node_id,))
+async def _delete_many(mesh_nodes, ctx, loading_message, node_ids: str, owner_id):
+    """Bulk !deletenode: every listed node the author may delete goes in one DELETE, with one summary reply."""
+    node_ids, invalid = parse_node_id_list(node_ids)
+    if not node_ids:
+        await loading_message.edit(content="Give node IDs separated by commas.")
+        return
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            done, missing, not_owned = delete_nodes(conn, node_ids, owner_id, actor_id=ctx.author.id)
+            record_changes(conn.cursor(), [node.node_id for node in done], "delete", ctx.author.id)
             conn.commit()
-            await loading_message.edit(content=f"Node with node_id `{node_id}` has been deleted from the database.")
     except Exception as e:
-        await loading_message.edit(content=f"Failed to delete node: {e}")
+        await loading_message.edit(content=f"Failed to delete nodes: {e}")
+        return
+    node_index = mesh_nodes.get_node_index(ctx.guild)
+    for node in done:
+        node_index.remove(node.node_id)
+    summary = f"Deleted {len(done)} node{'s' if len(done) != 1 else ''}"
+    await loading_message.edit(content=format_bulk_result(summary, done, missing, not_owned, invalid))
+
+
+async def undelete_node(mesh_nodes, ctx, node_id: str = None):
+    """
+    Restore a deleted or archived node, or list the ones that can be restored.
+    Usage: !undelete [node_id]
+    """
+    loading_message = mesh_nodes.send_loading_message(ctx)
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await loading_message.edit(content="Database not initialized.")
+        return
+
+    # Owners can restore their own nodes, admins anyone's
+    owner_id = None if mesh_nodes.is_database_admin(ctx.author.id, ctx.guild) else ctx.author.id
+
+    if node_id is None:
+        try:
+            with mesh_nodes.connect_db(ctx.guild) as conn:
+                rows = archived_nodes(conn, owner_id)
+        except Exception as e:
+            await loading_message.edit(content=f"Database error: {e}")
+            return
+        if not rows:
+            await loading_message.edit(content="There are no deleted nodes to restore.")
+            return
+        lines = [
+            f"`{row_node_id}` · {short_name} · {long_name} ({reason} {archived_at[:10]})"
+            for row_node_id, short_name, long_name, archived_at, reason in rows
+        ]
+        await loading_message.edit(content="Deleted nodes (restore with `!undelete <node_id>`):\n" + "\n".join(lines))
+        return
+
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            node = restore_node(conn, node_id, owner_id)
+            record_change(conn.cursor(), node.node_id, "undelete", ctx.author.id)
+            conn.commit()
+        mesh_nodes.get_node_index(ctx.guild).upsert(node.node_id, node.owner_id, node.short_name, node.long_name)
+        await loading_message.edit(content=f"✅ Node `{node.node_id}` ({node.short_name} · {node.long_name}) restored.")
+    except NodeConflict as e:
+        await loading_message.edit(content=str(e))
+    except Exception as e:
+        await loading_message.edit(content=f"❌ Failed to restore node: {e}")
+
+
+async def reassign_nodes(mesh_nodes, ctx, old_owner: discord.User, new_owner: discord.User):
+    """
+    Reassign every node owned by one user to another, e.g. when a member leaves.
+    Usage: !reassign @old_owner @new_owner
+    """
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    loading_message = mesh_nodes.send_loading_message(ctx)
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await loading_message.edit(content="Database not initialized.")
+        return
+
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            done, _, _ = transfer_nodes(conn, None, old_owner.id, new_owner.id)
+            record_changes(conn.cursor(), [node.node_id for node in done], "transfer", ctx.author.id)
+            conn.commit()
+    except Exception as e:
+        await loading_message.edit(content=f"❌ Failed to reassign nodes: {e}")
+        return
+
+    node_index = mesh_nodes.get_node_index(ctx.guild)
+    for node in done:
+        node_index.upsert(node.node_id, node.owner_id, node.short_name, node.long_name)
+    summary = f"Reassigned {len(done)} node{'s' if len(done) != 1 else ''} from {old_owner.mention} to {new_owner.mention}"
+    await loading_message.edit(content=format_bulk_result(summary, done))
+
+
+
+async def node_changes(mesh_nodes, ctx, *args: str):
+    """
+    Export the change journal since a sequence number or date as a JSON Lines file.
+    Usage: !nodechanges since <seq|YYYY-MM-DD>
+    """
+    # The journal covers every node and owner in the directory, so exporting it is for database admins
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    if args and args[0].lower() == "since":
+        args = args[1:]
+    try:
+        since = parse_since(" ".join(args)) if args else ("seq", 0)
+    except ValueError as e:
+        await ctx.send(f"{e}. Usage: `!nodechanges since <seq|YYYY-MM-DD>`")
+        return
+
+    loading_message = mesh_nodes.send_loading_message(ctx)
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await loading_message.edit(content="Database not initialized.")
+        return
+
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            cursor = conn.cursor()
+            rows = changes_since(cursor, since)
+            head_seq = latest_seq(cursor)
+            compacted_seq = compacted_through_seq(cursor)
+            owner_ids = change_owner_ids(cursor, rows[0][0], rows[-1][0]) if rows else []
+    except Exception as e:
+        await loading_message.edit(content=f"Database error: {e}")
+        return
+
+    if not rows:
+        await loading_message.edit(content=f"No changes since `{since[1]}`. Latest sequence number is `{head_seq}`.")
+        return
+
+    actions = {}
+    for row in rows:
+        actions[row[3]] = actions.get(row[3], 0) + 1
+
+    embed = discord.Embed(title="Node Changes", color=discord.Color.blue())
+    embed.add_field(name="Changes", value=str(len(rows)), inline=True)
+    embed.add_field(name="Sequence Range", value=f"{rows[0][0]} - {rows[-1][0]}", inline=True)
+    embed.add_field(name="Latest Sequence", value=str(head_seq), inline=True)
+    embed.add_field(name="By Action", value="\n".join(f"{action}: **{count}**" for action, count in actions.items()), inline=False)
+    notes = []
+    if since[0] == "seq" and 0 < since[1] < compacted_seq:
+        notes.append(f"⚠️ The journal was compacted through `{compacted_seq}`; re-sync from `0` to avoid missing deletes.")
+    if len(rows) == MAX_EXPORT_CHANGES and rows[-1][0] < head_seq:
+        notes.append(f"More changes available, continue with `!nodechanges since {rows[-1][0]}`.")
+    if notes:
+        embed.add_field(name="Notes", value="\n".join(notes), inline=False)
+
+    owner_names = await mesh_nodes.resolve_owner_names(owner_ids, ctx.guild)
+    try:
+        jsonl = await mesh_nodes.jobs.run(
+            ctx.guild, "export node changes", ctx.author.id, export_changes_jsonl, rows, owner_names
+        )
+    except JobError as e:
+        await loading_message.edit(content=f"❌ {e}")
+        return
+    export = discord.File(io.BytesIO(jsonl.encode("utf-8")), filename=f"node_changes_{rows[0][0]}_{rows[-1][0]}.jsonl")
+    await loading_message.delete()
+    await ctx.send(embed=embed, file=export)
+
+
+async def outbound_stats(mesh_nodes, ctx):
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    stats = mesh_nodes.outbound.stats()
+    embed = discord.Embed(title="Outbound Message Scheduler", color=discord.Color.blue())
+    embed.add_field(name="Queued", value=str(stats["queued"]), inline=True)
+    embed.add_field(name="Busy Channels", value=str(stats["busy_channels"]), inline=True)
+    embed.add_field(name="Max Queue Depth", value=str(stats["max_queue_depth"]), inline=True)
+    embed.add_field(name="Sent", value=str(stats["sent"]), inline=True)
+    embed.add_field(name="Edited", value=str(stats["edited"]), inline=True)
+    embed.add_field(name="Coalesced Edits", value=str(stats["coalesced_edits"]), inline=True)
+    embed.add_field(name="Placeholders Skipped", value=str(stats["placeholders_skipped"]), inline=True)
+    embed.add_field(name="Throttled", value=str(stats["throttled"]), inline=True)
+    await ctx.send(embed=embed)
+
+
+async def list_jobs(mesh_nodes, ctx, action: str = None, job_id: str = None):
+    """
+    Show running and queued background jobs, or cancel one.
+    Usage: !jobs [cancel <id>]
+    """
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    # Bot-wide admins see every guild's jobs, guild admins only their own
+    guild_id = None if ctx.author.id in mesh_nodes.database_admin_ids else getattr(ctx.guild, "id", None)
+    jobs = mesh_nodes.jobs.list_jobs(guild_id)
+
+    if action is not None:
+        if action.lower() != "cancel" or job_id is None or not job_id.lstrip("#").isdigit():
+            await ctx.send("Usage: `!jobs [cancel <id>]`")
+            return
+        job_id = int(job_id.lstrip("#"))
+        if job_id not in {job.id for job in jobs} or not mesh_nodes.jobs.cancel(job_id):
+            await ctx.send(f"❌ No running or queued job `#{job_id}`.")
+            return
+        await ctx.send(f"✅ Cancelled job `#{job_id}`.")
+        return
+
+    embed = discord.Embed(title="Background Jobs", color=discord.Color.blue())
+    embed.add_field(name="Workers", value=str(mesh_nodes.jobs.max_workers), inline=True)
+    embed.add_field(name="Per Guild", value=str(mesh_nodes.jobs.jobs_per_guild), inline=True)
+    lines = []
+    for job in jobs:
+        status = f"{job.state} {job.progress}".strip()
+        lines.append(f"`#{job.id}` **{job.name}** · {status} · {job.elapsed:.1f}s · <@{job.user_id}>")
+    embed.add_field(name="Active", value="\n".join(lines)[:1024] or "None", inline=False)
+    recent = [
+        f"`#{job.id}` {job.name} · {job.state} · {job.elapsed:.1f}s"
+        for job in mesh_nodes.jobs.finished
+        if guild_id is None or job.guild_id == guild_id
+    ]
+    embed.add_field(name="Recent", value="\n".join(recent)[:1024] or "None", inline=False)
+    await ctx.send(embed=embed)
+
+
+async def db_explain(mesh_nodes, ctx, name: str = None):
+    """
+    Check the query plan of every registered statement for scans of the nodes table, or show one statement's plan.
+    Usage: !dbexplain [statement name]
+    """
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await ctx.send("Database not initialized.")
+        return
+
+    if name is not None and name not in QUERIES:
+        await ctx.send(f"❌ No statement named `{name}`. Known: {', '.join(f'`{known}`' for known in QUERIES)}"[:2000])
+        return
+
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            if name is not None:
+                plan = explain(conn, name)
+            else:
+                results = check_query_plans(conn)
+    except Exception as e:
+        await ctx.send(f"Database error: {e}")
+        return
+
+    if name is not None:
+        sql = " ".join(query_sql(name, 3).split())
+        steps = "\n".join(plan) or "(no table access)"
+        await ctx.send(f"**{name}**\n```sql\n{sql[:1200]}\n```\n```\n{steps[:600]}\n```")
+        return
+
+    flagged = [(query_name, plan) for query_name, plan, is_flagged in results if is_flagged]
+    embed = discord.Embed(
+        title="Query Plans",
+        description=f"{len(results)} registered statements, {len(flagged)} scan the nodes table unexpectedly.",
+        color=discord.Color.red() if flagged else discord.Color.green(),
+    )
+    for query_name, plan in flagged[:20]:
+        embed.add_field(name=f"⚠️ {query_name}", value="\n".join(plan)[:1024], inline=False)
+    full_scans = [query_name for query_name, query in QUERIES.items() if query.full_scan]
+    embed.add_field(name="Full Scans by Design", value=", ".join(full_scans)[:1024] or "None", inline=False)
+    embed.set_footer(text="Show one statement's SQL and plan with !dbexplain <name>.")
+    await ctx.send(embed=embed)
+
+
+DBHEALTH_USAGE = f"Usage: `!dbhealth [run <{'|'.join(TASK_INTERVALS)}>]`"
+
+
+def _format_run(run) -> str:
+    reclaimed = f" · {run.pages_reclaimed} pages reclaimed" if run.pages_reclaimed else ""
+    status = "✅" if run.ok else "❌"
+    return f"{status} **{run.task}** · {run.duration:.2f}s{reclaimed} · {run.detail[:200]} · <t:{int(run.started)}:R>"
+
+
+async def db_health(mesh_nodes, ctx, action: str = None, task: str = None):
+    """
+    Show the database's size, free pages and when each maintenance task last ran, or run one now.
+    Usage: !dbhealth [run <task>]
+    """
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await ctx.send("Database not initialized.")
+        return
+
+    if action is not None:
+        if action.lower() != "run" or task not in TASK_INTERVALS:
+            await ctx.send(DBHEALTH_USAGE)
+            return
+        loading_message = mesh_nodes.send_loading_message(ctx)
+        run = await mesh_nodes.run_maintenance(ctx.guild, task)
+        await loading_message.edit(content=_format_run(run))
+        return
+
+    def read_health():
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            return database_health(conn, db_path), last_runs(conn)
+
+    try:
+        health, runs = await asyncio.to_thread(read_health)
+    except Exception as e:
+        await ctx.send(f"Database error: {e}")
+        return
+
+    free_share = health["free_pages"] / health["page_count"] if health["page_count"] else 0
+    embed = discord.Embed(title="Database Health", color=discord.Color.blue())
+    embed.add_field(name="File Size", value=f"{health['file_size'] / 1024:.1f} KiB", inline=True)
+    pages = f"{health['page_count']} × {health['page_size']} B, {health['free_pages']} free ({free_share:.1%})"
+    embed.add_field(name="Pages", value=pages, inline=True)
+    embed.add_field(name="Auto-vacuum", value=health["auto_vacuum"], inline=True)
+    embed.add_field(name="Journal Mode", value=health["journal_mode"], inline=True)
+    embed.add_field(name="Planner Statistics", value="Yes" if health["analyzed"] else "Never analyzed", inline=True)
+    lines = [
+        f"**{name}**: {f'<t:{int(runs[name])}:R>' if name in runs else 'never'}, every {interval // 3600}h"
+        for name, interval in TASK_INTERVALS.items()
+    ]
+    embed.add_field(name="Last Runs", value="\n".join(lines), inline=False)
+    partition = mesh_nodes.partition_for(ctx.guild)
+    recent = [_format_run(run) for run in reversed(mesh_nodes.maintenance_runs) if run.partition == partition][:10]
+    embed.add_field(name="Recent", value="\n".join(recent)[:1024] or "None since the bot started", inline=False)
+    embed.set_footer(text="Tasks wait until nobody has used the bot for a while. Run one now with !dbhealth run <task>.")
+    await ctx.send(embed=embed)
+
+
+STALLS_USAGE = "Usage: `!stalls [on [threshold ms]|off|clear|<number>]`"
+
+
+async def stall_report(mesh_nodes, ctx, action: str = None, value: str = None):
+    """
+    Show recent event loop stalls and what was running, show one stall's stack, or turn the watchdog on or off.
+    Usage: !stalls [on [threshold ms]|off|clear|<number>]
+    """
+    # The event loop is shared by every server, so this is for bot-wide admins only
+    if ctx.author.id not in mesh_nodes.database_admin_ids:
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    watchdog = mesh_nodes.stall_watchdog
+    action = action.lower() if action else None
+    if action == "on":
+        if value is not None and (not value.isdigit() or int(value) < 50):
+            await ctx.send("The threshold is a whole number of milliseconds, at least 50.")
+            return
+        threshold_ms = int(value) if value is not None else DEFAULT_THRESHOLD_MS
+        await mesh_nodes.config.stall_threshold_ms.set(threshold_ms)
+        mesh_nodes.start_stall_watchdog(threshold_ms)
+        await ctx.send(f"✅ Reporting event loop stalls longer than {threshold_ms}ms.")
+        return
+    if action == "off":
+        await mesh_nodes.config.stall_threshold_ms.set(0)
+        mesh_nodes.stop_stall_watchdog()
+        await ctx.send("✅ Stall watchdog turned off.")
+        return
+    if action == "clear" and watchdog is not None:
+        watchdog.stalls.clear()
+        watchdog.max_lag = 0.0
+        await ctx.send("✅ Cleared the recorded stalls.")
+        return
+
+    if watchdog is None:
+        await ctx.send("The stall watchdog is off. Turn it on with `!stalls on [threshold ms]`.")
+        return
+
+    stalls = list(reversed(watchdog.stalls))
+    if action is not None:
+        if not action.lstrip("#").isdigit():
+            await ctx.send(STALLS_USAGE)
+            return
+        number = int(action.lstrip("#"))
+        if not 1 <= number <= len(stalls):
+            await ctx.send(f"❌ No stall `#{number}`; {len(stalls)} are recorded.")
+            return
+        stall = stalls[number - 1]
+        stack = format_stack(stall) or "No stack was captured."
+        await ctx.send(
+            f"**Stall #{number}**: {stall.duration * 1000:.0f}ms in {stall.entry}, <t:{int(stall.at)}:R>\n"
+            f"```\n{stack[-1800:]}\n```"
+        )
+        return
 
+    embed = discord.Embed(title="Event Loop Stalls", color=discord.Color.blue())
+    embed.add_field(name="Threshold", value=f"{watchdog.threshold * 1000:.0f}ms", inline=True)
+    embed.add_field(name="Recorded", value=str(len(stalls)), inline=True)
+    embed.add_field(name="Worst Lag", value=f"{watchdog.max_lag * 1000:.0f}ms", inline=True)
+    lines = [
+        f"`#{number}` **{stall.duration * 1000:.0f}ms** · {stall.entry} · {stall.site or 'unknown'} · <t:{int(stall.at)}:R>"
+        for number, stall in enumerate(stalls[:15], start=1)
+    ]
+    embed.add_field(name="Recent", value="\n".join(lines)[:1024] or "None", inline=False)
+    # Where stalls keep happening matters more than any single one
+    sites = {}
+    for stall in stalls:
+        sites[stall.site or "unknown"] = sites.get(stall.site or "unknown", 0) + 1
+    top = sorted(sites.items(), key=lambda item: -item[1])[:5]
+    embed.add_field(name="By Site", value="\n".join(f"{site}: **{count}**" for site, count in top) or "None", inline=False)
+    embed.set_footer(text="Show a stall's stack with !stalls <number>.")
+    await ctx.send(embed=embed)
 
 
 class ConfirmView(View):
@@ -0,0 +1,154 @@
+import os
+import json
+import discord
+
+from MeshNodes.shared.Duplicates import find_duplicates_in_db
+from MeshNodes.shared.JobManager import JobError
+from MeshNodes.shared.NodeJournal import record_change
+from MeshNodes.shared.NodeRecord import NodeConflict, fetch_node, update_node, delete_node_row
+from MeshNodes.shared.OwnerNames import owner_label
+
+DUPES_USAGE = "Usage: `!dupes` or `!dupes merge <keep node_id> <duplicate node_id>`"
+
+# Discord rejects embeds with more text than this in total; the reserve is room for the footer set after the fields
+EMBED_TOTAL_LIMIT = 6000
+FOOTER_RESERVE = 200
+
+
+def _field_fits(embed: discord.Embed, name: str, value: str) -> bool:
+    return len(embed) + len(name) + len(value) + FOOTER_RESERVE <= EMBED_TOTAL_LIMIT
+
+
+async def duplicate_report(mesh_nodes, ctx, action: str = None, keep_id: str = None, drop_id: str = None):
+    """
+    List likely duplicate nodes, or merge a duplicate into the node to keep.
+    Usage: !dupes [merge <keep_id> <drop_id>]
+    """
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await ctx.send("Database not initialized.")
+        return
+
+    if action is not None:
+        if action.lower() != "merge" or not keep_id or not drop_id:
+            await ctx.send(DUPES_USAGE)
+            return
+        await merge_duplicate(mesh_nodes, ctx, keep_id, drop_id)
+        return
+
+    loading_message = mesh_nodes.send_loading_message(ctx)
+    try:
+        pairs = await mesh_nodes.jobs.run(ctx.guild, "find duplicates", ctx.author.id, find_duplicates_in_db, db_path)
+    except JobError as e:
+        await loading_message.edit(content=f"❌ {e}")
+        return
+
+    if not pairs:
+        await loading_message.edit(content="✅ No likely duplicate nodes found.")
+        return
+
+    owners = {node[1] for _, keep, drop, _ in pairs for node in (keep, drop)}
+    owner_names = await mesh_nodes.resolve_owner_names(owners, ctx.guild)
+    embed = discord.Embed(title="Possible Duplicate Nodes", color=discord.Color.orange())
+    shown = 0
+    for score, keep, drop, reasons in pairs:
+        lines = [
+            f"`{node_id}` · **{short_name}** · {long_name} · {owner_label(owner_id, owner_names)}"
+            for node_id, owner_id, short_name, long_name, _ in (keep, drop)
+        ]
+        lines.append(f"{', '.join(reasons)}")
+        lines.append(f"`!dupes merge {keep[0]} {drop[0]}`")
+        name, value = f"{score:.0%} match", "\n".join(lines)[:1024]
+        if not _field_fits(embed, name, value):
+            break
+        embed.add_field(name=name, value=value, inline=False)
+        shown += 1
+    footer = "Merging keeps the first node, fills in its missing answers from the second and archives the second."
+    if shown < len(pairs):
+        footer = f"{len(pairs) - shown} more pairs not shown; merge some and run !dupes again. {footer}"
+    embed.set_footer(text=footer)
+    await loading_message.edit(content=None, embed=embed)
+
+
+async def merge_duplicate(mesh_nodes, ctx, keep_id: str, drop_id: str):
+    """Fold a duplicate's answers into the node to keep and archive the duplicate, in one transaction."""
+    keep_id, drop_id = keep_id.strip().lstrip("!").upper(), drop_id.strip().lstrip("!").upper()
+    if keep_id == drop_id:
+        await ctx.send("Pick two different nodes.")
+        return
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            keep, drop = fetch_node(conn, keep_id), fetch_node(conn, drop_id)
+            missing = [node_id for node_id, node in ((keep_id, keep), (drop_id, drop)) if node is None]
+            if missing:
+                await ctx.send(f"No node found with ID `{missing[0]}`.")
+                return
+            # The kept node's own answers win; the duplicate only fills gaps
+            merged = {**drop.data, **keep.data}
+            kept = update_node(conn, keep.node_id, version=keep.version, additional_node_data_json=json.dumps(merged))
+            delete_node_row(
+                conn, drop.node_id, version=drop.version, actor_id=ctx.author.id, reason=f"merged into {keep.node_id}"
+            )
+            cursor = conn.cursor()
+            record_change(cursor, kept.node_id, "merge", ctx.author.id)
+            record_change(cursor, drop.node_id, "delete", ctx.author.id)
+            conn.commit()
+    except NodeConflict as e:
+        await ctx.send(f"❌ {e}")
+        return
+    except Exception as e:
+        await ctx.send(f"❌ Failed to merge nodes: {e}")
+        return
+
+    mesh_nodes.get_node_index(ctx.guild).remove(drop.node_id)
+    await ctx.send(
+        f"✅ Merged `{drop.node_id}` into `{kept.node_id}` ({len(merged) - len(keep.data)} answers filled in). "
+        f"Undo the archive with `!undelete {drop.node_id}`."
+    )
+
+
+async def shortname_report(mesh_nodes, ctx):
+    """
+    List short names used by more than one node, with free alternatives.
+    Usage: !shortnames
+    """
+    if not mesh_nodes.is_database_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    node_index = mesh_nodes.get_node_index(ctx.guild)
+    collisions = node_index.short_name_collisions()
+    if not collisions:
+        await ctx.send("✅ Every node has its own short name.")
+        return
+
+    shown = sorted(collisions.items(), key=lambda item: (-len(item[1]), item[0]))[:25]
+    owners = {node_index.get(node_id)[0] for _, node_ids in shown for node_id in node_ids[:10]}
+    owner_names = await mesh_nodes.resolve_owner_names(owners, ctx.guild)
+    embed = discord.Embed(
+        title="Shared Short Names",
+        description=f"{len(collisions)} short names are used by more than one node.",
+        color=discord.Color.orange(),
+    )
+    fields = 0
+    for short_name, node_ids in shown:
+        lines = []
+        for node_id in node_ids[:10]:
+            owner_id, _, long_name = node_index.get(node_id)
+            suggestions = node_index.suggest_short_names(long_name, count=2)
+            free = f" → {', '.join(suggestions)}" if suggestions else ""
+            lines.append(f"`{node_id}` · {long_name} · {owner_label(owner_id, owner_names)}{free}")
+        if len(node_ids) > 10:
+            lines.append(f"...and {len(node_ids) - 10} more")
+        value = "\n".join(lines)[:1024]
+        if not _field_fits(embed, short_name, value):
+            break
+        embed.add_field(name=short_name, value=value, inline=False)
+        fields += 1
+    if fields < len(collisions):
+        embed.set_footer(text=f"Showing the {fields} most shared short names of {len(collisions)}.")
+    await ctx.send(embed=embed)
@@ -0,0 +1,104 @@
+import discord
+
+from MeshNodes.shared.AdditionalNodeInfo import ChoiceQuestion, additional_info_questions
+
+GUILDSET_USAGE = (
+    "Usage: `!guildset directory <shared|separate>`, `!guildset admin <add|remove> <user id>`, "
+    "`!guildset choices <question> <choice, choice, ...|reset>` or `!guildset prune <days|off>`"
+)
+
+
+async def guild_settings(mesh_nodes, ctx, setting: str = None, *values: str):
+    """
+    Show or change this server's node directory settings.
+    Usage: !guildset [directory|admin|choices|prune] [values...]
+    """
+    # Server settings (admins, choices) are the server's own even when its nodes live in the shared directory
+    if not mesh_nodes.is_guild_admin(ctx.author.id, ctx.guild):
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    settings = mesh_nodes.guild_settings.get(ctx.guild.id, {})
+
+    if setting is None:
+        embed = discord.Embed(title=f"Node Directory Settings for {ctx.guild.name}", color=discord.Color.blue())
+        embed.add_field(name="Directory", value="Separate" if settings.get("separate_directory") else "Shared", inline=True)
+        admins = settings.get("admin_ids", [])
+        embed.add_field(name="Admins", value=", ".join(f"<@{user_id}>" for user_id in admins) or "None", inline=True)
+        prune_after_days = await mesh_nodes.get_prune_after_days(ctx.guild)
+        embed.add_field(
+            name="Archive Stale Nodes", value=f"After {prune_after_days} days" if prune_after_days else "Off", inline=True
+        )
+        for json_name, choices in settings.get("question_choices", {}).items():
+            embed.add_field(name=f"Choices: {json_name}", value=", ".join(choices), inline=False)
+        embed.set_footer(text=GUILDSET_USAGE.replace("`", ""))
+        await ctx.send(embed=embed)
+        return
+
+    setting = setting.lower()
+
+    if setting == "directory" and len(values) == 1 and values[0].lower() in ("shared", "separate"):
+        # Moving a whole community between databases is a bot-operator decision
+        if ctx.author.id not in mesh_nodes.database_admin_ids:
+            await ctx.send("You do not have permission to perform this action.")
+            return
+        separate = values[0].lower() == "separate"
+        await mesh_nodes.update_guild_settings(ctx.guild, separate_directory=separate)
+        version = await mesh_nodes.migrate_database(ctx.guild)
+        mesh_nodes.refresh_node_index(ctx.guild)
+        mesh_nodes.refresh_questionnaire_sessions(ctx.guild)
+        await ctx.send(
+            f"✅ This server now uses the {'separate' if separate else 'shared'} node directory "
+            f"at `{mesh_nodes.get_db_path(ctx.guild)}` (schema version {version}). Nodes are not copied between directories."
+        )
+        return
+
+    if setting == "admin" and len(values) == 2 and values[0].lower() in ("add", "remove") and values[1].strip("<@!>").isdigit():
+        user_id = int(values[1].strip("<@!>"))
+        admins = set(settings.get("admin_ids", []))
+        if values[0].lower() == "add":
+            admins.add(user_id)
+        else:
+            admins.discard(user_id)
+        await mesh_nodes.update_guild_settings(ctx.guild, admin_ids=sorted(admins))
+        await ctx.send(f"✅ Server admins: {', '.join(f'<@{admin_id}>' for admin_id in sorted(admins)) or 'none'}")
+        return
+
+    if setting == "choices" and len(values) >= 2:
+        questions = {q.json_name: q for q in additional_info_questions if isinstance(q, ChoiceQuestion)}
+        json_name = values[0]
+        if json_name not in questions:
+            await ctx.send(f"Choice questions are: {', '.join(questions)}")
+            return
+        overrides = dict(settings.get("question_choices", {}))
+        if len(values) == 2 and values[1].lower() == "reset":
+            overrides.pop(json_name, None)
+            choices = questions[json_name].choices
+        else:
+            choices = list(dict.fromkeys(choice.strip() for choice in " ".join(values[1:]).split(",") if choice.strip()))
+            # Select menus hold at most 25 options
+            if not choices or len(choices) > 25 or any(len(choice) > 100 for choice in choices):
+                await ctx.send("Give between 1 and 25 comma-separated choices of at most 100 characters each.")
+                return
+            overrides[json_name] = choices
+        await mesh_nodes.update_guild_settings(ctx.guild, question_choices=overrides)
+        await ctx.send(f"✅ `{json_name}` choices for this server: {', '.join(choices)}")
+        return
+
+    if setting == "prune" and len(values) == 1 and (values[0].isdigit() or values[0].lower() == "off"):
+        days = 0 if values[0].lower() == "off" else int(values[0])
+        if mesh_nodes.partition_for(ctx.guild) is None:
+            # The shared directory belongs to every server using it
+            if ctx.author.id not in mesh_nodes.database_admin_ids:
+                await ctx.send("You do not have permission to perform this action.")
+                return
+            await mesh_nodes.config.prune_after_days.set(days)
+        else:
+            await mesh_nodes.update_guild_settings(ctx.guild, prune_after_days=days)
+        if days:
+            await ctx.send(f"✅ Nodes nobody has updated in {days} days will be archived daily; `!undelete` restores them.")
+        else:
+            await ctx.send("✅ Stale nodes will no longer be archived.")
+        return
+
+    await ctx.send(GUILDSET_USAGE)
@@ -1,28 +1,40 @@
 import os
 import re
-import json
+import sqlite3
 import discord
 from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
 from discord.ui import View, Button
 from MeshNodes.shared.AdditionalNodeInfo import additional_info_questions
+from MeshNodes.shared.ParsingTools import extract_node_ids, looks_like_traceroute
+from MeshNodes.shared.NodeStats import STATS_DIMENSIONS, TOTAL_DIMENSION
+from MeshNodes.shared.NodeRecord import NodeRecord, node_record_factory
+from MeshNodes.shared.Queries import execute
+from MeshNodes.shared.OwnerNames import owner_label
+
+
+STATS_UNAVAILABLE = "Node statistics are unavailable; the database migration may have failed (see the bot's log)"
 
 
 async def total_nodes(self, ctx):
     """Counts the total number of unique node IDs in the database."""
-    loading_message = await ctx.send("Calculating total node entries...")
+    loading_message = self.send_loading_message(ctx, "Calculating total node entries...")
 
-    db_path = self.get_db_path()
+    db_path = self.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
 
     try:
-        with self.connect_db() as conn:
+        with self.connect_db(ctx.guild) as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(DISTINCT node_id) FROM nodes")
-            result = cursor.fetchone()
+            # Maintained by triggers, so this is a single-row lookup instead of a table scan
+            result = execute(cursor, "total_nodes", (TOTAL_DIMENSION,)).fetchone()
             total_entries = result[0] if result else 0
+    except sqlite3.OperationalError as e:
+        # The statistics tables come with the schema migrations that run when the cog loads
+        await loading_message.edit(content=f"❌ {STATS_UNAVAILABLE}: {e}")
+        return
     except Exception as e:
         await loading_message.edit(content=f"Database error: {e}")
         return
@@ -32,44 +44,96 @@ async def total_nodes(self, ctx):
     await loading_message.edit(content=None, embed=embed)
 
 
+# How many values to show per breakdown and how many months of growth history
+STATS_TOP_VALUES = 10
+STATS_GROWTH_MONTHS = 12
+
+
+async def node_stats(mesh_nodes, ctx):
+    """Shows node counts broken down by type, role, location, power source and hardware, plus growth over time."""
+    loading_message = mesh_nodes.send_loading_message(ctx)
+
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await loading_message.edit(content="Database not initialized.")
+        return
+
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            cursor = conn.cursor()
+            execute(cursor, "node_stats", (TOTAL_DIMENSION,))
+            stats_rows = cursor.fetchall()
+            execute(cursor, "node_growth")
+            growth_rows = cursor.fetchall()
+    except sqlite3.OperationalError as e:
+        # The statistics tables come with the schema migrations that run when the cog loads
+        await loading_message.edit(content=f"❌ {STATS_UNAVAILABLE}: {e}")
+        return
+    except Exception as e:
+        await loading_message.edit(content=f"Database error: {e}")
+        return
+
+    breakdowns = {dimension: [] for dimension in STATS_DIMENSIONS}
+    total_entries = 0
+    for dimension, value, count in stats_rows:
+        if dimension == TOTAL_DIMENSION:
+            total_entries = count
+        elif dimension in breakdowns:
+            breakdowns[dimension].append((value, count))
+
+    human_names = {q.json_name: q.human_name for q in additional_info_questions}
+    embed = discord.Embed(title="Node Statistics", color=discord.Color.green())
+    embed.add_field(name="Total Unique Node IDs", value=str(total_entries), inline=False)
+
+    for dimension, values in breakdowns.items():
+        values.sort(key=lambda item: (-item[1], item[0]))
+        lines = [f"{value}: **{count}**" for value, count in values[:STATS_TOP_VALUES]]
+        if len(values) > STATS_TOP_VALUES:
+            lines.append(f"...and {len(values) - STATS_TOP_VALUES} more")
+        embed.add_field(name=human_names.get(dimension, dimension), value="\n".join(lines) or "No data", inline=True)
+
+    running_total = 0
+    growth_lines = []
+    for month, added, removed in growth_rows:
+        running_total += added - removed
+        growth_lines.append(f"{month}: +{added} / -{removed} (total {running_total})")
+    embed.add_field(
+        name="Growth Over Time", value="\n".join(growth_lines[-STATS_GROWTH_MONTHS:]) or "No data", inline=False
+    )
+
+    await loading_message.edit(content=None, embed=embed)
+
+
 async def list_my_nodes(mesh_nodes, ctx, user: discord.User = None):
     """Retrieve a list of nodes owned by a user."""
 
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
 
     if not user:
         user = ctx.author
 
-    user_id = str(user.id)
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized")
         return
 
-    nodes = []
     try:
-        with mesh_nodes.connect_db() as conn:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                "SELECT node_id, short_name, long_name FROM nodes WHERE discord_id = ?",
-                (user_id,),
-            )
-            rows = cursor.fetchall()
-            for row in rows:
-                nodes.append(
-                    {
-                        "Node ID": row[0],
-                        "Node Shortname": row[1],
-                        "Node Longname": row[2],
-                    }
-                )
+            cursor.row_factory = node_record_factory
+            # Served by idx_nodes_discord_id, already in node ID order
+            execute(cursor, "nodes_by_owner", (user.id,))
+            nodes = cursor.fetchall()
     except Exception as e:
         await loading_message.edit(content=f"Database error: {e}")
         return
 
+    # Their name in this server, which a plain user (e.g. from a mention of someone who left) doesn't carry
+    owner_name = (await mesh_nodes.resolve_owner_names([user.id], ctx.guild)).get(user.id) or user.display_name
+
     if not nodes:
         await loading_message.edit(
-            content=f"No nodes found for {user.display_name}."
+            content=f"No nodes found for {owner_name}."
         )
         return
 
@@ -81,17 +145,14 @@ async def list_my_nodes(mesh_nodes, ctx, user: discord.User = None):
         chunk = nodes[i : i + PAGE_SIZE]
 
         embed = discord.Embed(
-            title=f"Nodes owned by {user.display_name}",
+            title=f"Nodes owned by {owner_name}",
             color=discord.Color.green(),
         )
 
         for node in chunk:
             embed.add_field(
-                name=node.get("Node Longname", "Unknown Node"),
-                value=(
-                    f"**Shortname:** {node.get('Node Shortname', 'N/A')}\n"
-                    f"**Node ID:** {node.get('Node ID', 'N/A')}"
-                ),
+                name=node.long_name or "Unknown Node",
+                value=f"**Shortname:** {node.short_name or 'N/A'}\n**Node ID:** {node.node_id}",
                 inline=False,
             )
 
@@ -100,12 +161,11 @@ async def list_my_nodes(mesh_nodes, ctx, user: discord.User = None):
         )
         embeds.append(embed)
 
-    # Remove loading text before sending menu
-    await loading_message.delete()
-
     if len(embeds) == 1:
-        await ctx.send(embed=embeds[0])
+        await loading_message.edit(content=None, embed=embeds[0])
     else:
+        # Remove loading text before sending menu
+        await loading_message.delete()
         await menu(ctx, embeds, DEFAULT_CONTROLS)
 
 
@@ -115,23 +175,20 @@ def is_valid_maidenhead(self, locator: str) -> bool:
     return bool(re.fullmatch(pattern, locator.strip().upper()))
 
 
-def _get_node_details_embed(mesh_nodes, node_row):
+def _get_node_details_embed(mesh_nodes, node: NodeRecord, owner_names: dict):
     """
-    Helper to build a Discord embed for full node info from a database row.
+    Helper to build a Discord embed for full node info from a node record.
     Shows basic info and any additional info fields present in the node's JSON.
     """
-    # node_row: (node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json)
-    node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json = node_row
-
-    embed = discord.Embed(title=f"Full Node Info: {long_name}", color=discord.Color.blue())
-    embed.add_field(name="Node ID", value=node_id, inline=True)
-    embed.add_field(name="Shortname", value=short_name, inline=True)
-    embed.add_field(name="Longname", value=long_name, inline=True)
-    embed.add_field(name="Owner", value=f"<@!{discord_id}>", inline=True)
+    embed = discord.Embed(title=f"Full Node Info: {node.long_name}", color=discord.Color.blue())
+    embed.add_field(name="Node ID", value=node.node_id, inline=True)
+    embed.add_field(name="Shortname", value=node.short_name, inline=True)
+    embed.add_field(name="Longname", value=node.long_name, inline=True)
+    embed.add_field(name="Owner", value=owner_label(node.owner_id, owner_names), inline=True)
 
-    # Parse additional_node_data_json for extra fields
+    # Show any additional info fields that have answers
     try:
-        extra = json.loads(additional_node_data_json)
+        extra = node.data
         maidenhead_key = "If a permanent install, where is this node placed?"
         grid_url_template = "https://www.levinecentral.com/ham/grid_square.php?&Grid={}&Zoom=13&sm=y"
         for q in additional_info_questions:
@@ -148,31 +205,35 @@ def _get_node_details_embed(mesh_nodes, node_row):
     return embed
 
 
+def _find_node(mesh_nodes, guild, identifier: str):
+    """Looks a node up by Node ID (exact or partial from the end), then by Longname or Shortname."""
+    if not identifier.strip():
+        return None
+    with mesh_nodes.connect_db(guild) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = node_record_factory
+        node_row = execute(cursor, "node_by_id", (identifier.upper(),)).fetchone()
+        if not node_row:
+            # Partial IDs are matched in the node index, which keeps IDs reversed for exactly this
+            node_ids = mesh_nodes.get_node_index(guild).ending_with(identifier, limit=1)
+            if node_ids:
+                node_row = execute(cursor, "node_by_id", (node_ids[0],)).fetchone()
+        if not node_row:
+            # Try by long_name or short_name (case-insensitive)
+            node_row = execute(cursor, "nodes_by_name", (identifier.lower(), identifier.lower())).fetchone()
+        return node_row
+
+
 async def run_nodefull_on_interaction(mesh_nodes, interaction: discord.Interaction, identifier: str):
     """Runs the nodefull command on behalf of the user who clicked the button, using the new database."""
-    loading_message = await interaction.channel.send(mesh_nodes.get_random_loading_message())
-    db_path = mesh_nodes.get_db_path()
+    loading_message = mesh_nodes.send_loading_message(interaction.channel)
+    db_path = mesh_nodes.get_db_path(interaction.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
 
-    node_row = None
     try:
-        with mesh_nodes.connect_db() as conn:
-            cursor = conn.cursor()
-            # Try by node_id (exact or partial from end)
-            cursor.execute(
-                "SELECT * FROM nodes WHERE UPPER(node_id) = ? OR UPPER(substr(node_id, -?)) = ?",
-                (identifier.upper(), len(identifier), identifier.upper()),
-            )
-            node_row = cursor.fetchone()
-            if not node_row:
-                # Try by long_name or short_name (case-insensitive)
-                cursor.execute(
-                    "SELECT * FROM nodes WHERE lower(long_name) = ? OR lower(short_name) = ?",
-                    (identifier.lower(), identifier.lower()),
-                )
-                node_row = cursor.fetchone()
+        node_row = _find_node(mesh_nodes, interaction.guild, identifier)
     except Exception as e:
         await loading_message.edit(content=f"Database error: {e}")
         return
@@ -181,7 +242,8 @@ async def run_nodefull_on_interaction(mesh_nodes, interaction: discord.Interacti
         await loading_message.edit(content=f"Node not found: `{identifier}`")
         return
 
-    embed = _get_node_details_embed(mesh_nodes, node_row)
+    owner_names = await mesh_nodes.resolve_owner_names([node_row.owner_id], interaction.guild)
+    embed = _get_node_details_embed(mesh_nodes, node_row, owner_names)
     await loading_message.edit(content=None, embed=embed)
 
 
@@ -193,32 +255,32 @@ async def node_info(mesh_nodes, ctx, *identifier: str):
 
     identifier = " ".join(identifier).strip()
     if identifier.startswith("!"):
-        identifier = identifier[1:]
+        identifier = identifier[1:].strip()
+    if not identifier:
+        await ctx.send("Please provide a Node ID, Longname, or Shortname.")
+        return
 
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
 
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
 
     matches = []
     try:
-        with mesh_nodes.connect_db() as conn:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
             cursor = conn.cursor()
-            # Node ID: match from the end (last N chars)
+            cursor.row_factory = node_record_factory
+            # Node ID: match from the end (last N chars), found in the node index and then read by primary key
             if len(identifier) <= 8:
-                cursor.execute(
-                    "SELECT node_id, short_name, long_name, discord_id FROM nodes WHERE UPPER(substr(node_id, -?)) = ?",
-                    (len(identifier), identifier.upper()),
-                )
-                matches += cursor.fetchall()
+                node_ids = mesh_nodes.get_node_index(ctx.guild).ending_with(identifier)
+                if node_ids:
+                    matches += execute(cursor, "nodes_by_ids", node_ids).fetchall()
             # Shortname and Longname: case-insensitive match
-            cursor.execute(
-                "SELECT node_id, short_name, long_name, discord_id FROM nodes WHERE lower(short_name) = ? OR lower(long_name) = ?",
-                (identifier.lower(), identifier.lower()),
-            )
-            matches += [row for row in cursor.fetchall() if row not in matches]
+            execute(cursor, "nodes_by_name", (identifier.lower(), identifier.lower()))
+            seen = {node.node_id for node in matches}
+            matches += [node for node in cursor.fetchall() if node.node_id not in seen]
     except Exception as e:
         await loading_message.edit(content=f"Database error: {e}")
         return
@@ -232,17 +294,24 @@ async def node_info(mesh_nodes, ctx, *identifier: str):
         )
         return
 
+    # One lookup for every owner in the results
+    owner_names = await mesh_nodes.resolve_owner_names({node.owner_id for node in matches}, ctx.guild)
     embed = discord.Embed(title=f"Node Info Results ({len(matches)})", color=discord.Color.green())
 
     view = View()
-    for idx, (node_id, short_name, long_name, owner_id) in enumerate(matches):
+    for idx, node in enumerate(matches):
         embed.add_field(
-            name=long_name, value=f"**Shortname:** {short_name}\n**Node ID:** {node_id}\n**Owner:** <@{owner_id}>", inline=False
+            name=node.long_name,
+            value=(
+                f"**Shortname:** {node.short_name}\n**Node ID:** {node.node_id}\n"
+                f"**Owner:** {owner_label(node.owner_id, owner_names)}"
+            ),
+            inline=False,
         )
         # Add a button for each node
-        button = Button(label=f"View Full Node Info ({long_name})", custom_id=f"nodefull_{node_id}_{idx}")
+        button = Button(label=f"View Full Node Info ({node.long_name})", custom_id=f"nodefull_{node.node_id}_{idx}")
 
-        async def make_callback(node_id=node_id):
+        async def make_callback(node_id=node.node_id):
             async def button_callback(interaction: discord.Interaction):
                 await interaction.response.defer()
                 await run_nodefull_on_interaction(mesh_nodes, interaction, node_id)
@@ -262,29 +331,14 @@ async def full_node_info(mesh_nodes, ctx, *identifier: str):
         return
 
     identifier = " ".join(identifier).strip()
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
-    db_path = mesh_nodes.get_db_path()
+    loading_message = mesh_nodes.send_loading_message(ctx)
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
 
-    node_row = None
     try:
-        with mesh_nodes.connect_db() as conn:
-            cursor = conn.cursor()
-            # Try by node_id (exact or partial from end)
-            cursor.execute(
-                "SELECT * FROM nodes WHERE UPPER(node_id) = ? OR UPPER(substr(node_id, -?)) = ?",
-                (identifier.upper(), len(identifier), identifier.upper()),
-            )
-            node_row = cursor.fetchone()
-            if not node_row:
-                # Try by long_name or short_name (case-insensitive)
-                cursor.execute(
-                    "SELECT * FROM nodes WHERE lower(long_name) = ? OR lower(short_name) = ?",
-                    (identifier.lower(), identifier.lower()),
-                )
-                node_row = cursor.fetchone()
+        node_row = _find_node(mesh_nodes, ctx.guild, identifier)
     except Exception as e:
         await loading_message.edit(content=f"Database error: {e}")
         return
@@ -293,5 +347,97 @@ async def full_node_info(mesh_nodes, ctx, *identifier: str):
         await loading_message.edit(content=f"Node not found: `{identifier}`")
         return
 
-    embed = _get_node_details_embed(mesh_nodes, node_row)
+    owner_names = await mesh_nodes.resolve_owner_names([node_row.owner_id], ctx.guild)
+    embed = _get_node_details_embed(mesh_nodes, node_row, owner_names)
     await loading_message.edit(content=None, embed=embed)
+
+
+# Discord's limit on an embed description; hops past it are counted in the footer instead
+RESOLVE_DESCRIPTION_LIMIT = 4096
+
+
+def _lookup_node_ids(mesh_nodes, guild, node_ids: list[str]) -> dict:
+    """
+    Resolve many node IDs with a single `IN (...)` query.
+    Returns a dict of node_id -> NodeRecord for the IDs that exist.
+    """
+    unique_ids = list(dict.fromkeys(node_ids))
+    if not unique_ids:
+        return {}
+
+    with mesh_nodes.connect_db(guild) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = node_record_factory
+        # Node IDs are always stored uppercase, so compare on the bare column to stay on the primary key index
+        return {node.node_id: node for node in execute(cursor, "nodes_by_ids", unique_ids).fetchall()}
+
+
+def _get_resolve_embed(node_ids: list[str], resolved: dict, owner_names: dict):
+    """Build one compact embed listing each hop's short name, long name and owner."""
+    lines = []
+    length = 0
+    for hop, node_id in enumerate(node_ids, start=1):
+        if node_id in resolved:
+            node = resolved[node_id]
+            owner = owner_label(node.owner_id, owner_names)
+            line = f"`{hop}.` **{node.short_name}** · {node.long_name} · {owner} (`!{node_id.lower()}`)"
+        else:
+            line = f"`{hop}.` *Unknown* (`!{node_id.lower()}`)"
+        # Names and owner labels vary in length, so stop on the description's size rather than a hop count
+        if length + len(line) + 1 > RESOLVE_DESCRIPTION_LIMIT:
+            break
+        lines.append(line)
+        length += len(line) + 1
+
+    known = sum(1 for node_id in node_ids if node_id in resolved)
+    embed = discord.Embed(title=f"Resolved Nodes ({known}/{len(node_ids)} known)", color=discord.Color.green())
+    embed.description = "\n".join(lines)
+    if len(lines) < len(node_ids):
+        embed.set_footer(text=f"…and {len(node_ids) - len(lines)} more. Only the first {len(lines)} hops fit in one reply.")
+    elif known < len(node_ids):
+        embed.set_footer(text="Unknown nodes can be added with !paperwork.")
+    return embed
+
+
+async def resolve_nodes(mesh_nodes, ctx, *text: str):
+    """Resolve every node ID in a message (e.g. pasted traceroute output) in one lookup and one reply."""
+    node_ids = extract_node_ids(" ".join(text))
+    if not node_ids:
+        await ctx.send("Please provide one or more Node IDs, e.g. `!resolve !a1b2c3d4 --> !e5f6a7b8`.")
+        return
+
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await ctx.send("Database not initialized.")
+        return
+
+    try:
+        resolved = _lookup_node_ids(mesh_nodes, ctx.guild, node_ids)
+    except Exception as e:
+        await ctx.send(f"Database error: {e}")
+        return
+
+    owner_names = await mesh_nodes.resolve_owner_names({node.owner_id for node in resolved.values()}, ctx.guild)
+    await ctx.send(embed=_get_resolve_embed(node_ids, resolved, owner_names))
+
+
+async def resolve_traceroute_message(mesh_nodes, message: discord.Message):
+    """Automatically reply to pasted traceroute output with the resolved hops."""
+    if not looks_like_traceroute(message.content):
+        return
+
+    if not os.path.exists(mesh_nodes.get_db_path(message.guild)):
+        return
+
+    node_ids = extract_node_ids(message.content)
+    try:
+        resolved = _lookup_node_ids(mesh_nodes, message.guild, node_ids)
+    except Exception:
+        return
+
+    # Nothing useful to add if none of the hops are in the directory
+    if not resolved:
+        return
+
+    owner_names = await mesh_nodes.resolve_owner_names({node.owner_id for node in resolved.values()}, message.guild)
+    await message.reply(embed=_get_resolve_embed(node_ids, resolved, owner_names), mention_author=False)
@@ -0,0 +1,53 @@
+import os
+import discord
+
+from MeshNodes.shared.JobManager import JobError
+from MeshNodes.shared.NodeMap import MAP_CACHE_DIR_NAME, map_cache_key, prune_map_cache, render_node_map, select_map_points
+from MeshNodes.shared.Queries import execute
+
+
+async def node_map(mesh_nodes, ctx, selection: str = None):
+    """
+    Show a map of nodes that have a grid square, coloured by role.
+    Usage: !nodemap [region|role|type]
+    """
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await ctx.send("Database not initialized.")
+        return
+
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            rows = execute(conn, "map_points").fetchall()
+    except Exception as e:
+        await ctx.send(f"❌ Failed to read nodes: {e}")
+        return
+
+    points = select_map_points(rows, selection)
+    if not points:
+        where = f" matching `{selection}`" if selection else ""
+        await ctx.send(f"No nodes{where} have a grid square yet. Owners can add one with `!editnodeinfo`.")
+        return
+
+    title = f"Mesh nodes: {selection.strip()}" if selection else "Mesh nodes"
+    # The base layer lives next to the cog, shared by every directory
+    basemap_dir = mesh_nodes.base_dir
+    cache_dir = os.path.join(mesh_nodes.get_partition_dir(ctx.guild), MAP_CACHE_DIR_NAME)
+    path = os.path.join(cache_dir, f"{map_cache_key(points, title, basemap_dir)}.png")
+
+    if os.path.exists(path):
+        # Touched so pruning keeps the maps people actually ask for
+        os.utime(path)
+    else:
+        loading_message = mesh_nodes.send_loading_message(ctx)
+        try:
+            await mesh_nodes.jobs.run(
+                ctx.guild, "render node map", ctx.author.id, render_node_map, points, title, path, basemap_dir
+            )
+        except (JobError, RuntimeError) as e:
+            await loading_message.edit(content=f"❌ {e}")
+            return
+        await loading_message.delete()
+        prune_map_cache(cache_dir)
+
+    await ctx.send(file=discord.File(path, filename="nodemap.png"))
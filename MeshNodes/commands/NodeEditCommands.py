@@ -1,6 +1,30 @@
 import os
 import json
-from MeshNodes.shared.ParsingTools import filter_node_ids_length, parse_csv_string
+import asyncio
+from MeshNodes.shared.Validation import compile_validator, validate_csv_chunk
+from MeshNodes.shared.JobManager import JobError
+from MeshNodes.shared.Maintenance import optimize, timed
+from MeshNodes.shared.NodeJournal import record_change, record_changes
+from MeshNodes.shared.NodeRecord import (
+    NodeConflict,
+    fetch_node,
+    insert_node,
+    update_node,
+    transfer_nodes,
+    format_bulk_result,
+)
+from MeshNodes.shared.ParsingTools import parse_node_id_list, split_csv_records
+from MeshNodes.shared.Queries import execute_many
+from MeshNodes.shared.QuestionnaireSessions import (
+    QuestionnaireSession,
+    delete_session,
+    load_session,
+    parse_custom_id,
+    rebase_session,
+    save_session,
+    set_session_message,
+    start_session,
+)
 import discord
 
 from discord.ui import Button, View, Modal, TextInput, Select
@@ -10,16 +34,15 @@ from MeshNodes.shared.AdditionalNodeInfo import (
     BooleanQuestion,
     NumberQuestion,
     ChoiceQuestion,
-    additional_info_questions,
 )
 
 async def import_csv(mesh_nodes, ctx, user: discord.User = None):
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
 
     if not user:
         user = ctx.author
     
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
@@ -34,56 +57,79 @@ async def import_csv(mesh_nodes, ctx, user: discord.User = None):
     # respond with the content of the CSV file
     csv_content = await csv_attachment.read()
     csv_string = csv_content.decode('utf-8')
-    parsed_data = parse_csv_string(csv_string)
-    filtered_data = filter_node_ids_length(parsed_data)
 
-    # Insert or overwrite into database
+    # Parsing and validation run in the worker pool. The file is only cut into chunks of whole records here,
+    # so each worker gets and parses just its own chunk, and !jobs can show progress
+    questions = mesh_nodes.get_questions(ctx.guild)
     try:
-        with mesh_nodes.connect_db() as conn:
+        header, chunks = split_csv_records(csv_string, mesh_nodes.jobs.max_workers)
+        results = await mesh_nodes.jobs.map(
+            ctx.guild,
+            "validate import",
+            ctx.author.id,
+            validate_csv_chunk,
+            [(header, chunk, first_record, questions) for first_record, chunk in chunks],
+        )
+    except (ValueError, JobError) as e:
+        await loading_message.edit(content=f"❌ Failed to import CSV: {e}")
+        return
+    total_rows = sum(rows for rows, _, _ in results)
+    valid_rows = [row for _, valid, _ in results for row in valid]
+    invalid_rows = [row for _, _, invalid in results for row in invalid]
+
+    # Insert or update in place, keeping the original registration timestamp; history lives in the change journal
+    def write():
+        with mesh_nodes.connect_db(ctx.guild) as conn:
             cursor = conn.cursor()
-            for entry in filtered_data:
-                # Map core fields
-                node_id = entry["node_id"].strip().upper()
-                discord_id = entry["discord_id"].strip()
-                short_name = entry["short_name"].strip()
-                long_name = entry["long_name"].strip()
-
-                # All other fields go into JSON
-                extra_fields = {
-                    k: v for k, v in entry.items()
-                    if k not in ("node_id", "discord_id", "short_name", "long_name")
-                }
-
-                cursor.execute(
-                    """
-                    INSERT OR REPLACE INTO nodes
-                    (node_id, discord_id, short_name, long_name, additional_node_data_json)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        node_id,
-                        discord_id,
-                        short_name,
-                        long_name,
-                        json.dumps(extra_fields),
-                    ),
-                )
+            execute_many(
+                cursor,
+                "upsert_node",
+                [
+                    (node_id, discord_id, short_name, long_name, json.dumps(answers))
+                    for node_id, discord_id, short_name, long_name, answers in valid_rows
+                ],
+            )
+            record_changes(cursor, [row[0] for row in valid_rows], "import", ctx.author.id)
             conn.commit()
-        await loading_message.edit(
-            content=f"✅ Imported {len(filtered_data)} nodes (from {len(parsed_data)} total rows)."
-        )
+            # A bulk import can change what the query planner should know about the nodes table
+            return timed(conn, "optimize", mesh_nodes.partition_for(ctx.guild), optimize)
+
+    try:
+        mesh_nodes.record_maintenance(await asyncio.to_thread(write))
+        # Only the imported rows changed, so update just those instead of rescanning the whole table on the loop
+        node_index = mesh_nodes.get_node_index(ctx.guild)
+        for node_id, discord_id, short_name, long_name, _ in valid_rows:
+            node_index.upsert(node_id, discord_id, short_name, long_name)
+
+        content = f"✅ Imported {len(valid_rows)} nodes (from {total_rows} total rows)."
+        if invalid_rows:
+            content += f"\n⚠️ Skipped {len(invalid_rows)} invalid rows:"
+            for row_number, errors in invalid_rows[:10]:
+                content += f"\nRow {row_number}: {'; '.join(errors)}"
+            if len(invalid_rows) > 10:
+                content += f"\n...and {len(invalid_rows) - 10} more."
+        await loading_message.edit(content=content[:2000])
     except Exception as e:
         await loading_message.edit(content=f"❌ Failed to import CSV: {e}")
 
 
+def short_name_taken_message(node_index, short_name: str, long_name: str, taken_by: list[str]) -> str:
+    """Rejects a short name that's already in use, suggesting free ones based on the long name."""
+    message = f"❌ Short name `{short_name}` is already used by {', '.join(f'`{node_id}`' for node_id in taken_by[:5])}."
+    suggestions = node_index.suggest_short_names(long_name)
+    if suggestions:
+        message += f" Free short names: {', '.join(f'`{suggestion}`' for suggestion in suggestions)}."
+    return message
+
+
 async def register_node(mesh_nodes, ctx, user: discord.User = None):
     """Send a Discord Modal to a user's DMs to fill out node info (node_id, short_name, long_name)."""
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
 
     if not user:
         user = ctx.author
 
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
@@ -106,26 +152,31 @@ async def register_node(mesh_nodes, ctx, user: discord.User = None):
             if raw_node_id.startswith("!"):
                 raw_node_id = raw_node_id[1:]
             node_id_val = raw_node_id.upper()
-            # Check if node already exists
+            # Two nodes with one short name make "who has XYZ?" ambiguous on the mesh; checked against the in-memory index
+            node_index = mesh_nodes.get_node_index(ctx.guild)
+            taken_by = node_index.short_name_users(self.short_name.value, node_id_val)
+            if taken_by:
+                await interaction.response.send_message(
+                    short_name_taken_message(node_index, self.short_name.value.strip(), self.long_name.value, taken_by),
+                    ephemeral=True,
+                )
+                return
+            # A single insert that fails if the Node ID is taken, so two people can't register the same node at once
             try:
-                with self_view.cog.connect_db() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT 1 FROM nodes WHERE UPPER(node_id) = ?", (node_id_val.upper(),))
-                    exists = cursor.fetchone()
-                    if exists:
-                        await interaction.response.send_message(
-                            f"❌ Node with ID `{node_id_val}` already exists in the database. Please use a different Node ID or use `!editnodeinfo` to update.",
-                            ephemeral=True,
-                        )
-                        return
-                    cursor.execute(
-                        "INSERT INTO nodes (node_id, discord_id, short_name, long_name, additional_node_data_json) VALUES (?, ?, ?, ?, ?)",
-                        (node_id_val, str(user.id), self.short_name.value.strip(), self.long_name.value.strip(), "{}"),
+                with self_view.cog.connect_db(ctx.guild) as conn:
+                    node = insert_node(
+                        conn, node_id_val, user.id, self.short_name.value.strip(), self.long_name.value.strip()
                     )
+                    record_change(conn.cursor(), node.node_id, "register", interaction.user.id)
                     conn.commit()
+                node_index.upsert(node.node_id, node.owner_id, node.short_name, node.long_name)
                 await interaction.response.send_message("✅ Node paperwork submitted and saved!", ephemeral=True)
                 # Call edit_additional_node_info after successful registration
-                await edit_additional_node_info(mesh_nodes, ctx, node_id_val, is_automatic_edit=True)
+                await edit_additional_node_info(mesh_nodes, ctx, node.node_id, is_automatic_edit=True, version=node.version)
+            except NodeConflict as e:
+                await interaction.response.send_message(
+                    f"❌ {e} Please use a different Node ID or use `!editnodeinfo` to update.", ephemeral=True
+                )
             except Exception as e:
                 await interaction.response.send_message(f"❌ Failed to save node: {e}", ephemeral=True)
 
@@ -149,7 +200,9 @@ async def register_node(mesh_nodes, ctx, user: discord.User = None):
 
     try:
         dm = await user.create_dm()
-        await dm.send("Please click the button below to fill out the node paperwork form:", view=PaperworkButtonView())
+        await mesh_nodes.outbound.send(
+            dm, content="Please click the button below to fill out the node paperwork form:", view=PaperworkButtonView()
+        )
         await loading_message.edit(content="📬 Button sent! Check your DMs and click the button to fill out the form. 💌")
     except discord.Forbidden:
         await loading_message.edit(content="❌ I couldn't DM you! Please enable DMs from server members.")
@@ -159,69 +212,96 @@ async def register_node(mesh_nodes, ctx, user: discord.User = None):
 
 async def transfer_node(mesh_nodes, ctx, node_id: str, new_owner: discord.User):
     """
-    Transfer ownership of a node you own to another user.
-    Usage: !transfer <node_id> @username
+    Transfer ownership of one, several or all of your nodes to another user.
+    Usage: !transfer <node_id|node_id,node_id,...|all> @username
     """
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
 
     node_id = node_id.strip().upper()
+    if node_id == "ALL" or "," in node_id:
+        await _transfer_many(mesh_nodes, ctx, loading_message, node_id, new_owner)
+        return
     if len(node_id) != 8:
         await loading_message.edit(content="Node ID must be exactly 8 characters.")
         return
 
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
 
     try:
-        with mesh_nodes.connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT discord_id FROM nodes WHERE UPPER(node_id) = ?", (node_id.upper(),))
-            row = cursor.fetchone()
-            if not row:
-                await loading_message.edit(content=f"No node found with ID `{node_id}`.")
-                return
-            owner_id = row[0]
-            if str(ctx.author.id) != str(owner_id):
-                await loading_message.edit(content="You do not own this node.")
-                return
-            cursor.execute("UPDATE nodes SET discord_id = ? WHERE UPPER(node_id) = ?", (str(new_owner.id), node_id.upper()))
+        # Ownership check and transfer in one statement
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            node = update_node(conn, node_id, owner_id=ctx.author.id, discord_id=new_owner.id)
+            record_change(conn.cursor(), node.node_id, "transfer", ctx.author.id)
             conn.commit()
+        mesh_nodes.get_node_index(ctx.guild).upsert(node.node_id, node.owner_id, node.short_name, node.long_name)
         await loading_message.edit(content=f"✅ Node `{node_id}` ownership transferred to {new_owner.mention}.")
+    except NodeConflict as e:
+        await loading_message.edit(content=str(e))
     except Exception as e:
         await loading_message.edit(content=f"❌ Failed to transfer node: {e}")
 
 
+async def _transfer_many(mesh_nodes, ctx, loading_message, node_ids: str, new_owner: discord.User):
+    """Bulk !transfer: every listed node the author owns moves in one UPDATE, with one summary reply."""
+    if node_ids == "ALL":
+        node_ids, invalid = None, []
+    else:
+        node_ids, invalid = parse_node_id_list(node_ids)
+        if not node_ids:
+            await loading_message.edit(content="Give node IDs separated by commas, or `all`.")
+            return
+
+    db_path = mesh_nodes.get_db_path(ctx.guild)
+    if not os.path.exists(db_path):
+        await loading_message.edit(content="Database not initialized.")
+        return
+
+    try:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            done, missing, not_owned = transfer_nodes(conn, node_ids, ctx.author.id, new_owner.id)
+            record_changes(conn.cursor(), [node.node_id for node in done], "transfer", ctx.author.id)
+            conn.commit()
+    except Exception as e:
+        await loading_message.edit(content=f"❌ Failed to transfer nodes: {e}")
+        return
+
+    node_index = mesh_nodes.get_node_index(ctx.guild)
+    for node in done:
+        node_index.upsert(node.node_id, node.owner_id, node.short_name, node.long_name)
+    summary = f"Transferred {len(done)} node{'s' if len(done) != 1 else ''} to {new_owner.mention}"
+    await loading_message.edit(content=format_bulk_result(summary, done, missing, not_owned, invalid))
+
+
 async def edit_node(mesh_nodes, ctx, node_id: str):
     """
     Edit the short and/or long name of a node you own by Node ID (must be exactly 8 characters).
     """
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
 
     node_id = node_id.strip().upper()
     if len(node_id) != 8:
         await loading_message.edit(content="Node ID must be exactly 8 characters.")
         return
 
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
 
     # Check ownership
     try:
-        with mesh_nodes.connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT short_name, long_name, discord_id FROM nodes WHERE UPPER(node_id) = ?", (node_id.upper(),))
-            row = cursor.fetchone()
-            if not row:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            node = fetch_node(conn, node_id)
+            if not node:
                 await loading_message.edit(content=f"No node found with ID `{node_id}`.")
                 return
-            short_name, long_name, owner_id = row
-            if str(ctx.author.id) != str(owner_id):
+            if not node.is_owned_by(ctx.author.id):
                 await loading_message.edit(content="You do not own this node.")
                 return
+            short_name, long_name, version = node.short_name, node.long_name, node.version
     except Exception as e:
         await loading_message.edit(content=f"Database error: {e}")
         return
@@ -248,27 +328,33 @@ async def edit_node(mesh_nodes, ctx, node_id: str):
             self.add_item(self.long_name)
 
         async def on_submit(self, interaction: discord.Interaction):
-            updates = []
-            params = []
+            updates = {}
             if self.short_name.value.strip():
-                updates.append("short_name = ?")
-                params.append(self.short_name.value.strip())
+                updates["short_name"] = self.short_name.value.strip()
             if self.long_name.value.strip():
-                updates.append("long_name = ?")
-                params.append(self.long_name.value.strip())
+                updates["long_name"] = self.long_name.value.strip()
             if not updates:
                 await interaction.response.send_message("No changes provided. Node not updated.", ephemeral=True)
                 return
-            params.append(node_id)
-            try:
-                with self_view.cog.connect_db() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        f"UPDATE nodes SET {', '.join(updates)} WHERE UPPER(node_id) = ?",
-                        params[:-1] + [node_id.upper()],
+            if "short_name" in updates:
+                node_index = mesh_nodes.get_node_index(ctx.guild)
+                taken_by = node_index.short_name_users(updates["short_name"], node_id)
+                if taken_by:
+                    long_name_val = updates.get("long_name", long_name)
+                    await interaction.response.send_message(
+                        short_name_taken_message(node_index, updates["short_name"], long_name_val, taken_by), ephemeral=True
                     )
+                    return
+            try:
+                # Only applies if the node is still the author's and unchanged since the form was sent
+                with self_view.cog.connect_db(ctx.guild) as conn:
+                    node = update_node(conn, node_id, ctx.author.id, version, **updates)
+                    record_change(conn.cursor(), node.node_id, "edit", interaction.user.id)
                     conn.commit()
+                mesh_nodes.get_node_index(ctx.guild).upsert(node.node_id, node.owner_id, node.short_name, node.long_name)
                 await interaction.response.send_message("✅ Node updated successfully!", ephemeral=True)
+            except NodeConflict as e:
+                await interaction.response.send_message(f"❌ {e}", ephemeral=True)
             except Exception as e:
                 await interaction.response.send_message(f"❌ Failed to update node: {e}", ephemeral=True)
 
@@ -294,7 +380,9 @@ async def edit_node(mesh_nodes, ctx, node_id: str):
 
     try:
         dm = await ctx.author.create_dm()
-        await dm.send(f"Click the button below to edit your node `{node_id}`:", view=EditNodeButtonView(short_name, long_name))
+        await mesh_nodes.outbound.send(
+            dm, content=f"Click the button below to edit your node `{node_id}`:", view=EditNodeButtonView(short_name, long_name)
+        )
         await loading_message.edit(content="📬 Button sent! Check your DMs and click the button to edit your node. 💌")
     except discord.Forbidden:
         await loading_message.edit(content="❌ I couldn't DM you! Please enable DMs from server members.")
@@ -302,128 +390,286 @@ async def edit_node(mesh_nodes, ctx, node_id: str):
         await loading_message.edit(content=f"❌ Failed to send DM: {e}")
 
 
-class QuestionView(View):
-    def __init__(self, ctx, question, finish_callback):
-        super().__init__(timeout=60)
-        self.ctx = ctx
-        self.question = question
-        self.finish_callback = finish_callback
-        self.answer = None
+# Answers to these questions mark a node as mobile, which hides the questions flagged hide_if_mobile
+MOBILE_ANSWERS = {"node_type": {"Pocket", "Vehicle"}, "node_role": {"Client_Mute"}}
+
+TEXT_INPUTS_PER_MODAL = 5  # Discord's limit of components per modal
+ROWS_PER_MESSAGE = 5  # Discord's limit of action rows per message
+
+QUESTIONNAIRE_EXPIRED = "⌛ This questionnaire has expired. Nothing was saved. Start again with `!editnodeinfo <node_id>`."
+
+
+def is_mobile_node(data: dict) -> bool:
+    return any(data.get(json_name) in answers for json_name, answers in MOBILE_ANSWERS.items())
+
+
+def _chunk(items: list, size: int) -> list[list]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def visible_questions(session: QuestionnaireSession, questions: list[AdditionalInfoQuestion]):
+    is_mobile = is_mobile_node(session.current_data())
+    return [q for q in questions if not (is_mobile and q.hide_if_mobile)]
+
+
+def _text_chunks(visible: list[AdditionalInfoQuestion]) -> list[list]:
+    return _chunk([q for q in visible if isinstance(q, (StringQuestion, NumberQuestion))], TEXT_INPUTS_PER_MODAL)
+
+
+class QuestionnaireComponents(View):
+    """
+    The components of a questionnaire message. They are only rendered: every click is routed by its custom ID to
+    handle_questionnaire_interaction, so discord.py doesn't keep this view around for the message.
+    """
 
-        if isinstance(question, ChoiceQuestion):
-            select = Select(
-                placeholder=question.question,
-                options=[discord.SelectOption(label=choice, value=choice) for choice in question.choices],
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    def is_finished(self) -> bool:
+        return True
+
+
+class QuestionnaireModal(Modal):
+    """Up to five string/number questions; submitted like the components, by custom ID."""
+
+    def __init__(self, session: QuestionnaireSession, index: int, questions: list[AdditionalInfoQuestion]):
+        super().__init__(title=f"Node {session.node_id} Details", custom_id=session.custom_id(f"modal_{index}"))
+        data = session.current_data()
+        for q in questions:
+            current = data.get(q.json_name)
+            self.add_item(
+                TextInput(
+                    label=q.human_name[:45],
+                    placeholder=q.question[:100],
+                    default=str(current) if current not in (None, "") else None,
+                    required=False,
+                    max_length=q.max_length if isinstance(q, StringQuestion) else len(str(q.max_value)),
+                    custom_id=q.json_name,
+                )
             )
-            select.callback = self.on_select
-            self.add_item(select)
-
-        elif isinstance(question, BooleanQuestion):
-            yes_btn = Button(label="Yes", style=discord.ButtonStyle.green)
-            no_btn = Button(label="No", style=discord.ButtonStyle.red)
-            yes_btn.callback = self.make_choice(True)
-            no_btn.callback = self.make_choice(False)
-            self.add_item(yes_btn)
-            self.add_item(no_btn)
-
-        elif isinstance(question, (StringQuestion, NumberQuestion)):
-            input_btn = Button(label="Enter Answer", style=discord.ButtonStyle.blurple)
-            input_btn.callback = self.open_modal
-            self.add_item(input_btn)
-
-        skip_btn = Button(label="Skip", style=discord.ButtonStyle.gray)
-        skip_btn.callback = self.skip
-        self.add_item(skip_btn)
-
-    async def on_select(self, interaction: discord.Interaction):
-        self.answer = interaction.data["values"][0]
-        await self.finish(interaction)
-
-    def make_choice(self, value):
-        async def inner(interaction: discord.Interaction):
-            self.answer = value
-            await self.finish(interaction)
-
-        return inner
-
-    async def open_modal(self, interaction: discord.Interaction):
-        class InputModal(Modal, title=self.question.human_name):
-            user_input = TextInput(label=self.question.question[:45])
-
-            async def on_submit(modal_self, interaction: discord.Interaction):
-                val = modal_self.user_input.value.strip()
-                if isinstance(self.question, NumberQuestion):
-                    try:
-                        val = int(val)
-                        if not (self.question.min_value <= val <= self.question.max_value):
-                            raise ValueError
-                    except:
-                        await interaction.response.send_message("Invalid number input.", ephemeral=True)
-                        return
-                elif isinstance(self.question, StringQuestion):
-                    if not (self.question.min_length <= len(val) <= self.question.max_length):
-                        await interaction.response.send_message("Input length out of bounds.", ephemeral=True)
-                        return
-
-                self.answer = val
-                # Respond to the modal interaction so Discord doesn't error
-                await interaction.response.send_message("Answer received!", ephemeral=True)
-                await self.finish(interaction)
-
-        await interaction.response.send_modal(InputModal())
-
-    async def skip(self, interaction: discord.Interaction):
-        self.answer = None
-        await self.finish(interaction)
-
-    async def finish(self, interaction: discord.Interaction):
-        await interaction.message.delete()
-        await self.finish_callback(self.answer)
+
+    def is_finished(self) -> bool:
+        return True
+
+
+def render_questionnaire(session: QuestionnaireSession, questions: list[AdditionalInfoQuestion], errors=()):
+    """
+    The content and components of a questionnaire message. Choice and boolean questions are Selects (paged,
+    several per message) and string/number questions are collected in multi-field modals.
+    """
+    view = QuestionnaireComponents()
+    visible = visible_questions(session, questions)
+    select_questions = [q for q in visible if isinstance(q, (ChoiceQuestion, BooleanQuestion))]
+    text_chunks = _text_chunks(visible)
+
+    # Selects take a whole row each, buttons share the remaining rows five at a time
+    button_count = len(text_chunks) + 2
+    selects_per_page = ROWS_PER_MESSAGE - (button_count + 4) // 5
+    if len(select_questions) > selects_per_page:
+        button_count += 2
+        selects_per_page = ROWS_PER_MESSAGE - (button_count + 4) // 5
+    pages = _chunk(select_questions, selects_per_page) or [[]]
+    session.page = max(0, min(session.page, len(pages) - 1))
+
+    data = session.current_data()
+    for row, q in enumerate(pages[session.page]):
+        current = data.get(q.json_name)
+        if isinstance(q, BooleanQuestion):
+            options = [
+                discord.SelectOption(label="Yes", value="yes", default=current is True),
+                discord.SelectOption(label="No", value="no", default=current is False),
+            ]
+        else:
+            options = [discord.SelectOption(label=choice, value=choice, default=current == choice) for choice in q.choices]
+        custom_id = session.custom_id(f"q_{q.json_name}")
+        view.add_item(Select(custom_id=custom_id, placeholder=f"{q.human_name}: {q.question}"[:150], options=options, row=row))
+
+    button_row = len(pages[session.page])
+    buttons = []
+    if len(pages) > 1:
+        buttons.append(Button(label="◀ Previous", custom_id=session.custom_id("prev"), disabled=session.page == 0))
+        buttons.append(Button(label="Next ▶", custom_id=session.custom_id("next"), disabled=session.page == len(pages) - 1))
+    for index in range(len(text_chunks)):
+        label = "Enter Details" if len(text_chunks) == 1 else f"Enter Details ({index + 1}/{len(text_chunks)})"
+        buttons.append(Button(label=label, style=discord.ButtonStyle.blurple, custom_id=session.custom_id(f"details_{index}")))
+    buttons.append(Button(label="Save", style=discord.ButtonStyle.green, custom_id=session.custom_id("save")))
+    buttons.append(Button(label="Discard", style=discord.ButtonStyle.gray, custom_id=session.custom_id("discard")))
+    for index, button in enumerate(buttons):
+        button.row = button_row + index // 5
+        view.add_item(button)
+
+    lines = [f"**Additional info for node `{session.node_id}`** (page {session.page + 1}/{len(pages)})"]
+    lines.append("Answer what you like, skip the rest, then press **Save**. Lost this message? Use `!paperwork resume`.")
+    for q in visible:
+        value = data.get(q.json_name)
+        if isinstance(value, bool):
+            value = "Yes" if value else "No"
+        lines.append(f"{'✅' if value not in (None, '') else '▫️'} {q.human_name}: {value if value not in (None, '') else '—'}")
+    for error in errors:
+        lines.append(f"⚠️ {error}")
+    return "\n".join(lines), view
+
+
+def _modal_values(components: list) -> dict:
+    """custom_id -> value of the text inputs in a modal submission."""
+    values = {}
+    for component in components:
+        children = component.get("components") or ([component["component"]] if "component" in component else [component])
+        for child in children:
+            if "custom_id" in child and "value" in child:
+                values[child["custom_id"]] = child["value"]
+    return values
+
+
+async def retire_questionnaire_message(mesh_nodes, channel_id, message_id, content: str):
+    """Replaces a questionnaire message that can't be answered anymore, if it's still there."""
+    if not channel_id or not message_id:
+        return
+    message = mesh_nodes.bot.get_partial_messageable(channel_id).get_partial_message(message_id)
+    try:
+        await mesh_nodes.outbound.edit(message, content=content, view=None)
+    except discord.HTTPException:
+        pass
+
+
+async def send_questionnaire(mesh_nodes, dm, guild, session: QuestionnaireSession):
+    """Sends a session's questionnaire as a new DM message, which its components then edit in place."""
+    content, view = render_questionnaire(session, mesh_nodes.get_questions(guild))
+    previous = (session.channel_id, session.message_id)
+    message = await mesh_nodes.outbound.send(dm, content=content, view=view)
+    with mesh_nodes.connect_db(guild) as conn:
+        set_session_message(conn, session, message.channel.id, message.id)
+    return previous
+
+
+async def handle_questionnaire_interaction(mesh_nodes, interaction: discord.Interaction):
+    """Answers, page turns, modals, saving and discarding for every questionnaire, loaded from its session row."""
+    guild_id, session_id, action = parse_custom_id(interaction.data["custom_id"])
+    guild = discord.Object(id=guild_id) if guild_id else None
+    sessions = mesh_nodes.get_questionnaire_sessions(guild)
+    session = None
+    if sessions.is_live(session_id):
+        with mesh_nodes.connect_db(guild) as conn:
+            session = load_session(conn, session_id)
+    if session is None:
+        sessions.remove(session_id)
+        await interaction.response.edit_message(content=QUESTIONNAIRE_EXPIRED, view=None)
+        return
+    if interaction.user.id != session.user_id:
+        await interaction.response.send_message("❌ This questionnaire isn't yours.", ephemeral=True)
+        return
+
+    questions = mesh_nodes.get_questions(guild)
+    by_name = {q.json_name: q for q in questions}
+    errors = []
+    if action.startswith("details_"):
+        text_chunks = _text_chunks(visible_questions(session, questions))
+        index = int(action.removeprefix("details_"))
+        if index < len(text_chunks):
+            await interaction.response.send_modal(QuestionnaireModal(session, index, text_chunks[index]))
+            return
+    elif action.startswith("q_") and action.removeprefix("q_") in by_name:
+        q = by_name[action.removeprefix("q_")]
+        try:
+            session.answers[q.json_name] = compile_validator(q)(interaction.data["values"][0])
+        except ValueError as e:
+            errors.append(f"{q.human_name}: {e}.")
+    elif action.startswith("modal_"):
+        for json_name, value in _modal_values(interaction.data.get("components", [])).items():
+            q = by_name.get(json_name)
+            if q is None:
+                continue
+            try:
+                val = compile_validator(q)(value)
+            except ValueError as e:
+                errors.append(f"{q.human_name}: {e}.")
+                continue
+            if val is not None:
+                session.answers[q.json_name] = val
+    elif action in ("prev", "next"):
+        session.page += 1 if action == "next" else -1
+    elif action in ("save", "discard"):
+        await finish_questionnaire(mesh_nodes, interaction, guild, session, questions, save=action == "save")
+        return
+
+    with mesh_nodes.connect_db(guild) as conn:
+        content, view = render_questionnaire(session, questions, errors)
+        save_session(conn, session)
+    sessions.touch(session.session_id, session.expires_at)
+    await interaction.response.edit_message(content=content, view=view)
+
+
+async def finish_questionnaire(mesh_nodes, interaction, guild, session: QuestionnaireSession, questions, save: bool):
+    """
+    Writes the answers in one update (or drops them) and closes the session. If the node was edited elsewhere
+    meanwhile, the session stays open on the node's current info so the answers can be reviewed and saved again.
+    """
+    content = "🗑️ Questionnaire discarded. Nothing was saved."
+    sessions = mesh_nodes.get_questionnaire_sessions(guild)
+    with mesh_nodes.connect_db(guild) as conn:
+        if save:
+            visible = {q.json_name for q in visible_questions(session, questions)}
+            result_json = {k: v for k, v in session.answers.items() if v is not None and k in visible}
+            merged_data = {**session.existing, **result_json}
+            try:
+                # Raises NodeConflict if the node was edited elsewhere while the questionnaire was open
+                node = update_node(
+                    conn, session.node_id, session.owner_id, session.version, additional_node_data_json=json.dumps(merged_data)
+                )
+                record_change(conn.cursor(), node.node_id, "additional_info", session.user_id)
+                conn.commit()
+                content = "✅ Additional node info updated successfully!"
+            except NodeConflict as e:
+                conn.rollback()
+                content = f"❌ {e}"
+                node = fetch_node(conn, session.node_id)
+                if node is not None and (session.owner_id is None or node.is_owned_by(session.owner_id)):
+                    rebase_session(conn, session, node.version, node.data)
+                    sessions.touch(session.session_id, session.expires_at)
+                    content = (
+                        "⚠️ This node was changed elsewhere while the questionnaire was open, so nothing was saved. "
+                        "Your answers are kept: run `!paperwork resume` to review them against the current info "
+                        "and save again."
+                    )
+                    await interaction.response.edit_message(content=content, view=None)
+                    return
+            except Exception as e:
+                conn.rollback()
+                content = f"❌ Failed to update additional node info: {e}"
+        delete_session(conn, session.session_id)
+    sessions.remove(session.session_id)
+    await interaction.response.edit_message(content=content, view=None)
 
 
-async def edit_additional_node_info(
-    mesh_nodes,
-    ctx,
-    node_id: str,
-    questions: list[AdditionalInfoQuestion] = additional_info_questions,
-    is_automatic_edit: bool = False,
-):
+async def edit_additional_node_info(mesh_nodes, ctx, node_id: str, is_automatic_edit: bool = False, version: int = None):
     if is_automatic_edit:
+        # Straight after registration: the caller passes the new node's version
         existing_data = {}
-        print("test")
+        owner_id = None
     else:
-        loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+        loading_message = mesh_nodes.send_loading_message(ctx)
 
         node_id = node_id.strip().upper()
         if len(node_id) != 8:
             await loading_message.edit(content="Node ID must be exactly 8 characters.")
             return
 
-        db_path = mesh_nodes.get_db_path()
+        db_path = mesh_nodes.get_db_path(ctx.guild)
         if not os.path.exists(db_path):
             await loading_message.edit(content="Database not initialized.")
             return
 
         # Check ownership and get current additional_node_data_json
         try:
-            with mesh_nodes.connect_db() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT short_name, long_name, discord_id, additional_node_data_json FROM nodes WHERE UPPER(node_id) = ?",
-                    (node_id.upper(),),
-                )
-                row = cursor.fetchone()
-                if not row:
+            with mesh_nodes.connect_db(ctx.guild) as conn:
+                node = fetch_node(conn, node_id)
+                if not node:
                     await loading_message.edit(content=f"No node found with ID `{node_id}`.")
                     return
-                short_name, long_name, owner_id, additional_node_data_json = row
-                if str(ctx.author.id) != str(owner_id):
+                if not node.is_owned_by(ctx.author.id):
                     await loading_message.edit(content="You do not own this node.")
                     return
-                try:
-                    existing_data = json.loads(additional_node_data_json) if additional_node_data_json else {}
-                except Exception:
-                    existing_data = {}
+                existing_data, owner_id, version = node.data, node.owner_id, node.version
         except Exception as e:
             await loading_message.edit(content=f"Database error: {e}")
             return
@@ -435,50 +681,56 @@ async def edit_additional_node_info(
             await loading_message.edit(content="❌ I couldn't DM you! Please enable DMs from server members.")
         return
 
-    if not is_automatic_edit:
-        await loading_message.edit(content="📬 Questions sent! Check your DMs and answer the questions. 💌")
-
-    answers = {}
-
-    async def handle_question(index: int, is_mobile_node: bool):
-        if index >= len(questions):
-            # Done: merge and update DB
-            result_json = {k: v for k, v in answers.items() if v is not None}
-            merged_data = {**existing_data, **result_json}
-            try:
-                with mesh_nodes.connect_db() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "UPDATE nodes SET additional_node_data_json = ? WHERE UPPER(node_id) = ?",
-                        (json.dumps(merged_data), node_id.upper()),
-                    )
-                    conn.commit()
-                await dm.send("✅ Additional node info updated successfully!")
-            except Exception as e:
-                await dm.send(f"❌ Failed to update additional node info: {e}")
-            return
+    # Starting a questionnaire replaces the author's unfinished one in this directory
+    guild_id = ctx.guild.id if ctx.guild else 0
+    with mesh_nodes.connect_db(ctx.guild) as conn:
+        session, replaced = start_session(conn, ctx.author.id, guild_id, node_id, owner_id, version, existing_data)
+    mesh_nodes.get_questionnaire_sessions(ctx.guild).add(session.session_id, session.user_id, session.expires_at)
+    if replaced:
+        await retire_questionnaire_message(
+            mesh_nodes, *replaced, "⏭️ Replaced by a newer questionnaire. Nothing was saved."
+        )
 
-        q = questions[index]
+    try:
+        await send_questionnaire(mesh_nodes, dm, ctx.guild, session)
+    except discord.Forbidden:
+        if not is_automatic_edit:
+            await loading_message.edit(content="❌ I couldn't DM you! Please enable DMs from server members.")
+        return
 
-        # Skip question if is_mobile_node and q.hide_if_mobile is True
-        if is_mobile_node and q.hide_if_mobile:
-            await handle_question(index + 1, is_mobile_node)
-            return
+    if not is_automatic_edit:
+        await loading_message.edit(content="📬 Questions sent! Check your DMs and answer the questions. 💌")
 
-        async def callback(answer):
-            nonlocal is_mobile_node
-            if answer is not None:
-                answers[q.json_name] = answer
-                if q.json_name == "node_type" and answer in ["Pocket", "Vehicle"]:
-                    is_mobile_node = True
-                if q.json_name == "node_role" and answer in ["Client_Mute"]:
-                    is_mobile_node = True
-            await handle_question(index + 1, is_mobile_node)
 
-        view = QuestionView(ctx, q, callback)
-        await dm.send(q.question, view=view)
+async def resume_questionnaire(mesh_nodes, ctx):
+    """
+    Re-send your unfinished additional info questionnaire as a new DM, with the answers given so far.
+    Usage: !paperwork resume
+    """
+    # This server's directory first, then any other one the author has a questionnaire open in
+    partitions = ([ctx.guild] if ctx.guild else []) + mesh_nodes.all_partitions()
+    for guild in partitions:
+        session_id = mesh_nodes.get_questionnaire_sessions(guild).session_of(ctx.author.id)
+        if session_id is None or not mesh_nodes.get_questionnaire_sessions(guild).is_live(session_id):
+            continue
+        with mesh_nodes.connect_db(guild) as conn:
+            session = load_session(conn, session_id)
+        if session is not None:
+            break
+    else:
+        await ctx.send("You have no unfinished questionnaire. Start one with `!editnodeinfo <node_id>`.")
+        return
 
-    await handle_question(0, False)
+    session_guild = discord.Object(id=session.guild_id) if session.guild_id else None
+    try:
+        dm = await ctx.author.create_dm()
+        previous = await send_questionnaire(mesh_nodes, dm, session_guild, session)
+    except discord.Forbidden:
+        await ctx.send("❌ I couldn't DM you! Please enable DMs from server members.")
+        return
+    await retire_questionnaire_message(mesh_nodes, *previous, "⏩ Continued in a newer message below.")
+    if ctx.guild is not None:
+        await ctx.send(f"📬 Your questionnaire for node `{session.node_id}` is back in your DMs. 💌")
 
 
 class ConfirmClearView(View):
@@ -509,31 +761,29 @@ async def clear_additional_node_info(mesh_nodes, ctx, node_id: str):
     Clear the additional_node_data_json for a node you own.
     Usage: !clear_additional <node_id>
     """
-    loading_message = await ctx.send(mesh_nodes.get_random_loading_message())
+    loading_message = mesh_nodes.send_loading_message(ctx)
 
     node_id = node_id.strip().upper()
     if len(node_id) != 8:
         await loading_message.edit(content="Node ID must be exactly 8 characters.")
         return
 
-    db_path = mesh_nodes.get_db_path()
+    db_path = mesh_nodes.get_db_path(ctx.guild)
     if not os.path.exists(db_path):
         await loading_message.edit(content="Database not initialized.")
         return
 
     # Check ownership
     try:
-        with mesh_nodes.connect_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT discord_id FROM nodes WHERE UPPER(node_id) = ?", (node_id.upper(),))
-            row = cursor.fetchone()
-            if not row:
+        with mesh_nodes.connect_db(ctx.guild) as conn:
+            node = fetch_node(conn, node_id)
+            if not node:
                 await loading_message.edit(content=f"No node found with ID `{node_id}`.")
                 return
-            owner_id = row[0]
-            if str(ctx.author.id) != str(owner_id):
+            if not node.is_owned_by(ctx.author.id):
                 await loading_message.edit(content="You do not own this node.")
                 return
+            version = node.version
     except Exception as e:
         await loading_message.edit(content=f"Database error: {e}")
         return
@@ -548,13 +798,13 @@ async def clear_additional_node_info(mesh_nodes, ctx, node_id: str):
 
     async def on_confirm(interaction):
         try:
-            with mesh_nodes.connect_db() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE nodes SET additional_node_data_json = ? WHERE UPPER(node_id) = ?", ("{}", node_id.upper())
-                )
+            with mesh_nodes.connect_db(ctx.guild) as conn:
+                node = update_node(conn, node_id, ctx.author.id, version, additional_node_data_json="{}")
+                record_change(conn.cursor(), node.node_id, "clear_info", interaction.user.id)
                 conn.commit()
             await interaction.response.send_message("✅ Additional node info cleared.", ephemeral=True)
+        except NodeConflict as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(f"❌ Failed to clear additional node info: {e}", ephemeral=True)
         await interaction.message.delete()
@@ -564,4 +814,6 @@ async def clear_additional_node_info(mesh_nodes, ctx, node_id: str):
         await interaction.message.delete()
 
     view = ConfirmClearView(on_confirm, on_cancel)
-    await dm.send(f"Are you sure you want to clear all additional info for node `{node_id}`?", view=view)
+    await mesh_nodes.outbound.send(
+        dm, content=f"Are you sure you want to clear all additional info for node `{node_id}`?", view=view
+    )
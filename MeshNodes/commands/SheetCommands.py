@@ -0,0 +1,78 @@
+import os
+import discord
+
+SHEET_BACKENDS = ["none", "google", "file"]
+
+
+async def sheet_sync_now(mesh_nodes, ctx, mode: str = None):
+    """
+    Push pending changes to the configured spreadsheet right away.
+    Usage: !sheetsync [full]
+    """
+    if ctx.author.id not in mesh_nodes.database_admin_ids:
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    if not os.path.exists(mesh_nodes.get_db_path()):
+        await ctx.send("Database not initialized.")
+        return
+
+    loading_message = mesh_nodes.send_loading_message(ctx, "Syncing nodes to the spreadsheet... 📊")
+    try:
+        result = await mesh_nodes.run_sheet_sync(full=(mode or "").lower() == "full")
+    except Exception as e:
+        await loading_message.edit(content=f"❌ Sheet sync failed: {e}")
+        return
+
+    if result is None:
+        await loading_message.edit(content="Sheet sync is disabled. Set a backend with `!sheetset backend <google|file>`.")
+        return
+    if result.skipped:
+        await loading_message.edit(content="✅ Spreadsheet is already up to date.")
+        return
+
+    embed = discord.Embed(title="Sheet Sync", color=discord.Color.green())
+    embed.add_field(name="Mode", value="Full" if result.full_resync else "Incremental", inline=True)
+    embed.add_field(name="Requests", value=str(result.requests), inline=True)
+    embed.add_field(name="Changed", value=str(result.changed), inline=True)
+    embed.add_field(name="Added", value=str(result.added), inline=True)
+    embed.add_field(name="Removed", value=str(result.removed), inline=True)
+    embed.add_field(name="Ranges", value=str(len(result.ranges)), inline=True)
+    await loading_message.edit(content=None, embed=embed)
+
+
+async def sheet_settings(mesh_nodes, ctx, setting: str = None, value: str = None):
+    """
+    Show or change the spreadsheet sync settings.
+    Usage: !sheetset [backend|id|tab|credentials] [value]
+    """
+    if ctx.author.id not in mesh_nodes.database_admin_ids:
+        await ctx.send("You do not have permission to perform this action.")
+        return
+
+    settings = {
+        "backend": mesh_nodes.config.sheet_backend,
+        "id": mesh_nodes.config.sheet_id,
+        "tab": mesh_nodes.config.sheet_name,
+        "credentials": mesh_nodes.config.credentials_path,
+    }
+
+    if setting is None:
+        embed = discord.Embed(title="Sheet Sync Settings", color=discord.Color.blue())
+        for name, config_value in settings.items():
+            embed.add_field(name=name, value=f"`{await config_value() or 'not set'}`", inline=True)
+        await ctx.send(embed=embed)
+        return
+
+    setting = setting.lower()
+    if setting not in settings or value is None:
+        await ctx.send("Usage: `!sheetset [backend|id|tab|credentials] [value]`")
+        return
+    if setting == "backend" and value.lower() not in SHEET_BACKENDS:
+        await ctx.send(f"Backend must be one of: {', '.join(SHEET_BACKENDS)}")
+        return
+
+    await settings[setting].set(value.lower() if setting == "backend" else value)
+    # A different target sheet needs a full rewrite on the next sync
+    mesh_nodes.reset_sheet_sync_state()
+    await ctx.send(f"✅ Sheet `{setting}` set to `{value}`. The next sync will rewrite the whole sheet.")
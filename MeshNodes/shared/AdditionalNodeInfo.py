@@ -13,6 +13,8 @@ class AdditionalInfoQuestion:
 class StringQuestion(AdditionalInfoQuestion):
     min_length: int
     max_length: int
+    pattern: str = None  # optional regex the whole answer must match
+    format_hint: str = None  # what a matching answer looks like, for error messages
 
 
 @dataclass
@@ -79,6 +81,16 @@ additional_info_questions = [
         choices=["GPS", "Static", "No"],
         hide_if_mobile=False,
     ),
+    StringQuestion(
+        json_name="grid_square",
+        human_name="Grid Square",
+        question="Which Maidenhead grid square is the node in (e.g. EN34ha)? Used to place it on !nodemap.",
+        min_length=4,
+        max_length=8,
+        pattern=r"[A-Ra-r]{2}[0-9]{2}(?:[A-Xa-x]{2}(?:[0-9]{2})?)?",
+        format_hint="a grid square like EN34 or EN34ha",
+        hide_if_mobile=True,
+    ),
     ChoiceQuestion(
         json_name="power_source",
         human_name="Power Source",
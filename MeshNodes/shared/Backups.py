@@ -0,0 +1,155 @@
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from dataclasses import dataclass
+
+BACKUP_DIR_NAME = "backups"
+
+# Pages copied per backup step; the source is only locked while a step runs, so writers get a turn in between
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE = 0.005
+
+# How many snapshots to keep; older ones are deleted after each new backup
+BACKUP_RETENTION = 14
+
+SNAPSHOT_SUFFIX = ".db.gz"
+CHECKSUM_SUFFIX = ".sha256"
+
+
+@dataclass
+class Snapshot:
+    name: str
+    path: str
+    size: int
+    sha256: str
+    created: datetime
+    duration: float = 0.0
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_checksum(snapshot_path: str) -> str:
+    with open(snapshot_path + CHECKSUM_SUFFIX, "r", encoding="utf-8") as f:
+        return f.read().split()[0]
+
+
+def create_snapshot(db_path: str, backup_dir: str, label: str = "manual") -> Snapshot:
+    """
+    Copy the live database with SQLite's online backup API, a batch of pages at a time, then gzip it and
+    write a sha256 checksum next to it. Blocking: run it in a thread so the event loop keeps going.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    started = time.monotonic()
+    created = datetime.now(timezone.utc)
+    name = f"meshnodes-{created.strftime('%Y%m%d-%H%M%S')}-{label}{SNAPSHOT_SUFFIX}"
+    snapshot_path = os.path.join(backup_dir, name)
+    temp_path = os.path.join(backup_dir, f".{name}.tmp")
+
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(temp_path)
+    try:
+        with target:
+            source.backup(
+                target, pages=BACKUP_PAGES_PER_STEP, progress=lambda status, remaining, total: time.sleep(BACKUP_STEP_PAUSE)
+            )
+    finally:
+        target.close()
+        source.close()
+
+    try:
+        with open(temp_path, "rb") as raw, gzip.open(snapshot_path, "wb", compresslevel=6) as compressed:
+            shutil.copyfileobj(raw, compressed, 1024 * 1024)
+    finally:
+        os.remove(temp_path)
+
+    sha256 = _sha256_file(snapshot_path)
+    with open(snapshot_path + CHECKSUM_SUFFIX, "w", encoding="utf-8") as f:
+        f.write(f"{sha256}  {name}\n")
+
+    return Snapshot(name, snapshot_path, os.path.getsize(snapshot_path), sha256, created, time.monotonic() - started)
+
+
+def list_snapshots(backup_dir: str) -> list[Snapshot]:
+    """Snapshots in the backup directory, newest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if not name.endswith(SNAPSHOT_SUFFIX) or name.startswith("."):
+            continue
+        path = os.path.join(backup_dir, name)
+        try:
+            sha256 = _read_checksum(path)
+        except OSError:
+            sha256 = ""
+        created = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+        snapshots.append(Snapshot(name, path, os.path.getsize(path), sha256, created))
+    snapshots.sort(key=lambda snapshot: snapshot.name, reverse=True)
+    return snapshots
+
+
+def rotate_snapshots(backup_dir: str, keep: int = BACKUP_RETENTION) -> list[str]:
+    """Delete all but the newest `keep` snapshots. Returns the names removed."""
+    removed = []
+    for snapshot in list_snapshots(backup_dir)[keep:]:
+        for path in (snapshot.path, snapshot.path + CHECKSUM_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+        removed.append(snapshot.name)
+    return removed
+
+
+def find_snapshot(backup_dir: str, name: str):
+    """Look up a snapshot by name (or unique prefix) without allowing paths outside the backup directory."""
+    name = os.path.basename(name.strip())
+    matches = [snapshot for snapshot in list_snapshots(backup_dir) if snapshot.name == name or snapshot.name.startswith(name)]
+    exact = [snapshot for snapshot in matches if snapshot.name == name]
+    if exact:
+        return exact[0]
+    return matches[0] if len(matches) == 1 else None
+
+
+def remove_sidecar_files(db_path: str):
+    """Delete a database's WAL, shared-memory and rollback journal files, if any."""
+    for suffix in ("-wal", "-shm", "-journal"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def restore_snapshot(snapshot: Snapshot, db_path: str):
+    """
+    Verify a snapshot's checksum and integrity, then atomically swap it in place of the live database.
+    The decompressed copy is written next to the database so the final os.replace is a same-filesystem rename.
+    """
+    if not snapshot.sha256 or _sha256_file(snapshot.path) != snapshot.sha256:
+        raise ValueError(f"Checksum mismatch for `{snapshot.name}`; refusing to restore it.")
+
+    temp_path = f"{db_path}.restore-tmp"
+    try:
+        with gzip.open(snapshot.path, "rb") as compressed, open(temp_path, "wb") as raw:
+            shutil.copyfileobj(compressed, raw, 1024 * 1024)
+
+        check = sqlite3.connect(temp_path)
+        try:
+            result = check.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            check.close()
+        if result != "ok":
+            raise ValueError(f"Snapshot `{snapshot.name}` failed its integrity check: {result}")
+
+        # Stale WAL/shared-memory files from the old database must not be replayed onto the restored one
+        remove_sidecar_files(db_path)
+        os.replace(temp_path, db_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,125 @@
+"""
+Near-duplicate detection for !dupes.
+
+Comparing every pair of nodes is quadratic, so nodes are first grouped into blocks that duplicates are likely to
+share: the normalized long name, pairs of name words, the owner together with a name word, and the Node ID with
+one character masked (IDs one typo apart). Only pairs inside a block are scored. Blocks larger than MAX_BLOCK_SIZE
+are too generic to mean anything (a very common name) and are skipped, which keeps the work close to linear.
+"""
+
+import re
+import sqlite3
+from itertools import combinations
+
+from MeshNodes.shared.Queries import execute
+
+MAX_BLOCK_SIZE = 50
+MIN_SCORE = 0.5
+DEFAULT_REPORT_SIZE = 15  # pairs in the !dupes embed, which holds at most 25 fields
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+
+
+def name_tokens(name: str) -> frozenset:
+    return frozenset(_TOKEN_PATTERN.findall(name.casefold()))
+
+
+def normalized_name(name: str) -> str:
+    """Long name with case, spacing and punctuation ignored, so "MSP Tower-1" and "msp tower 1" compare equal."""
+    return "".join(_TOKEN_PATTERN.findall(name.casefold()))
+
+
+def _id_distance(a: str, b: str) -> int:
+    if len(a) != len(b):
+        return max(len(a), len(b))
+    return sum(map(str.__ne__, a, b))
+
+
+def _features(row: tuple) -> tuple:
+    """What score_pair compares, computed once per node: (node_id, owner_id, short name, normalized name, tokens)."""
+    node_id, owner_id, short_name, long_name, _ = row
+    return node_id, owner_id, short_name.casefold(), normalized_name(long_name), name_tokens(long_name)
+
+
+def score_pair(a: tuple, b: tuple) -> tuple[float, list[str]]:
+    """Scores two nodes' _features. Returns (score, reasons)."""
+    score = 0.0
+    reasons = []
+    if a[3] and a[3] == b[3]:
+        score += 0.6
+        reasons.append("same long name")
+    elif a[4] and b[4]:
+        overlap = len(a[4] & b[4]) / len(a[4] | b[4])
+        if overlap:
+            score += 0.5 * overlap
+            reasons.append(f"{overlap:.0%} of long name words shared")
+    if _id_distance(a[0], b[0]) == 1:
+        score += 0.4
+        reasons.append("Node IDs one character apart")
+    if a[1] == b[1]:
+        score += 0.2
+        reasons.append("same owner")
+    if a[2] == b[2]:
+        score += 0.1
+        reasons.append("same short name")
+    return score, reasons
+
+
+def _block_keys(features: tuple) -> list[str]:
+    node_id, owner_id, _, name, tokens = features
+    keys = [f"id:{node_id[:i]}*{node_id[i + 1 :]}" for i in range(len(node_id))]
+    if name:
+        keys.append(f"name:{name}")
+    # Sharing one word out of several says little, so multi-word names are blocked by each pair of their words
+    if len(tokens) == 1:
+        keys.extend(f"words:{token}" for token in tokens)
+    keys.extend(f"words:{a} {b}" for a, b in combinations(sorted(tokens), 2))
+    # An owner's nodes are only worth comparing when their names have something in common
+    keys.extend(f"owner:{owner_id}:{token}" for token in tokens)
+    return keys
+
+
+def find_duplicates(rows: list[tuple], limit: int = DEFAULT_REPORT_SIZE, min_score: float = MIN_SCORE) -> list[tuple]:
+    """
+    Ranks likely duplicate pairs among (node_id, owner_id, short_name, long_name, timestamp) rows.
+    Returns up to `limit` (score, keep, drop, reasons) tuples, best first; `keep` is the earlier registration.
+    """
+    features = [_features(row) for row in rows]
+    # Nearly every block holds a single node, so a block is a bare index until a second node joins it;
+    # allocating a list per block made building them the slowest part
+    blocks = {}
+    for index, node in enumerate(features):
+        for key in _block_keys(node):
+            members = blocks.get(key)
+            if members is None:
+                blocks[key] = index
+            elif isinstance(members, int):
+                blocks[key] = [members, index]
+            else:
+                members.append(index)
+
+    seen = set()
+    found = []
+    for members in blocks.values():
+        if isinstance(members, int) or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, j in combinations(members, 2):
+            if (i, j) in seen:
+                continue
+            seen.add((i, j))
+            score, reasons = score_pair(features[i], features[j])
+            if score >= min_score:
+                keep, drop = sorted((rows[i], rows[j]), key=lambda row: (str(row[4] or ""), row[0]))
+                found.append((round(min(score, 1.0), 2), keep, drop, reasons))
+    found.sort(key=lambda pair: (-pair[0], pair[1][0], pair[2][0]))
+    return found[:limit]
+
+
+def find_duplicates_in_db(db_path: str, limit: int = DEFAULT_REPORT_SIZE) -> list[tuple]:
+    """Worker-process entry point: reads the active directory itself, so only the report crosses the process boundary."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = execute(conn, "duplicate_rows").fetchall()
+    finally:
+        conn.close()
+    return find_duplicates(rows, limit)
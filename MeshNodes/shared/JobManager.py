@@ -0,0 +1,174 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Default limit for a single job; callers can pass their own
+DEFAULT_JOB_TIMEOUT = 120
+
+# Jobs one guild may have running at once; the rest of its jobs wait their turn without blocking other guilds
+JOBS_PER_GUILD = 2
+
+# Finished jobs kept around for !jobs
+FINISHED_JOB_HISTORY = 10
+
+
+class JobError(RuntimeError):
+    """Raised to the caller when a job times out or is cancelled."""
+
+
+class Job:
+    def __init__(self, job_id, guild_id, name, user_id):
+        self.id = job_id
+        self.guild_id = guild_id
+        self.name = name
+        self.user_id = user_id
+        self.state = "queued"  # queued -> running -> done / failed / timed out / cancelled
+        self.progress = ""
+        self.created = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = asyncio.Event()  # set by cancel(); wakes the waiting caller
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobManager:
+    """
+    Runs CPU-heavy work (CSV parsing and validation, export formatting, ...) in a pool of worker processes,
+    so it never holds up the event loop. Functions and arguments must be picklable: module-level functions
+    and plain data, not closures or connections.
+
+    A timed out or cancelled job returns control to its caller immediately. If it was still queued in the pool it
+    never runs; if a worker had already picked it up, that worker finishes it and the result is discarded.
+    """
+
+    def __init__(self, max_workers=None, jobs_per_guild=JOBS_PER_GUILD):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.jobs_per_guild = jobs_per_guild
+        self.executor = None
+        self.jobs = {}
+        self.finished = deque(maxlen=FINISHED_JOB_HISTORY)
+        self._guild_slots = {}
+        self._ids = itertools.count(1)
+
+    def start(self):
+        if self.executor is None:
+            # spawn rather than fork: forking a process with a running event loop and open sockets is unsafe
+            self.executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def shutdown(self):
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def _slots(self, guild_id) -> asyncio.Semaphore:
+        if guild_id not in self._guild_slots:
+            self._guild_slots[guild_id] = asyncio.Semaphore(self.jobs_per_guild)
+        return self._guild_slots[guild_id]
+
+    async def _wait(self, job, awaitable, timeout):
+        """Waits for `awaitable` unless the job is cancelled or `timeout` passes first."""
+        work = asyncio.ensure_future(awaitable)
+        cancelled = asyncio.ensure_future(job.cancel_requested.wait())
+        try:
+            done, _ = await asyncio.wait({work, cancelled}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            cancelled.cancel()
+        if work in done:
+            return work.result()
+        work.cancel()
+        # Nobody awaits the abandoned future any more; retrieve its outcome so asyncio doesn't log it
+        work.add_done_callback(lambda future: future.cancelled() or future.exception())
+        if job.cancel_requested.is_set():
+            job.state = "cancelled"
+            raise JobError(f"Job #{job.id} ({job.name}) was cancelled.")
+        job.state = "timed out"
+        raise JobError(f"Job #{job.id} ({job.name}) timed out.")
+
+    async def run(self, guild, name, user_id, func, *args, timeout=DEFAULT_JOB_TIMEOUT):
+        """
+        Runs `func(*args)` in the worker pool on behalf of `guild` and returns its result.
+        Raises JobError on timeout or cancellation, and re-raises whatever `func` raised.
+        """
+        results = await self.map(guild, name, user_id, func, [args], timeout=timeout)
+        return results[0]
+
+    async def map(self, guild, name, user_id, func, arg_tuples, timeout=DEFAULT_JOB_TIMEOUT):
+        """
+        Runs `func(*args)` for every tuple in `arg_tuples` as one job, spread over the pool, and returns the results
+        in order. Progress is the number of finished calls, shown by !jobs.
+        """
+        self.start()
+        guild_id = guild.id if guild is not None else None
+        job = Job(next(self._ids), guild_id, name, user_id)
+        self.jobs[job.id] = job
+        deadline = time.monotonic() + timeout
+        slots = self._slots(guild_id)
+        acquired = False
+        try:
+            await self._wait(job, slots.acquire(), timeout)
+            acquired = True
+            job.state = "running"
+            job.started = time.monotonic()
+            loop = asyncio.get_running_loop()
+            futures = [loop.run_in_executor(self.executor, func, *args) for args in arg_tuples]
+            finished = 0
+            job.progress = f"0/{len(futures)}"
+
+            def count(_):
+                nonlocal finished
+                finished += 1
+                job.progress = f"{finished}/{len(futures)}"
+
+            for future in futures:
+                future.add_done_callback(count)
+            try:
+                results = await self._wait(job, asyncio.gather(*futures), deadline - time.monotonic())
+            except JobError:
+                for future in futures:
+                    future.cancel()
+                raise
+            job.state = "done"
+            return results
+        except JobError:
+            raise
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for the next job
+            job.state = "failed"
+            self.executor = None
+            raise
+        except Exception:
+            job.state = "failed"
+            raise
+        finally:
+            if acquired:
+                slots.release()
+            job.finished = time.monotonic()
+            self.jobs.pop(job.id, None)
+            self.finished.appendleft(job)
+            logger.debug(f"Job #{job.id} {job.name} {job.state} after {job.elapsed:.2f}s")
+
+    def cancel(self, job_id) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel_requested.set()
+        return True
+
+    def list_jobs(self, guild_id=None):
+        """Running and queued jobs (optionally only one guild's), oldest first."""
+        return [job for job in self.jobs.values() if guild_id is None or job.guild_id == guild_id]
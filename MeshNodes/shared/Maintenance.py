@@ -0,0 +1,170 @@
+"""
+Routine upkeep of a node directory's database, so query plans and file size stay healthy without an admin running
+anything by hand: planner statistics (ANALYZE), free pages handed back to the filesystem a few at a time
+(incremental vacuum) and a periodic quick_check. Each task is a plain function taking a connection, run in a worker
+thread by the cog's maintenance loop, which waits for a quiet moment unless a task is long overdue.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from MeshNodes.shared.Queries import execute
+
+# How often each task is due
+TASK_INTERVALS = {
+    "analyze": 24 * 60 * 60,
+    "vacuum": 24 * 60 * 60,
+    "quick_check": 7 * 24 * 60 * 60,
+}
+
+# How long without commands or interactions, and with nothing queued, before the bot counts as quiet
+QUIET_AFTER = 10 * 60
+
+# Rows ANALYZE samples per index, which keeps it fast on big tables at the cost of approximate statistics
+ANALYSIS_LIMIT = 1000
+
+# Free pages released per incremental vacuum step, the most steps per run, and the pause between steps
+VACUUM_STEP_PAGES = 128
+VACUUM_MAX_STEPS = 64
+VACUUM_STEP_PAUSE = 0.05
+
+# Problems quick_check reports before stopping
+QUICK_CHECK_MAX_ERRORS = 10
+
+MAINTENANCE_HISTORY = 50
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+@dataclass
+class MaintenanceRun:
+    task: str
+    partition: Optional[int]
+    started: float  # wall clock
+    duration: float = 0.0
+    ok: bool = True
+    detail: str = ""
+    pages_reclaimed: int = 0
+
+
+def _pragma(conn, name: str):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def last_run_key(task: str) -> str:
+    return f"maintenance_{task}_at"
+
+
+def last_runs(conn) -> dict:
+    """task -> wall clock time it last ran in this database, for the tasks that ever have."""
+    runs = {}
+    for task in TASK_INTERVALS:
+        row = execute(conn, "journal_meta", (last_run_key(task),)).fetchone()
+        if row:
+            runs[task] = float(row[0])
+    return runs
+
+
+def set_last_run(conn, task: str, at: float):
+    execute(conn, "set_journal_meta", (last_run_key(task), repr(at)))
+    conn.commit()
+
+
+def due_tasks(runs: dict, now: float, quiet: bool, quiet_only=()) -> list[str]:
+    """
+    Tasks to run now. A due task waits for a quiet moment, unless it's overdue by a whole interval; the tasks in
+    `quiet_only` (e.g. a vacuum that still needs its full VACUUM) always wait.
+    A task that never ran counts as just due, so loading the cog on a busy server doesn't start all of them at once.
+    """
+    due = []
+    for task, interval in TASK_INTERVALS.items():
+        age = now - runs.get(task, now - interval)
+        if age >= interval and (quiet or (age >= 2 * interval and task not in quiet_only)):
+            due.append(task)
+    return due
+
+
+def analyze(conn) -> tuple[bool, str]:
+    """Refreshes the query planner's statistics."""
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT:d}")
+    conn.execute("ANALYZE")
+    conn.commit()
+    indexes = conn.execute("SELECT COUNT(DISTINCT idx) FROM sqlite_stat1").fetchone()[0]
+    return True, f"statistics for {indexes} indexes"
+
+
+def optimize(conn) -> tuple[bool, str]:
+    """
+    Lets SQLite re-analyze the tables the statements run on `conn` would benefit from. Cheap; run it on the
+    connection that did a bulk write (e.g. an import), once the write is committed.
+    """
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT:d}")
+    conn.execute("PRAGMA optimize")
+    return True, "statistics refreshed after a bulk write"
+
+
+def auto_vacuum_mode(conn) -> str:
+    return AUTO_VACUUM_MODES.get(_pragma(conn, "auto_vacuum"), "unknown")
+
+
+def enable_incremental_vacuum(conn) -> tuple[bool, str, int]:
+    """
+    Switches the database to incremental auto-vacuum, which takes one full VACUUM. Until then freed pages can
+    only be reclaimed by rewriting the whole file, so this runs once, and the maintenance loop only starts it when quiet.
+    """
+    pages = _pragma(conn, "page_count")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    # VACUUM also packs half-empty pages, so it can give back more than the free list held
+    return True, "switched to incremental auto-vacuum", pages - _pragma(conn, "page_count")
+
+
+def incremental_vacuum_step(conn, pages: int = VACUUM_STEP_PAGES) -> tuple[int, int]:
+    """Releases up to `pages` free pages. Returns (pages released, free pages left)."""
+    before = _pragma(conn, "freelist_count")
+    conn.execute(f"PRAGMA incremental_vacuum({pages:d})").fetchall()
+    after = _pragma(conn, "freelist_count")
+    return before - after, after
+
+
+def quick_check(conn) -> tuple[bool, str]:
+    """Checks the database structure, like integrity_check but without verifying index contents."""
+    problems = [row[0] for row in conn.execute(f"PRAGMA quick_check({QUICK_CHECK_MAX_ERRORS:d})")]
+    if problems == ["ok"]:
+        return True, "ok"
+    return False, "; ".join(problems)[:500]
+
+
+def database_health(conn, db_path: str) -> dict:
+    """File and page figures for !dbhealth."""
+    analyzed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is not None
+    return {
+        "file_size": os.path.getsize(db_path),
+        "page_size": _pragma(conn, "page_size"),
+        "page_count": _pragma(conn, "page_count"),
+        "free_pages": _pragma(conn, "freelist_count"),
+        "auto_vacuum": auto_vacuum_mode(conn),
+        "journal_mode": _pragma(conn, "journal_mode"),
+        "analyzed": analyzed,
+    }
+
+
+def timed(conn, task: str, partition, func) -> MaintenanceRun:
+    """Runs func(conn), which returns (ok, detail[, pages reclaimed]), and records how it went."""
+    run = MaintenanceRun(task, partition, time.time())
+    started = time.perf_counter()
+    try:
+        result = func(conn)
+    except Exception as e:
+        run.ok, run.detail = False, f"{type(e).__name__}: {e}"
+    else:
+        run.ok, run.detail = result[0], result[1]
+        run.pages_reclaimed = result[2] if len(result) > 2 else 0
+    run.duration = time.perf_counter() - started
+    return run
+
+
+# The tasks other than vacuum, which the cog runs in steps
+TASK_FUNCTIONS = {"analyze": analyze, "quick_check": quick_check}
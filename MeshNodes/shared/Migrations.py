@@ -0,0 +1,249 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from MeshNodes.shared.NodeStats import create_stats_schema, rebuild_stats
+from MeshNodes.shared.NodeJournal import create_journal_schema
+from MeshNodes.shared.SheetSync import create_sheet_sync_schema
+from MeshNodes.shared.NodeArchive import create_archive_schema
+from MeshNodes.shared.QuestionnaireSessions import create_session_schema
+from MeshNodes.shared.Queries import LAST_UPDATED_SQL
+
+logger = logging.getLogger(__name__)
+
+# Rows per backfill transaction, and how long to yield to the bot between them
+BACKFILL_CHUNK_SIZE = 500
+BACKFILL_PAUSE = 0.05
+
+
+@dataclass
+class Migration:
+    """
+    One schema step. `apply` runs in a single transaction together with the `user_version` bump.
+    Steps with a `backfill` commit `apply` first, then call `backfill(cursor, after_rowid, chunk_size)` in
+    separate small transactions until it returns None; `finish` and the `user_version` bump share the last one.
+    A restart after an interruption runs the step again from `apply`, so `apply` must start the backfill over.
+    """
+
+    version: int
+    description: str
+    apply: Callable
+    backfill: Optional[Callable] = None
+    finish: Optional[Callable] = None
+
+
+def _create_nodes(cursor):
+    # The original schema; migration 5 rebuilds it with integer owner IDs
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS nodes (
+            node_id TEXT PRIMARY KEY,
+            discord_id TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            short_name TEXT NOT NULL,
+            long_name TEXT NOT NULL,
+            additional_node_data_json TEXT NOT NULL
+        )
+    """)
+
+
+def _create_stats(cursor):
+    # Databases set up by !createdb may already have these; recreate them so the counts are known to be right
+    for trigger in ("nodes_stats_after_insert", "nodes_stats_after_delete", "nodes_stats_after_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_stats_schema(cursor)
+    rebuild_stats(cursor)
+
+
+def _archive_case_duplicates(cursor):
+    """
+    Node IDs are uppercased by migration 5, so IDs that only differ by case would collide. Keeps the most recently
+    registered node of each such group and moves the others into the archive, where !undelete can still find them.
+    """
+    losers = cursor.execute("""
+        SELECT row_id, node_id, discord_id FROM (
+            SELECT rowid AS row_id, node_id, discord_id,
+                ROW_NUMBER() OVER (PARTITION BY UPPER(node_id) ORDER BY timestamp DESC, rowid DESC) AS rank
+            FROM nodes
+        ) WHERE rank > 1
+    """).fetchall()
+    if not losers:
+        return
+    create_archive_schema(cursor)
+    cursor.executemany(
+        """
+        INSERT INTO nodes_archive (node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json,
+            version, reason)
+        SELECT UPPER(node_id), TRIM(discord_id), timestamp, short_name, long_name, additional_node_data_json,
+            1, 'duplicate ID'
+        FROM nodes WHERE rowid = ?
+    """,
+        [(row_id,) for row_id, _, _ in losers],
+    )
+    cursor.executemany("DELETE FROM nodes WHERE rowid = ?", [(row_id,) for row_id, _, _ in losers])
+    logger.warning(
+        f"Archived {len(losers)} nodes whose IDs only differ by case from a newer registration: "
+        + ", ".join(f"{node_id} (owner {owner_id})" for _, node_id, owner_id in losers)
+    )
+
+
+def _start_integer_owner_ids(cursor):
+    # SQLite can't change a column's type in place, so the table is rebuilt: this creates the new one and the
+    # backfill copies the rows across in chunks. The INTEGER column's affinity converts numeric owner IDs to integers
+    # and keeps anything malformed as text rather than losing it.
+    cursor.execute("DROP TABLE IF EXISTS nodes_new")
+    cursor.execute("""
+        CREATE TABLE nodes_new (
+            node_id TEXT PRIMARY KEY,
+            discord_id INTEGER NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            short_name TEXT NOT NULL,
+            long_name TEXT NOT NULL,
+            additional_node_data_json TEXT NOT NULL
+        )
+    """)
+    # Node IDs are compared on the bare column everywhere, so lowercase ones left by older versions are uppercased
+    _archive_case_duplicates(cursor)
+
+
+def _copy_integer_owner_ids(cursor, after_rowid: int, chunk_size: int):
+    # Keyset over the old table's rowids, so each chunk is an index range rather than an OFFSET scan
+    last_rowid = cursor.execute(
+        "SELECT MAX(rowid) FROM (SELECT rowid FROM nodes WHERE rowid > ? ORDER BY rowid LIMIT ?)", (after_rowid, chunk_size)
+    ).fetchone()[0]
+    if last_rowid is None:
+        return None
+    cursor.execute(
+        """
+        INSERT INTO nodes_new (node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json)
+        SELECT UPPER(node_id), TRIM(discord_id), timestamp, short_name, long_name, additional_node_data_json
+        FROM nodes WHERE rowid > ? AND rowid <= ?
+    """,
+        (after_rowid, last_rowid),
+    )
+    return last_rowid
+
+
+def _finish_integer_owner_ids(cursor):
+    # Dropping the table drops its triggers too; they are recreated on the new table below
+    cursor.execute("DROP TABLE nodes")
+    cursor.execute("ALTER TABLE nodes_new RENAME TO nodes")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_discord_id ON nodes (discord_id, node_id)")
+    create_stats_schema(cursor)
+    rebuild_stats(cursor)
+
+
+def _node_versions(cursor):
+    # Bumped by every write, so edits made from a form opened earlier can tell whether the node changed meanwhile
+    cursor.execute("ALTER TABLE nodes ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def _node_archive(cursor):
+    # Set by every write, so the pruning job can tell which nodes nobody has touched in a long time
+    cursor.execute("ALTER TABLE nodes ADD COLUMN updated_at TIMESTAMP")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_nodes_last_updated ON nodes ({LAST_UPDATED_SQL})")
+    create_archive_schema(cursor)
+
+
+def _name_indexes(cursor):
+    # !whohas and !nodefull look nodes up by short or long name ignoring case; without these every lookup scans
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_short_name_lower ON nodes (lower(short_name))")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_nodes_long_name_lower ON nodes (lower(long_name))")
+
+
+def _growth_by_current_month(cursor):
+    # Restored nodes keep their original registration time, which the insert trigger used to count them under
+    cursor.execute("DROP TRIGGER IF EXISTS nodes_stats_after_insert")
+    create_stats_schema(cursor)
+
+
+MIGRATIONS = [
+    Migration(1, "Create nodes table", _create_nodes),
+    Migration(2, "Trigger-maintained node statistics", _create_stats),
+    Migration(3, "Node change journal", create_journal_schema),
+    Migration(4, "Sheet sync state", create_sheet_sync_schema),
+    Migration(
+        5,
+        "Integer owner IDs with an owner index",
+        _start_integer_owner_ids,
+        backfill=_copy_integer_owner_ids,
+        finish=_finish_integer_owner_ids,
+    ),
+    Migration(6, "Node row versions", _node_versions),
+    Migration(7, "Node archive and last-updated times", _node_archive),
+    Migration(8, "Case-insensitive name indexes", _name_indexes),
+    Migration(9, "Questionnaire sessions", create_session_schema),
+    Migration(10, "Count restored nodes as growth in the month they return", _growth_by_current_month),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _apply_step(connect, migration: Migration):
+    conn = connect()
+    conn.isolation_level = None  # manage transactions explicitly
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            migration.apply(conn.cursor())
+            if migration.backfill is None:
+                conn.execute(f"PRAGMA user_version = {migration.version:d}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def _backfill_chunk(connect, migration: Migration, after_rowid: int):
+    conn = connect()
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            next_rowid = migration.backfill(cursor, after_rowid, BACKFILL_CHUNK_SIZE)
+            if next_rowid is None:
+                if migration.finish is not None:
+                    migration.finish(cursor)
+                conn.execute(f"PRAGMA user_version = {migration.version:d}")
+            conn.execute("COMMIT")
+            return next_rowid
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+async def migrate(connect) -> int:
+    """
+    Bring the database up to SCHEMA_VERSION. `connect` opens a new connection to it.
+    The fast path is a single `PRAGMA user_version` read; steps and backfill chunks run in worker threads
+    so a long migration doesn't stall the bot. Returns the resulting schema version.
+    """
+    conn = connect()
+    try:
+        version = get_schema_version(conn)
+    finally:
+        conn.close()
+    if version >= SCHEMA_VERSION:
+        return version
+
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        logger.info(f"Applying database migration {migration.version}: {migration.description}")
+        await asyncio.to_thread(_apply_step, connect, migration)
+        if migration.backfill is not None:
+            after_rowid = 0
+            while after_rowid is not None:
+                after_rowid = await asyncio.to_thread(_backfill_chunk, connect, migration, after_rowid)
+                await asyncio.sleep(BACKFILL_PAUSE)
+        version = migration.version
+    return version
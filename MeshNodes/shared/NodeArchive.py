@@ -0,0 +1,66 @@
+"""
+Soft deletion: deleted and stale nodes are moved into nodes_archive instead of being dropped, so the nodes table
+(which every lookup, listing and statistic reads) only ever holds the active directory, and !undelete can bring a
+node back.
+"""
+
+from MeshNodes.shared.NodeJournal import record_changes
+from MeshNodes.shared.Queries import execute
+
+# Nodes archived per transaction by the pruning job, so it never holds the write lock for long,
+# and how long it yields to the bot between batches
+PRUNE_BATCH_SIZE = 100
+PRUNE_PAUSE = 0.05
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS nodes_archive (
+        archive_id INTEGER PRIMARY KEY,
+        node_id TEXT NOT NULL,
+        discord_id INTEGER NOT NULL,
+        timestamp TIMESTAMP,
+        short_name TEXT NOT NULL,
+        long_name TEXT NOT NULL,
+        additional_node_data_json TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        updated_at TIMESTAMP,
+        archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        archived_by TEXT,
+        reason TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_nodes_archive_node_id ON nodes_archive (node_id, archive_id)",
+    "CREATE INDEX IF NOT EXISTS idx_nodes_archive_discord_id ON nodes_archive (discord_id, archive_id)",
+]
+
+
+def create_archive_schema(cursor):
+    for statement in ARCHIVE_SCHEMA:
+        cursor.execute(statement)
+
+
+def prune_stale_nodes(conn, max_age_days: int, batch_size: int = PRUNE_BATCH_SIZE) -> list[str]:
+    """
+    Archives up to `batch_size` nodes that haven't changed in `max_age_days`, in one transaction, and returns
+    their IDs. The caller repeats until a batch comes back short.
+    """
+    cursor = conn.cursor()
+    execute(cursor, "stale_node_ids", (f"-{max_age_days:d} days", batch_size))
+    node_ids = [row[0] for row in cursor.fetchall()]
+    if not node_ids:
+        return []
+    execute(cursor, "archive_nodes", [None, "stale"] + node_ids)
+    execute(cursor, "delete_nodes", node_ids)
+    record_changes(cursor, node_ids, "archive", None)
+    conn.commit()
+    return node_ids
+
+
+def archived_nodes(conn, owner_id=None, limit: int = 25) -> list[tuple]:
+    """
+    The most recently archived nodes, optionally only one owner's.
+    Returns (node_id, short_name, long_name, archived_at, reason) tuples.
+    """
+    if owner_id is not None:
+        return execute(conn, "recent_archived_by_owner", (owner_id, limit)).fetchall()
+    return execute(conn, "recent_archived", (limit,)).fetchall()
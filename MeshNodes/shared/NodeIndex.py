@@ -0,0 +1,194 @@
+import re
+from bisect import bisect_left, insort
+
+# Meshtastic short names are at most 4 characters
+SHORT_NAME_LENGTH = 4
+
+
+def _prefix_range(sorted_keys: list, prefix: str, limit: int):
+    """Yield entries of a sorted list whose key starts with `prefix`, using bisect to jump to the first one."""
+    start = bisect_left(sorted_keys, (prefix,))
+    for entry in sorted_keys[start : start + limit]:
+        if not entry[0].startswith(prefix):
+            break
+        yield entry
+
+
+def _owner_key(owner_id):
+    """Owner IDs are Discord snowflakes; anything else (e.g. a bad CSV import) is kept as-is so it still round-trips."""
+    if isinstance(owner_id, int):
+        return owner_id
+    return int(owner_id) if str(owner_id).isdigit() else owner_id
+
+
+def _short_key(short_name: str) -> str:
+    """Short names that only differ in case are just as ambiguous when someone asks who has one."""
+    return short_name.strip().casefold()
+
+
+def _short_name_candidates(long_name: str):
+    """Possible short names for a long name, most natural first: initials, word starts, consonants, then numbered."""
+    words = re.findall(r"[0-9A-Za-z]+", long_name.upper())
+    if not words:
+        return
+    initials = "".join(word[0] for word in words)[:SHORT_NAME_LENGTH]
+    joined = "".join(words)
+    consonants = words[0][0] + re.sub(r"[AEIOU]", "", words[0][1:])
+    yield initials
+    yield words[0][:SHORT_NAME_LENGTH]
+    if len(words) > 1:
+        yield (words[0][:2] + words[1][:2])[:SHORT_NAME_LENGTH]
+        yield (words[0][0] + words[1][:3])[:SHORT_NAME_LENGTH]
+    yield consonants[:SHORT_NAME_LENGTH]
+    yield joined[:3]
+    for stem in dict.fromkeys((initials[:3], words[0][:3], initials[:2])):
+        for number in range(1, 10 ** (SHORT_NAME_LENGTH - len(stem))):
+            yield f"{stem}{number}"
+
+
+def _remove_sorted(sorted_keys: list, entry):
+    position = bisect_left(sorted_keys, entry)
+    if position < len(sorted_keys) and sorted_keys[position] == entry:
+        del sorted_keys[position]
+
+
+class NodeIndex:
+    """
+    In-memory sorted index of the node directory for autocomplete and ownership lookups.
+    Node IDs are indexed forwards and reversed (so "ends with" is also a prefix search) and short/long
+    names are indexed lowercase. Lookups are a bisect plus a short slice, so they stay fast at any size.
+    Must be updated alongside every write to the `nodes` table.
+    """
+
+    def __init__(self):
+        self.nodes = {}  # node_id -> (owner_id, short_name, long_name)
+        self.owners = {}  # owner_id -> set of node_ids
+        self.short_names = {}  # casefolded short name -> set of node_ids, for O(1) collision checks
+        self._ids = []  # sorted (node_id,)
+        self._reversed_ids = []  # sorted (reversed node_id, node_id)
+        self._names = []  # sorted (lowercase name, node_id)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def load(self, rows):
+        """Rebuild the index from (node_id, owner_id, short_name, long_name) rows."""
+        self.nodes = {}
+        self.owners = {}
+        self.short_names = {}
+        for node_id, owner_id, short_name, long_name in rows:
+            node_id = node_id.upper()
+            owner_id = _owner_key(owner_id)
+            self.nodes[node_id] = (owner_id, short_name, long_name)
+            self.owners.setdefault(owner_id, set()).add(node_id)
+            self.short_names.setdefault(_short_key(short_name), set()).add(node_id)
+        self._ids = sorted((node_id,) for node_id in self.nodes)
+        self._reversed_ids = sorted((node_id[::-1], node_id) for node_id in self.nodes)
+        self._names = sorted(
+            (name.lower(), node_id)
+            for node_id, (_, short_name, long_name) in self.nodes.items()
+            for name in {short_name, long_name}
+        )
+
+    def clear(self):
+        self.load([])
+
+    def upsert(self, node_id, owner_id, short_name, long_name):
+        node_id = node_id.upper()
+        self.remove(node_id)
+        owner_id = _owner_key(owner_id)
+        self.nodes[node_id] = (owner_id, short_name, long_name)
+        self.owners.setdefault(owner_id, set()).add(node_id)
+        self.short_names.setdefault(_short_key(short_name), set()).add(node_id)
+        insort(self._ids, (node_id,))
+        insort(self._reversed_ids, (node_id[::-1], node_id))
+        for name in {short_name, long_name}:
+            insort(self._names, (name.lower(), node_id))
+
+    def remove(self, node_id):
+        node_id = node_id.upper()
+        entry = self.nodes.pop(node_id, None)
+        if entry is None:
+            return
+        owner_id, short_name, long_name = entry
+        owned = self.owners.get(owner_id)
+        if owned:
+            owned.discard(node_id)
+            if not owned:
+                del self.owners[owner_id]
+        sharing = self.short_names.get(_short_key(short_name))
+        if sharing:
+            sharing.discard(node_id)
+            if not sharing:
+                del self.short_names[_short_key(short_name)]
+        _remove_sorted(self._ids, (node_id,))
+        _remove_sorted(self._reversed_ids, (node_id[::-1], node_id))
+        for name in {short_name, long_name}:
+            _remove_sorted(self._names, (name.lower(), node_id))
+
+    def get(self, node_id):
+        return self.nodes.get(node_id.upper())
+
+    def ending_with(self, suffix: str, limit: int = 25) -> list[str]:
+        """Node IDs ending with `suffix`, ignoring case; the database can only find these by scanning every row."""
+        suffix = suffix.strip().upper()
+        if not suffix:
+            # Every ID ends with the empty string, which would just return the first `limit` of them
+            return []
+        return [node_id for _, node_id in _prefix_range(self._reversed_ids, suffix[::-1], limit)]
+
+    def owned_by(self, owner_id) -> list[str]:
+        return sorted(self.owners.get(_owner_key(owner_id), ()))
+
+    def short_name_users(self, short_name: str, exclude_node_id: str = None) -> list[str]:
+        """Node IDs already using `short_name` (ignoring case), other than `exclude_node_id`."""
+        users = self.short_names.get(_short_key(short_name), ())
+        return sorted(node_id for node_id in users if node_id != (exclude_node_id or "").upper())
+
+    def suggest_short_names(self, long_name: str, count: int = 3) -> list[str]:
+        """Free short names derived from a long name."""
+        suggestions = []
+        for candidate in _short_name_candidates(long_name):
+            if candidate not in suggestions and _short_key(candidate) not in self.short_names:
+                suggestions.append(candidate)
+                if len(suggestions) == count:
+                    break
+        return suggestions
+
+    def short_name_collisions(self) -> dict[str, list[str]]:
+        """Short names used by more than one node -> their node IDs."""
+        return {self.nodes[min(node_ids)][1]: sorted(node_ids) for node_ids in self.short_names.values() if len(node_ids) > 1}
+
+    def _matches(self, node_id, query: str) -> bool:
+        _, short_name, long_name = self.nodes[node_id]
+        return (
+            node_id.startswith(query.upper())
+            or node_id.endswith(query.upper())
+            or short_name.lower().startswith(query.lower())
+            or long_name.lower().startswith(query.lower())
+        )
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        """Node IDs matching `query` by ID prefix, ID suffix or name prefix, without duplicates."""
+        query = query.strip().lstrip("!")
+        if not query:
+            return [node_id for (node_id,) in self._ids[:limit]]
+
+        results = {}
+        for (node_id,) in _prefix_range(self._ids, query.upper(), limit):
+            results[node_id] = None
+        for _, node_id in _prefix_range(self._reversed_ids, query.upper()[::-1], limit):
+            results[node_id] = None
+        for _, node_id in _prefix_range(self._names, query.lower(), limit):
+            results[node_id] = None
+        return list(results)[:limit]
+
+    def suggest(self, user_id, query: str, limit: int = 25) -> list[str]:
+        """Autocomplete suggestions: the user's own matching nodes first, then the rest of the directory."""
+        query = query.strip().lstrip("!")
+        own = [node_id for node_id in self.owned_by(user_id) if not query or self._matches(node_id, query)]
+        results = dict.fromkeys(own[:limit])
+        if len(results) < limit:
+            for node_id in self.search(query, limit):
+                results[node_id] = None
+        return list(results)[:limit]
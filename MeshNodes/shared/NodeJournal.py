@@ -0,0 +1,133 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from MeshNodes.shared.Queries import execute, execute_many
+
+# Changes older than this are compacted down to the latest entry per node
+JOURNAL_RETENTION_DAYS = 90
+
+# Largest delta a single !nodechanges export will contain; consumers page with the last seq they received
+MAX_EXPORT_CHANGES = 5000
+
+JOURNAL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS node_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        node_id TEXT NOT NULL,
+        action TEXT NOT NULL,
+        actor_id TEXT,
+        node_json TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_node_changes_changed_at ON node_changes (changed_at)",
+    "CREATE INDEX IF NOT EXISTS idx_node_changes_node_id ON node_changes (node_id, seq)",
+    """
+    CREATE TABLE IF NOT EXISTS journal_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+]
+
+# Actions that remove a node from the directory; they are journaled without a snapshot
+TOMBSTONE_ACTIONS = ("delete", "archive")
+
+
+def create_journal_schema(cursor):
+    for statement in JOURNAL_SCHEMA:
+        cursor.execute(statement)
+
+
+def record_change(cursor, node_id: str, action: str, actor_id):
+    """
+    Append a journal entry for a node inside the caller's transaction.
+    Call after the write (so the snapshot has the new values); deletes and archiving are recorded without a snapshot.
+    """
+    record_changes(cursor, [node_id], action, actor_id)
+
+
+def record_changes(cursor, node_ids: list[str], action: str, actor_id):
+    name = "record_tombstone" if action in TOMBSTONE_ACTIONS else "record_change"
+    actor_id = str(actor_id) if actor_id is not None else None
+    execute_many(cursor, name, [{"node_id": node_id.upper(), "action": action, "actor_id": actor_id} for node_id in node_ids])
+
+
+def parse_since(value: str):
+    """
+    Parse a `since` argument into ("seq", int) or ("date", "YYYY-MM-DD HH:MM:SS").
+    Raises ValueError for anything else.
+    """
+    value = value.strip()
+    if value.isdigit():
+        return "seq", int(value)
+    for date_format in ("%Y-%m-%d", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return "date", datetime.strptime(value, date_format).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    raise ValueError(f"`{value}` is not a sequence number or a date (YYYY-MM-DD)")
+
+
+def changes_since(cursor, since, limit: int = MAX_EXPORT_CHANGES) -> list[tuple]:
+    """Changes after a sequence number or at/after a UTC date, oldest first: (seq, changed_at, node_id, action, actor_id, node_json)."""
+    kind, value = since
+    return execute(cursor, "changes_since_seq" if kind == "seq" else "changes_since_date", (value, limit)).fetchall()
+
+
+def latest_seq(cursor) -> int:
+    return execute(cursor, "latest_seq").fetchone()[0]
+
+
+def compacted_through_seq(cursor) -> int:
+    """Deltas starting before this sequence number may be missing entries and need a full re-sync from 0."""
+    row = execute(cursor, "journal_meta", ("compacted_through_seq",)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def compact_journal(cursor, retention_days: int = JOURNAL_RETENTION_DAYS) -> int:
+    """
+    Checkpoint the journal: entries older than the retention window are reduced to the latest entry per node,
+    and tombstones of deleted nodes are dropped. Replaying from seq 0 still rebuilds the current directory.
+    Returns the number of entries removed.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    checkpoint_seq = execute(cursor, "journal_checkpoint_seq", (cutoff,)).fetchone()[0]
+    if checkpoint_seq is None:
+        return 0
+
+    removed = execute(cursor, "compact_journal", {"checkpoint": checkpoint_seq}).rowcount
+    execute(cursor, "raise_journal_meta", ("compacted_through_seq", str(checkpoint_seq)))
+    return removed
+
+
+def change_owner_ids(cursor, first_seq: int, last_seq: int) -> list[int]:
+    """The distinct owners of the node snapshots in a range of changes, to look their names up for an export."""
+    rows = execute(cursor, "change_owner_ids", (first_seq, last_seq)).fetchall()
+    return [int(owner_id) for (owner_id,) in rows if owner_id is not None and str(owner_id).isdigit()]
+
+
+def export_changes_jsonl(rows: list[tuple], owner_names: dict = None) -> str:
+    """
+    Render journal rows as JSON Lines, one change per line, for downstream consumers. `owner_names` maps owner IDs
+    to display names for the owner_name field, which is null for deletes and owners whose name isn't known.
+    """
+    owner_names = owner_names or {}
+    lines = []
+    for seq, changed_at, node_id, action, actor_id, node_json in rows:
+        node = json.loads(node_json) if node_json else None
+        owner_id = str(node.get("discord_id", "")) if node else ""
+        lines.append(
+            json.dumps(
+                {
+                    "seq": seq,
+                    "changed_at": changed_at,
+                    "node_id": node_id,
+                    "action": action,
+                    "actor_id": actor_id,
+                    "node": node,
+                    "owner_name": owner_names.get(int(owner_id)) if owner_id.isdigit() else None,
+                }
+            )
+        )
+    return "\n".join(lines) + ("\n" if lines else "")
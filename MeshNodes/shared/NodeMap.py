@@ -0,0 +1,206 @@
+"""
+Static node maps for !nodemap.
+
+Nodes are placed at the centre of their Maidenhead grid square answer. Rendering needs Pillow and runs in the worker
+pool; no map tiles are fetched. The background is the Maidenhead grid, drawn over an optional base layer read from
+disk (basemap.png plus basemap.json with its "west", "south", "east" and "north" edges in degrees).
+
+Rendered images are cached under a hash of exactly what they show (the plotted nodes, the selection and the base
+layer), so an image is only re-rendered once a node in its selection actually changed.
+"""
+
+import os
+import re
+import json
+import math
+import hashlib
+
+GRID_SQUARE_PATTERN = re.compile(r"[A-Ra-r]{2}[0-9]{2}(?:[A-Xa-x]{2}(?:[0-9]{2})?)?")
+
+MAP_SIZE = (1024, 768)
+MARKER_SIZE = 7  # odd, so markers are centred on the node
+MAP_CACHE_DIR_NAME = "map_cache"
+MAP_CACHE_FILES = 50
+BASEMAP_NAME = "basemap"
+
+# Bump when the drawing changes, so cached images from the old version aren't reused
+RENDER_VERSION = 1
+
+ROLE_COLORS = {
+    "Router": (220, 50, 47),
+    "Router_Late": (245, 140, 30),
+    "Client": (38, 139, 210),
+    "Client_Mute": (147, 161, 161),
+    "Client_Hidden": (108, 113, 196),
+    "Client_Base": (133, 153, 0),
+}
+UNKNOWN_ROLE_COLOR = (238, 232, 213)
+BACKGROUND_COLOR = (0, 30, 38)
+GRID_COLOR = (40, 75, 85)
+TEXT_COLOR = (238, 232, 213)
+
+
+def grid_square_center(grid_square: str) -> tuple[float, float]:
+    """(latitude, longitude) of the centre of a 4, 6 or 8 character Maidenhead grid square. Raises ValueError."""
+    grid = grid_square.strip()
+    if not GRID_SQUARE_PATTERN.fullmatch(grid):
+        raise ValueError(f"`{grid_square}` is not a Maidenhead grid square")
+    lon = (ord(grid[0].upper()) - ord("A")) * 20 - 180 + int(grid[2]) * 2
+    lat = (ord(grid[1].upper()) - ord("A")) * 10 - 90 + int(grid[3])
+    width, height = 2.0, 1.0
+    if len(grid) >= 6:
+        width, height = 5 / 60, 2.5 / 60
+        lon += (ord(grid[4].lower()) - ord("a")) * width
+        lat += (ord(grid[5].lower()) - ord("a")) * height
+    if len(grid) == 8:
+        width, height = width / 10, height / 10
+        lon += int(grid[6]) * width
+        lat += int(grid[7]) * height
+    return lat + height / 2, lon + width / 2
+
+
+def select_map_points(rows, selection: str = None) -> list[tuple]:
+    """
+    Narrows "map_points" query rows to a region (general location) or a role/type, matched case-insensitively.
+    Returns sorted (node_id, short_name, latitude, longitude, role) points; rows with a bad grid square are skipped.
+    """
+    wanted = selection.strip().casefold() if selection else None
+    points = []
+    for node_id, short_name, grid_square, role, node_type, region in rows:
+        if wanted and wanted not in {str(value).casefold() for value in (role, node_type, region) if value}:
+            continue
+        try:
+            lat, lon = grid_square_center(str(grid_square))
+        except ValueError:
+            continue
+        points.append((node_id, short_name, round(lat, 5), round(lon, 5), role or ""))
+    return points
+
+
+def map_cache_key(points: list[tuple], title: str, basemap_dir: str = None) -> str:
+    """Hash of everything an image shows; identical requests for an unchanged selection hit the same file."""
+    digest = hashlib.sha256(f"{RENDER_VERSION}\n{title}\n".encode("utf-8"))
+    basemap = _basemap_paths(basemap_dir)
+    if basemap:
+        digest.update(f"{os.path.getmtime(basemap[0])}:{os.path.getmtime(basemap[1])}\n".encode("utf-8"))
+    for point in points:
+        digest.update(json.dumps(point).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def prune_map_cache(cache_dir: str, keep: int = MAP_CACHE_FILES) -> int:
+    """Deletes the least recently used images beyond `keep`. Returns how many were removed."""
+    if not os.path.isdir(cache_dir):
+        return 0
+    images = sorted(
+        (entry for entry in os.scandir(cache_dir) if entry.name.endswith(".png")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in images[keep:]:
+        os.remove(entry.path)
+    return max(0, len(images) - keep)
+
+
+def _basemap_paths(basemap_dir):
+    if not basemap_dir:
+        return None
+    image_path = os.path.join(basemap_dir, f"{BASEMAP_NAME}.png")
+    bounds_path = os.path.join(basemap_dir, f"{BASEMAP_NAME}.json")
+    if os.path.exists(image_path) and os.path.exists(bounds_path):
+        return image_path, bounds_path
+    return None
+
+
+def _map_extent(points, width, height):
+    """West, south, east and north edges around the points, padded and stretched to the image's aspect ratio."""
+    lats = [point[2] for point in points]
+    lons = [point[3] for point in points]
+    mid_lat, mid_lon = (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+    # Longitude degrees shrink towards the poles; scale them so the map isn't stretched sideways
+    lon_scale = max(math.cos(math.radians(mid_lat)), 0.1)
+    span_lat = max((max(lats) - min(lats)) * 1.2, 0.5)
+    span_lon = max((max(lons) - min(lons)) * 1.2, 0.5 / lon_scale)
+    if span_lon * lon_scale / span_lat < width / height:
+        span_lon = span_lat * width / height / lon_scale
+    else:
+        span_lat = span_lon * lon_scale * height / width
+    return mid_lon - span_lon / 2, mid_lat - span_lat / 2, mid_lon + span_lon / 2, mid_lat + span_lat / 2
+
+
+def render_node_map(points: list[tuple], title: str, path: str, basemap_dir: str = None) -> str:
+    """
+    Worker-process entry point: draws `points` from select_map_points and saves the PNG to `path`.
+    Markers are drawn per role in one call: all of a role's pixels are set at once and then grown into squares
+    with a max filter, instead of drawing every marker separately.
+    """
+    try:
+        from PIL import Image, ImageDraw, ImageFilter, ImageFont
+    except ImportError as e:
+        raise RuntimeError("Pillow is required for !nodemap") from e
+
+    width, height = MAP_SIZE
+    west, south, east, north = _map_extent(points, width, height)
+
+    def to_pixel(lat, lon):
+        return round((lon - west) / (east - west) * (width - 1)), round((north - lat) / (north - south) * (height - 1))
+
+    image = Image.new("RGB", MAP_SIZE, BACKGROUND_COLOR)
+    basemap = _basemap_paths(basemap_dir)
+    if basemap:
+        with open(basemap[1], encoding="utf-8") as f:
+            bounds = json.load(f)
+        with Image.open(basemap[0]) as base:
+            base_width, base_height = base.size
+
+            def to_base(lat, lon):
+                x = (lon - bounds["west"]) / (bounds["east"] - bounds["west"]) * base_width
+                y = (bounds["north"] - lat) / (bounds["north"] - bounds["south"]) * base_height
+                return x, y
+
+            left, top = to_base(north, west)
+            right, bottom = to_base(south, east)
+            image.paste(base.convert("RGB").resize(MAP_SIZE, box=(left, top, right, bottom)))
+
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    # Maidenhead grid: 2 by 1 degree squares, or 5 by 2.5 minute subsquares when zoomed in
+    step_lon, step_lat = (2.0, 1.0) if east - west > 4 else (5 / 60, 2.5 / 60)
+    lon = math.floor(west / step_lon) * step_lon
+    while lon <= east:
+        x, _ = to_pixel(north, lon)
+        draw.line([(x, 0), (x, height)], fill=GRID_COLOR)
+        lon += step_lon
+    lat = math.floor(south / step_lat) * step_lat
+    while lat <= north:
+        _, y = to_pixel(lat, west)
+        draw.line([(0, y), (width, y)], fill=GRID_COLOR)
+        lat += step_lat
+
+    by_role = {}
+    for _, _, lat, lon, role in points:
+        by_role.setdefault(role if role in ROLE_COLORS else "", []).append(to_pixel(lat, lon))
+    for role, pixels in by_role.items():
+        mask = Image.new("L", MAP_SIZE, 0)
+        ImageDraw.Draw(mask).point(pixels, fill=255)
+        mask = mask.filter(ImageFilter.MaxFilter(MARKER_SIZE))
+        image.paste(ROLE_COLORS.get(role, UNKNOWN_ROLE_COLOR), (0, 0), mask)
+
+    # Short names next to the markers while they still fit
+    if len(points) <= 150:
+        for _, short_name, lat, lon, _ in points:
+            x, y = to_pixel(lat, lon)
+            draw.text((x + MARKER_SIZE, y - MARKER_SIZE), short_name, fill=TEXT_COLOR, font=font)
+
+    draw.text((10, 10), f"{title} · {len(points)} nodes", fill=TEXT_COLOR, font=font)
+    for row, role in enumerate(sorted(by_role, key=lambda role: (role == "", role))):
+        y = height - 20 - 16 * row
+        draw.rectangle([(10, y), (20, y + 10)], fill=ROLE_COLORS.get(role, UNKNOWN_ROLE_COLOR))
+        draw.text((26, y), f"{role or 'Unknown role'} ({len(by_role[role])})", fill=TEXT_COLOR, font=font)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so a concurrent request never uploads a half-written file
+    image.save(f"{path}.tmp", format="PNG", optimize=True)
+    os.replace(f"{path}.tmp", path)
+    return path
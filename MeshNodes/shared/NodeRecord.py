@@ -0,0 +1,205 @@
+import json
+import sqlite3
+
+from MeshNodes.shared.Queries import execute
+
+# Columns the write helpers below may set
+EDITABLE_COLUMNS = ("discord_id", "short_name", "long_name", "additional_node_data_json")
+
+
+class NodeConflict(RuntimeError):
+    """Raised by the write helpers when a conditional write matched no row; the message says why, for the user."""
+
+
+class NodeRecord:
+    """
+    One row of the nodes table. Slotted so large result sets stay small, with the owner as an int so ownership
+    checks are plain integer comparisons, and the additional info JSON only decoded when something reads it.
+    """
+
+    __slots__ = ("node_id", "owner_id", "timestamp", "short_name", "long_name", "raw_data", "version", "_data")
+
+    def __init__(self, node_id, owner_id, timestamp, short_name, long_name, raw_data, version=1):
+        self.node_id = node_id
+        # The column yields ints; only legacy text values pay for a conversion
+        if not isinstance(owner_id, int) and owner_id is not None and str(owner_id).isdigit():
+            owner_id = int(owner_id)
+        self.owner_id = owner_id
+        self.timestamp = timestamp
+        self.short_name = short_name
+        self.long_name = long_name
+        self.raw_data = raw_data
+        self.version = version
+        self._data = None
+
+    @property
+    def data(self) -> dict:
+        """The additional node info, decoded on first access. Malformed JSON reads as no answers."""
+        if self._data is None:
+            try:
+                decoded = json.loads(self.raw_data) if self.raw_data else {}
+            except ValueError:
+                decoded = {}
+            self._data = decoded if isinstance(decoded, dict) else {}
+        return self._data
+
+    def is_owned_by(self, user_id) -> bool:
+        return self.owner_id == user_id
+
+    def __repr__(self):
+        return f"NodeRecord({self.node_id!r}, owner={self.owner_id!r}, {self.short_name!r}, {self.long_name!r})"
+
+
+def node_record_factory(cursor, row) -> NodeRecord:
+    """sqlite3 row factory for queries selecting NODE_COLUMNS."""
+    return NodeRecord(*row)
+
+
+def fetch_node(conn, node_id: str):
+    """The NodeRecord for a Node ID, or None. Node IDs are stored uppercase, so this is a primary key lookup."""
+    cursor = conn.cursor()
+    cursor.row_factory = node_record_factory
+    return execute(cursor, "node_by_id", (node_id.strip().upper(),)).fetchone()
+
+
+def _explain_miss(conn, node_id: str, owner_id):
+    """Works out why a conditional write matched nothing. Only runs on the (rare) failure path."""
+    node = fetch_node(conn, node_id)
+    if node is None:
+        return NodeConflict(f"No node found with ID `{node_id}`.")
+    if owner_id is not None and not node.is_owned_by(owner_id):
+        return NodeConflict("You do not own this node.")
+    return NodeConflict(
+        f"Node `{node_id}` was changed by someone else since you opened it (now at version {node.version}). "
+        "Nothing was saved; please start the edit again."
+    )
+
+
+def update_node(conn, node_id: str, owner_id=None, version=None, **values) -> NodeRecord:
+    """
+    Sets `values` on a node in one conditional UPDATE, only if it is still owned by `owner_id` and still at
+    `version` (either check is skipped when None), and bumps its version. Returns the updated NodeRecord;
+    raises NodeConflict if the node is gone, owned by someone else, or was changed in the meantime.
+    """
+    unknown = set(values) - set(EDITABLE_COLUMNS)
+    if unknown or not values or None in values.values():
+        raise ValueError(f"Cannot update node columns: {', '.join(sorted(unknown)) or 'none given'}")
+    node_id = node_id.strip().upper()
+    cursor = conn.cursor()
+    cursor.row_factory = node_record_factory
+    params = {**dict.fromkeys(EDITABLE_COLUMNS), **values, "node_id": node_id, "owner_id": owner_id, "version": version}
+    node = next(iter(execute(cursor, "update_node_checked", params).fetchall()), None)
+    if node is None:
+        raise _explain_miss(conn, node_id, owner_id)
+    return node
+
+
+def insert_node(conn, node_id: str, owner_id: int, short_name: str, long_name: str, data_json: str = "{}") -> NodeRecord:
+    """Registers a node in a single INSERT. Raises NodeConflict if the Node ID is already taken."""
+    node_id = node_id.strip().upper()
+    cursor = conn.cursor()
+    cursor.row_factory = node_record_factory
+    try:
+        return execute(cursor, "insert_node", (node_id, owner_id, short_name, long_name, data_json)).fetchall()[0]
+    except sqlite3.IntegrityError:
+        raise NodeConflict(f"Node with ID `{node_id}` already exists in the database.") from None
+
+
+def delete_node_row(conn, node_id: str, owner_id=None, version=None, actor_id=None, reason="deleted") -> NodeRecord:
+    """
+    Moves a node into the archive with one conditional DELETE, with the same checks and errors as update_node.
+    Returns the deleted row.
+    """
+    node_id = node_id.strip().upper()
+    params = {"node_id": node_id, "owner_id": owner_id, "version": version}
+    execute(conn, "archive_node_checked", {**params, "actor_id": _actor(actor_id), "reason": reason})
+    cursor = conn.cursor()
+    cursor.row_factory = node_record_factory
+    node = next(iter(execute(cursor, "delete_node_checked", params).fetchall()), None)
+    if node is None:
+        raise _explain_miss(conn, node_id, owner_id)
+    return node
+
+
+def _actor(actor_id):
+    # archived_by is text, like the journal's actor IDs
+    return str(actor_id) if actor_id is not None else None
+
+
+def _bulk_params(node_ids, owner_id) -> dict:
+    """Parameters of the bulk statements: the IDs as one JSON array, so the statement text never changes."""
+    if node_ids is None and owner_id is None:
+        raise ValueError("A bulk write needs node IDs, an owner or both")
+    return {"node_ids": json.dumps(node_ids) if node_ids is not None else None, "owner_id": owner_id}
+
+
+def _sort_skipped(conn, node_ids, done: list[NodeRecord]) -> tuple[list[str], list[str]]:
+    """Splits the IDs a bulk write skipped into (not found, owned by someone else) with one query."""
+    written = {node.node_id for node in done}
+    skipped = [node_id for node_id in node_ids or () if node_id not in written]
+    if not skipped:
+        return [], []
+    existing = {row[0] for row in execute(conn, "existing_node_ids", skipped)}
+    return [node_id for node_id in skipped if node_id not in existing], [node_id for node_id in skipped if node_id in existing]
+
+
+def transfer_nodes(conn, node_ids, owner_id, new_owner_id) -> tuple[list[NodeRecord], list[str], list[str]]:
+    """
+    Hands every node in `node_ids` (all of them if None) that `owner_id` owns (any owner if None) to `new_owner_id`,
+    in one UPDATE inside the caller's transaction. Returns (transferred nodes, IDs not found, IDs owned by someone else).
+    """
+    node_ids = [node_id.strip().upper() for node_id in node_ids] if node_ids is not None else None
+    params = {**_bulk_params(node_ids, owner_id), "new_owner_id": new_owner_id}
+    cursor = conn.cursor()
+    cursor.row_factory = node_record_factory
+    done = execute(cursor, "transfer_nodes_checked" if node_ids is not None else "transfer_owner_nodes", params).fetchall()
+    return (done, *_sort_skipped(conn, node_ids, done))
+
+
+def delete_nodes(conn, node_ids, owner_id=None, actor_id=None) -> tuple[list[NodeRecord], list[str], list[str]]:
+    """
+    Moves the nodes in `node_ids` that `owner_id` owns (any owner if None) into the archive in one DELETE,
+    like transfer_nodes. Returns (deleted nodes, IDs not found, IDs owned by someone else).
+    """
+    node_ids = [node_id.strip().upper() for node_id in node_ids] if node_ids is not None else None
+    params = _bulk_params(node_ids, owner_id)
+    by_ids = node_ids is not None
+    archive_params = {**params, "actor_id": _actor(actor_id), "reason": "deleted"}
+    execute(conn, "archive_nodes_checked" if by_ids else "archive_owner_nodes", archive_params)
+    cursor = conn.cursor()
+    cursor.row_factory = node_record_factory
+    done = execute(cursor, "delete_nodes_checked" if by_ids else "delete_owner_nodes", params).fetchall()
+    return (done, *_sort_skipped(conn, node_ids, done))
+
+
+def restore_node(conn, node_id: str, owner_id=None) -> NodeRecord:
+    """
+    Brings the most recently archived copy of a node back into the directory, if `owner_id` owned it (anyone's if None).
+    Raises NodeConflict if there is nothing to restore or the Node ID has been registered again since.
+    """
+    node_id = node_id.strip().upper()
+    row = execute(conn, "latest_archived", (node_id,)).fetchone()
+    if row is None:
+        raise NodeConflict(f"No deleted node found with ID `{node_id}`.")
+    archive_id, archived_owner_id = row
+    if owner_id is not None and archived_owner_id != owner_id:
+        raise NodeConflict("You do not own this node.")
+    cursor = conn.cursor()
+    cursor.row_factory = node_record_factory
+    try:
+        node = execute(cursor, "restore_archived", (archive_id,)).fetchall()[0]
+    except sqlite3.IntegrityError:
+        raise NodeConflict(f"Node `{node_id}` has been registered again since it was deleted.") from None
+    execute(conn, "delete_archived", (archive_id,))
+    return node
+
+
+def format_bulk_result(summary: str, done: list[NodeRecord], missing=(), not_owned=(), invalid=()) -> str:
+    """One reply for a bulk command: what was changed and, per reason, what was skipped."""
+    listed = ": " + ", ".join(f"`{node.node_id}`" for node in done) if done else "."
+    lines = [f"{'✅' if done else '⚠️'} {summary}{listed}"]
+    for label, node_ids in (("Not found", missing), ("Not yours", not_owned), ("Not node IDs", invalid)):
+        if node_ids:
+            lines.append(f"{label}: " + ", ".join(f"`{node_id}`" for node_id in node_ids))
+    content = "\n".join(lines)
+    return content if len(content) <= 2000 else content[:1997] + "..."
@@ -0,0 +1,109 @@
+"""
+Materialized node statistics.
+
+`node_stats` holds one counter per (dimension, value) and `node_growth` holds nodes added and removed per month.
+Both are kept up to date by triggers on the `nodes` table, so reading them never scans the directory. Growth is
+counted in the month a row enters or leaves `nodes`, so a delete and an undelete cancel out in the same month
+instead of the restore being credited to the node's original registration month.
+"""
+
+# additional_node_data_json keys that get a breakdown in !nodestats
+STATS_DIMENSIONS = ["node_type", "node_role", "general_location", "power_source", "hardware_model"]
+
+# Dimension used for the overall node count
+TOTAL_DIMENSION = "total"
+
+UNKNOWN_VALUE = "Unknown"
+
+
+def _value_expression(row: str, dimension: str) -> str:
+    """SQL expression extracting a dimension's value from a row's JSON, falling back to 'Unknown'."""
+    json_column = f"{row}.additional_node_data_json"
+    return (
+        f"COALESCE(NULLIF(CAST(CASE WHEN json_valid({json_column}) "
+        f"THEN json_extract({json_column}, '$.{dimension}') END AS TEXT), ''), '{UNKNOWN_VALUE}')"
+    )
+
+
+def _bump(dimension_sql: str, value_sql: str, delta: int) -> str:
+    return (
+        f"INSERT INTO node_stats (dimension, value, count) VALUES ({dimension_sql}, {value_sql}, {delta}) "
+        "ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;"
+    )
+
+
+def _bump_dimensions(row: str, delta: int) -> str:
+    return "\n".join(_bump(f"'{dimension}'", _value_expression(row, dimension), delta) for dimension in STATS_DIMENSIONS)
+
+
+STATS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS node_stats (
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, value)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS node_growth (
+        month TEXT PRIMARY KEY,
+        added INTEGER NOT NULL DEFAULT 0,
+        removed INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS nodes_stats_after_insert AFTER INSERT ON nodes
+    BEGIN
+        {_bump(f"'{TOTAL_DIMENSION}'", "''", 1)}
+        {_bump_dimensions("NEW", 1)}
+        INSERT INTO node_growth (month, added) VALUES (strftime('%Y-%m', 'now'), 1)
+        ON CONFLICT (month) DO UPDATE SET added = added + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS nodes_stats_after_delete AFTER DELETE ON nodes
+    BEGIN
+        {_bump(f"'{TOTAL_DIMENSION}'", "''", -1)}
+        {_bump_dimensions("OLD", -1)}
+        INSERT INTO node_growth (month, removed) VALUES (strftime('%Y-%m', 'now'), 1)
+        ON CONFLICT (month) DO UPDATE SET removed = removed + 1;
+        DELETE FROM node_stats WHERE dimension != '{TOTAL_DIMENSION}' AND count <= 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS nodes_stats_after_update AFTER UPDATE OF additional_node_data_json ON nodes
+    WHEN OLD.additional_node_data_json IS NOT NEW.additional_node_data_json
+    BEGIN
+        {_bump_dimensions("OLD", -1)}
+        {_bump_dimensions("NEW", 1)}
+        DELETE FROM node_stats WHERE dimension != '{TOTAL_DIMENSION}' AND count <= 0;
+    END
+    """,
+]
+
+
+def create_stats_schema(cursor):
+    """Create the statistics tables and the triggers that maintain them."""
+    for statement in STATS_SCHEMA:
+        cursor.execute(statement)
+
+
+def rebuild_stats(cursor):
+    """Recompute the statistics tables from scratch with one pass per dimension. Only needed when (re)creating them."""
+    cursor.execute("DELETE FROM node_stats")
+    cursor.execute("DELETE FROM node_growth")
+    cursor.execute(
+        "INSERT INTO node_stats (dimension, value, count) SELECT ?, '', COUNT(*) FROM nodes",
+        (TOTAL_DIMENSION,),
+    )
+    for dimension in STATS_DIMENSIONS:
+        cursor.execute(
+            f"INSERT INTO node_stats (dimension, value, count) "
+            f"SELECT ?, {_value_expression('nodes', dimension)} AS value, COUNT(*) FROM nodes GROUP BY value",
+            (dimension,),
+        )
+    cursor.execute(
+        "INSERT INTO node_growth (month, added) "
+        "SELECT strftime('%Y-%m', COALESCE(timestamp, 'now')) AS month, COUNT(*) FROM nodes GROUP BY month"
+    )
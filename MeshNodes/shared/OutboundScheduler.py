@@ -0,0 +1,244 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+def _pending_interaction(destination):
+    """The interaction behind a slash or hybrid command's Context if it hasn't been responded to yet, else None."""
+    interaction = getattr(destination, "interaction", None)
+    if interaction is None or interaction.response.is_done():
+        return None
+    return interaction
+
+
+class _OutboundJob:
+    def __init__(self, kind, target, kwargs):
+        self.kind = kind  # "send" or "edit"
+        self.target = target  # Messageable for sends, Message for edits
+        self.kwargs = kwargs
+        self.futures = [asyncio.get_running_loop().create_future()]
+
+
+class _ChannelQueue:
+    """FIFO of outbound jobs for one channel/DM, paced to stay inside Discord's per-channel buckets."""
+
+    def __init__(self, scheduler, channel_id):
+        self.scheduler = scheduler
+        self.channel_id = channel_id
+        self.jobs = deque()
+        self.pending_edits = {}  # message id -> queued edit job, so later edits replace earlier ones
+        self.recent = {"send": deque(), "edit": deque()}  # timestamps of recent calls per bucket
+        self.current = None  # the job being sent right now, already off the queue
+        self.worker = None
+
+    def push(self, job):
+        if job.kind == "edit":
+            pending = self.pending_edits.get(job.target.id)
+            if pending:
+                # Coalesce: the queued edit takes the newest values and resolves every waiter at once
+                pending.kwargs.update(job.kwargs)
+                pending.futures.extend(job.futures)
+                self.scheduler.coalesced_edits += 1
+                return
+            self.pending_edits[job.target.id] = job
+        self.jobs.append(job)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    async def wait_for_bucket(self, kind):
+        recent = self.recent[kind]
+        window = self.scheduler.bucket_window
+        while recent and time.monotonic() - recent[0] > window:
+            recent.popleft()
+        if len(recent) >= self.scheduler.bucket_size:
+            self.scheduler.throttled += 1
+            await asyncio.sleep(window - (time.monotonic() - recent[0]))
+            recent.popleft()
+        recent.append(time.monotonic())
+
+    async def run(self):
+        try:
+            while self.jobs:
+                job = self.jobs[0]
+                await self.wait_for_bucket(job.kind)
+                self.jobs.popleft()
+                self.current = job
+                if job.kind == "edit":
+                    self.pending_edits.pop(job.target.id, None)
+                try:
+                    if job.kind == "send":
+                        result = await job.target.send(**job.kwargs)
+                        self.scheduler.sent += 1
+                    else:
+                        result = await job.target.edit(**job.kwargs)
+                        self.scheduler.edited += 1
+                except Exception as e:
+                    for future in job.futures:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for future in job.futures:
+                        if not future.done():
+                            future.set_result(result)
+                self.current = None
+        finally:
+            if not self.jobs and self.scheduler.channels.get(self.channel_id) is self:
+                del self.scheduler.channels[self.channel_id]
+
+    def abort(self, error: Exception):
+        """Fails every job still waiting, and the one in flight, so nothing awaiting them hangs."""
+        jobs = ([self.current] if self.current else []) + list(self.jobs)
+        for job in jobs:
+            for future in job.futures:
+                if not future.done():
+                    future.set_exception(error)
+        self.jobs.clear()
+        self.pending_edits.clear()
+
+
+class DeferredReply:
+    """
+    Stand-in for a "loading..." message. The placeholder is only sent if the result isn't ready within
+    the scheduler's placeholder delay; otherwise the first edit is sent as the reply itself.
+    Supports the same `edit(...)` / `delete()` calls commands already make on a loading message.
+    For slash and hybrid commands the interaction is deferred straight away instead, since its 3 second
+    deadline can't wait for the placeholder delay; Discord then shows its own "thinking..." state.
+    """
+
+    def __init__(self, scheduler, destination, placeholder_text):
+        self.scheduler = scheduler
+        self.destination = destination
+        self.placeholder_text = placeholder_text
+        self.message = None
+        self.deleted = False
+        self.placeholder_started = False
+        if _pending_interaction(destination) is not None:
+            self.placeholder_started = True
+            self.placeholder_task = asyncio.create_task(self._defer())
+        else:
+            self.placeholder_task = asyncio.create_task(self._send_placeholder_later())
+
+    async def _defer(self):
+        try:
+            await self.destination.defer()
+        except Exception as e:
+            logger.warning(f"Failed to defer interaction: {e}")
+
+    async def _send_placeholder_later(self):
+        await asyncio.sleep(self.scheduler.placeholder_delay)
+        self.placeholder_started = True
+        try:
+            self.message = await self.scheduler.send(self.destination, content=self.placeholder_text)
+        except Exception as e:
+            logger.warning(f"Failed to send loading message: {e}")
+
+    async def _settle_placeholder(self):
+        """Cancel the placeholder if it hasn't gone out yet, otherwise wait until it has."""
+        if not self.placeholder_started:
+            self.placeholder_task.cancel()
+            self.scheduler.placeholders_skipped += 1
+            return
+        await self.placeholder_task
+
+    async def edit(self, **kwargs):
+        if self.deleted:
+            return None
+        if self.message is None:
+            await self._settle_placeholder()
+        if self.message is None:
+            self.message = await self.scheduler.send(self.destination, **kwargs)
+            return self.message
+        return await self.scheduler.edit(self.message, **kwargs)
+
+    async def delete(self):
+        if self.deleted:
+            return
+        self.deleted = True
+        if self.message is None:
+            await self._settle_placeholder()
+        if self.message is not None:
+            try:
+                await self.message.delete()
+            except discord.NotFound:
+                pass
+
+
+class OutboundScheduler:
+    """
+    Central queue for messages the cog sends. Sends are paced per channel/DM so bursts (imports, meetups)
+    don't trip Discord's rate limits, repeated edits to the same message are coalesced into the latest one,
+    and loading placeholders are skipped entirely when a command finishes quickly.
+    """
+
+    def __init__(self, placeholder_delay=0.75, bucket_size=5, bucket_window=5.0):
+        self.placeholder_delay = placeholder_delay
+        self.bucket_size = bucket_size
+        self.bucket_window = bucket_window
+        self.channels = {}
+
+        # Metrics
+        self.sent = 0
+        self.edited = 0
+        self.coalesced_edits = 0
+        self.placeholders_skipped = 0
+        self.throttled = 0
+
+    @staticmethod
+    def _channel_id(target):
+        channel = getattr(target, "channel", None) or target
+        return getattr(channel, "id", id(channel))
+
+    def _queue(self, target):
+        channel_id = self._channel_id(target)
+        queue = self.channels.get(channel_id)
+        if queue is None:
+            queue = self.channels[channel_id] = _ChannelQueue(self, channel_id)
+        return queue
+
+    async def send(self, destination, **kwargs):
+        """Queue a message for `destination` (a Context, channel or DM) and wait until it's sent."""
+        if _pending_interaction(destination) is not None:
+            # The first response to an interaction must land within 3 seconds and isn't a channel message,
+            # so it skips the queue; follow-ups after it are paced like any other send
+            self.sent += 1
+            return await destination.send(**kwargs)
+        job = _OutboundJob("send", destination, kwargs)
+        self._queue(destination).push(job)
+        return await job.futures[0]
+
+    async def edit(self, message, **kwargs):
+        """Queue an edit for `message`; edits queued before this one goes out are merged into it."""
+        job = _OutboundJob("edit", message, kwargs)
+        self._queue(message).push(job)
+        return await job.futures[0]
+
+    def loading(self, destination, placeholder_text):
+        return DeferredReply(self, destination, placeholder_text)
+
+    def queue_depths(self) -> dict:
+        return {channel_id: len(queue.jobs) for channel_id, queue in self.channels.items() if queue.jobs}
+
+    def stats(self) -> dict:
+        depths = self.queue_depths()
+        return {
+            "queued": sum(depths.values()),
+            "busy_channels": len(depths),
+            "max_queue_depth": max(depths.values(), default=0),
+            "sent": self.sent,
+            "edited": self.edited,
+            "coalesced_edits": self.coalesced_edits,
+            "placeholders_skipped": self.placeholders_skipped,
+            "throttled": self.throttled,
+        }
+
+    async def close(self):
+        for queue in list(self.channels.values()):
+            if queue.worker:
+                queue.worker.cancel()
+            queue.abort(RuntimeError("The outbound message queue was closed before this message was sent."))
+        self.channels.clear()
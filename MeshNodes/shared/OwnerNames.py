@@ -0,0 +1,134 @@
+import time
+import asyncio
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# How long a resolved name is trusted, and how long an owner who isn't a member anymore is remembered as gone
+NAME_TTL = 6 * 60 * 60
+MISSING_TTL = 60 * 60
+
+# Members one gateway member request may ask for
+MEMBER_QUERY_SIZE = 100
+MEMBER_QUERY_TIMEOUT = 10
+
+
+class OwnerNameCache:
+    """
+    Resolves node owner IDs to display names for listings and reports, without a fetch_user call per node.
+    Names come from the member caches first. The rest are requested from the gateway: a few at a time by ID, up to
+    100 per request, or when there are more than that, by chunking the whole guild's member list in one request, so
+    annotating thousands of nodes takes a handful of requests. Owners no guild returns are cached as missing (for a
+    shorter time) so departed members aren't asked for again on every listing.
+    """
+
+    def __init__(self, ttl: float = NAME_TTL, missing_ttl: float = MISSING_TTL):
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.entries = {}  # owner id -> (display name or None if not a member, expiry)
+        self.lock = asyncio.Lock()
+        self.queries = 0  # member requests sent, for diagnostics
+        self.next_sweep = 0.0
+
+    def _cached(self, owner_id, now):
+        entry = self.entries.get(owner_id)
+        if entry is None or entry[1] <= now:
+            return False, None
+        return True, entry[0]
+
+    def _store(self, owner_id, name, now):
+        self.entries[owner_id] = (name, now + (self.ttl if name is not None else self.missing_ttl))
+
+    def _evict_expired(self, now):
+        """Drops expired entries, at most once per `missing_ttl`, so owners who are never asked for again don't pile up."""
+        if now < self.next_sweep:
+            return
+        self.next_sweep = now + self.missing_ttl
+        for owner_id in [owner_id for owner_id, (_, expiry) in self.entries.items() if expiry <= now]:
+            del self.entries[owner_id]
+
+    def forget(self, owner_id=None):
+        """Drops one owner's cached name (all of them if None), e.g. after a member changed their nickname."""
+        if owner_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(owner_id, None)
+
+    async def resolve(self, owner_ids, guilds) -> dict:
+        """
+        Looks `owner_ids` up in `guilds`, in order. Returns owner id -> display name, or None for owners who are in
+        none of them. Owners that couldn't be looked up (e.g. the gateway timed out) are left out.
+        """
+        wanted = {owner_id for owner_id in owner_ids if isinstance(owner_id, int)}
+        names = {}
+        now = time.monotonic()
+        for owner_id in wanted:
+            hit, name = self._cached(owner_id, now)
+            if hit:
+                names[owner_id] = name
+        missing = wanted - names.keys()
+        if not missing:
+            return names
+
+        async with self.lock:
+            # Another listing may have resolved some of these while this one waited
+            now = time.monotonic()
+            self._evict_expired(now)
+            for owner_id in list(missing):
+                hit, name = self._cached(owner_id, now)
+                if hit:
+                    names[owner_id] = name
+                    missing.discard(owner_id)
+
+            failed = False
+            for guild in guilds:
+                if not missing:
+                    break
+                if len(missing) > MEMBER_QUERY_SIZE and not guild.chunked:
+                    try:
+                        self.queries += 1
+                        await asyncio.wait_for(guild.chunk(cache=True), MEMBER_QUERY_TIMEOUT)
+                    except (asyncio.TimeoutError, discord.ClientException, discord.HTTPException) as e:
+                        # Chunking needs the members intent; asking by ID below still works without it
+                        logger.debug(f"Could not chunk the members of guild {guild.id}: {e}")
+                for owner_id in list(missing):
+                    member = guild.get_member(owner_id)
+                    if member is not None:
+                        names[owner_id] = member.display_name
+                        self._store(owner_id, member.display_name, now)
+                        missing.discard(owner_id)
+                # A chunked guild's cache holds every member, so whoever is still missing isn't one
+                pending = sorted(missing) if not guild.chunked else []
+                for start in range(0, len(pending), MEMBER_QUERY_SIZE):
+                    chunk = pending[start : start + MEMBER_QUERY_SIZE]
+                    try:
+                        self.queries += 1
+                        members = await asyncio.wait_for(
+                            guild.query_members(user_ids=chunk, limit=len(chunk), cache=True), MEMBER_QUERY_TIMEOUT
+                        )
+                    except (asyncio.TimeoutError, discord.ClientException, discord.HTTPException) as e:
+                        logger.warning(f"Member lookup in guild {guild.id} failed: {e}")
+                        failed = True
+                        break
+                    for member in members:
+                        names[member.id] = member.display_name
+                        self._store(member.id, member.display_name, now)
+                        missing.discard(member.id)
+
+            # Only cache owners as gone when every guild actually answered for them
+            if not failed:
+                for owner_id in missing:
+                    names[owner_id] = None
+                    self._store(owner_id, None, now)
+        return names
+
+
+def owner_label(owner_id, names: dict) -> str:
+    """An owner for embeds: their mention plus, when known, their display name (or that they have left)."""
+    if owner_id not in names:
+        return f"<@{owner_id}>"
+    if names[owner_id] is None:
+        return f"<@{owner_id}> (no longer a member)"
+    return f"<@{owner_id}> ({discord.utils.escape_markdown(names[owner_id])})"
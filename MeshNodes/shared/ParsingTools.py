@@ -1,5 +1,6 @@
 import csv
 import io
+import re
 
 REQUIRED_HEADERS = [
     "node_id","discord_id","short_name","long_name","node_type","node_role",
@@ -7,10 +8,11 @@ REQUIRED_HEADERS = [
     "is_attended","antenna_above_roofline","antenna_dbi","antenna_height","notes"
 ]
 
-def parse_csv_string(csv_string: str) -> list[dict]:
+def parse_csv_string(csv_string: str, first_row_number: int = 2) -> list[dict]:
     """
     Parse a CSV string into a list of dicts with required headers.
     Raises ValueError if headers are missing/mismatched or rows malformed.
+    `first_row_number` is the row number errors give the first data row, for parsing one chunk of a bigger file.
     """
     if not csv_string.strip():
         raise ValueError("Empty CSV string")
@@ -31,7 +33,7 @@ def parse_csv_string(csv_string: str) -> list[dict]:
     data_rows = rows[1:]
     col_count = len(REQUIRED_HEADERS)
 
-    for i, row in enumerate(data_rows, start=2):
+    for i, row in enumerate(data_rows, start=first_row_number):
         if len(row) != col_count:
             raise ValueError(
                 f"Row {i} has {len(row)} columns, expected {col_count}"
@@ -39,8 +41,74 @@ def parse_csv_string(csv_string: str) -> list[dict]:
 
     return [dict(zip(headers, row)) for row in data_rows]
 
+def split_csv_records(csv_string: str, parts: int) -> tuple[str, list[tuple[int, str]]]:
+    """
+    Split CSV text into its header line and up to `parts` chunks of whole data records, without parsing any fields:
+    a line belongs to the record before it while that record holds an odd number of quote characters.
+    Returns (header, [(index of the chunk's first data record, chunk text)]); there's always at least one chunk.
+    Raises ValueError for an empty string, like parse_csv_string.
+    """
+    if not csv_string.strip():
+        raise ValueError("Empty CSV string")
+
+    records = []
+    open_record = None
+    for line in csv_string.strip().split("\n"):
+        if open_record is None:
+            open_record = [line]
+        else:
+            open_record.append(line)
+        if sum(part.count('"') for part in open_record) % 2 == 0:
+            records.append("\n".join(open_record))
+            open_record = None
+    if open_record is not None:
+        records.append("\n".join(open_record))
+
+    header, data = records[0], records[1:]
+    size = max(1, -(-len(data) // parts))
+    chunks = [(start, "\n".join(data[start : start + size])) for start in range(0, len(data), size)]
+    return header, chunks or [(0, "")]
+
 def filter_node_ids_length(data: list[dict]) -> list[dict]:
     """
     Filter entries where 'node_id' has exactly 8 characters.
     """
     return [entry for entry in data if len(entry.get("node_id", "")) == 8]
+
+# Meshtastic node IDs are 8 hex characters, optionally prefixed with "!" (e.g. !a1b2c3d4)
+NODE_ID_PATTERN = re.compile(r"(?<![0-9A-Za-z])!?([0-9A-Fa-f]{8})(?![0-9A-Za-z])")
+PREFIXED_NODE_ID_PATTERN = re.compile(r"(?<![0-9A-Za-z])![0-9A-Fa-f]{8}(?![0-9A-Za-z])")
+TRACEROUTE_ARROW_PATTERN = re.compile(r"-+>|→|⇒")
+
+def extract_node_ids(text: str) -> list[str]:
+    """
+    Extract every node ID from a string, in order of appearance, normalized to uppercase without the "!".
+    Repeated IDs are kept so traceroute hops stay in route order.
+    """
+    return [match.group(1).upper() for match in NODE_ID_PATTERN.finditer(text)]
+
+def parse_node_id_list(text: str) -> tuple[list[str], list[str]]:
+    """
+    Split a comma separated list of node IDs ("a1b2c3d4,!e5f6a7b8") into unique uppercase IDs without the "!",
+    in the order given, and the entries that aren't node IDs.
+    """
+    node_ids = []
+    invalid = []
+    for entry in re.split(r"[,\s]+", text.strip()):
+        if not entry:
+            continue
+        match = NODE_ID_PATTERN.fullmatch(entry)
+        if match:
+            node_ids.append(match.group(1).upper())
+        else:
+            invalid.append(entry)
+    return list(dict.fromkeys(node_ids)), invalid
+
+def looks_like_traceroute(text: str) -> bool:
+    """
+    Check if a message looks like pasted Meshtastic traceroute output ("!a1b2c3d4 --> !e5f6a7b8 --> ...").
+    Requires at least two "!"-prefixed node IDs joined by an arrow so normal chat doesn't trigger it.
+    """
+    if not TRACEROUTE_ARROW_PATTERN.search(text):
+        return False
+    return len(PREFIXED_NODE_ID_PATTERN.findall(text)) >= 2
@@ -0,0 +1,299 @@
+"""
+Named registry of the SQL statements run against a node directory.
+
+Statements are executed by name through execute(), so every caller sends exactly the same text and hits
+sqlite3's per-connection prepared statement cache, and so check_query_plans() can EXPLAIN all of them.
+Statements marked full_scan read the whole table by design (index rebuilds, exports, reports); any other
+statement whose plan scans the nodes table is flagged by !dbexplain and by the offline check:
+
+    python -m MeshNodes.shared.Queries path/to/meshnodes.db
+
+Statements built from a list of IDs contain {in_list}, filled with one placeholder per ID; the conditional writes
+take their ID list as one JSON array through json_each instead, so each has a single text whatever the list's length.
+Only schema and migration statements are not registered.
+"""
+
+import re
+import sys
+import sqlite3
+from dataclasses import dataclass
+
+# Column order the NodeRecord row factory expects
+NODE_COLUMNS = "node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json, version"
+
+# Columns copied between nodes and nodes_archive
+ARCHIVED_COLUMNS = "node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json, version, updated_at"
+
+# Column order QuestionnaireSessions expects
+SESSION_COLUMNS = (
+    "session_id, user_id, guild_id, node_id, owner_id, version, existing_json, answers_json, page, "
+    "channel_id, message_id, expires_at"
+)
+
+# Conditions of the checked writes in NodeRecord: a NULL owner or version skips that check
+OWNER_CHECK_SQL = "(:owner_id IS NULL OR discord_id = :owner_id)"
+VERSION_CHECK_SQL = "(:version IS NULL OR version = :version)"
+NODE_LIST_SQL = "node_id IN (SELECT value FROM json_each(:node_ids))"
+
+# When a node last changed; nodes never edited since registering fall back to their registration time
+LAST_UPDATED_SQL = "COALESCE(updated_at, timestamp)"
+
+# How many IDs check_query_plans puts into an {in_list}
+SAMPLE_LIST_SIZE = 3
+
+_SCAN_PATTERN = re.compile(r"^SCAN nodes\b")
+_NAMED_PARAMETER = re.compile(r"(?<![\w:]):([A-Za-z_]\w*)")
+
+
+@dataclass(frozen=True)
+class Query:
+    sql: str
+    full_scan: bool = False  # reads the whole table on purpose; not flagged by the plan check
+
+
+QUERIES = {
+    # Node lookups
+    "node_by_id": Query(f"SELECT {NODE_COLUMNS} FROM nodes WHERE node_id = ?"),
+    "nodes_by_ids": Query(f"SELECT {NODE_COLUMNS} FROM nodes WHERE node_id IN ({{in_list}})"),
+    "existing_node_ids": Query("SELECT node_id FROM nodes WHERE node_id IN ({in_list})"),
+    "nodes_by_owner": Query(f"SELECT {NODE_COLUMNS} FROM nodes WHERE discord_id = ? ORDER BY node_id"),
+    "nodes_by_name": Query(f"SELECT {NODE_COLUMNS} FROM nodes WHERE lower(short_name) = ? OR lower(long_name) = ?"),
+    "insert_node": Query(
+        "INSERT INTO nodes (node_id, discord_id, short_name, long_name, additional_node_data_json) "
+        f"VALUES (?, ?, ?, ?, ?) RETURNING {NODE_COLUMNS}"
+    ),
+    # Imports insert or update in place, keeping the original registration timestamp
+    "upsert_node": Query("""
+        INSERT INTO nodes
+        (node_id, discord_id, short_name, long_name, additional_node_data_json)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (node_id) DO UPDATE SET
+            discord_id = excluded.discord_id,
+            short_name = excluded.short_name,
+            long_name = excluded.long_name,
+            additional_node_data_json = excluded.additional_node_data_json,
+            version = nodes.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        """),
+    # Conditional writes, which only match while the node still has the expected owner and version. A NULL column
+    # value keeps the current one; every editable column is NOT NULL, so NULL is never a value to write.
+    "update_node_checked": Query(f"""
+        UPDATE nodes SET
+            discord_id = COALESCE(:discord_id, discord_id),
+            short_name = COALESCE(:short_name, short_name),
+            long_name = COALESCE(:long_name, long_name),
+            additional_node_data_json = COALESCE(:additional_node_data_json, additional_node_data_json),
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE node_id = :node_id AND {OWNER_CHECK_SQL} AND {VERSION_CHECK_SQL}
+        RETURNING {NODE_COLUMNS}
+        """),
+    "archive_node_checked": Query(
+        f"INSERT INTO nodes_archive ({ARCHIVED_COLUMNS}, archived_by, reason) "
+        f"SELECT {ARCHIVED_COLUMNS}, :actor_id, :reason FROM nodes "
+        f"WHERE node_id = :node_id AND {OWNER_CHECK_SQL} AND {VERSION_CHECK_SQL}"
+    ),
+    "delete_node_checked": Query(
+        f"DELETE FROM nodes WHERE node_id = :node_id AND {OWNER_CHECK_SQL} AND {VERSION_CHECK_SQL} " f"RETURNING {NODE_COLUMNS}"
+    ),
+    # Bulk variants, for a list of nodes (and optionally their owner) or for every node of one owner
+    "transfer_nodes_checked": Query(
+        "UPDATE nodes SET discord_id = :new_owner_id, version = version + 1, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE {NODE_LIST_SQL} AND {OWNER_CHECK_SQL} RETURNING {NODE_COLUMNS}"
+    ),
+    "transfer_owner_nodes": Query(
+        "UPDATE nodes SET discord_id = :new_owner_id, version = version + 1, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE discord_id = :owner_id RETURNING {NODE_COLUMNS}"
+    ),
+    "archive_nodes_checked": Query(
+        f"INSERT INTO nodes_archive ({ARCHIVED_COLUMNS}, archived_by, reason) "
+        f"SELECT {ARCHIVED_COLUMNS}, :actor_id, :reason FROM nodes WHERE {NODE_LIST_SQL} AND {OWNER_CHECK_SQL}"
+    ),
+    "delete_nodes_checked": Query(f"DELETE FROM nodes WHERE {NODE_LIST_SQL} AND {OWNER_CHECK_SQL} RETURNING {NODE_COLUMNS}"),
+    "archive_owner_nodes": Query(
+        f"INSERT INTO nodes_archive ({ARCHIVED_COLUMNS}, archived_by, reason) "
+        f"SELECT {ARCHIVED_COLUMNS}, :actor_id, :reason FROM nodes WHERE discord_id = :owner_id"
+    ),
+    "delete_owner_nodes": Query(f"DELETE FROM nodes WHERE discord_id = :owner_id RETURNING {NODE_COLUMNS}"),
+    # Whole-directory reads
+    "node_index_rows": Query("SELECT node_id, discord_id, short_name, long_name FROM nodes", full_scan=True),
+    "duplicate_rows": Query("SELECT node_id, discord_id, short_name, long_name, timestamp FROM nodes", full_scan=True),
+    "sheet_rows": Query(
+        "SELECT node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json FROM nodes",
+        full_scan=True,
+    ),
+    # Nodes that have a grid square, with what !nodemap filters and colours by
+    "map_points": Query(
+        """
+        SELECT node_id, short_name,
+            json_extract(additional_node_data_json, '$.grid_square'),
+            json_extract(additional_node_data_json, '$.node_role'),
+            json_extract(additional_node_data_json, '$.node_type'),
+            json_extract(additional_node_data_json, '$.general_location')
+        FROM nodes
+        WHERE json_valid(additional_node_data_json) AND json_extract(additional_node_data_json, '$.grid_square') IS NOT NULL
+        ORDER BY node_id
+        """,
+        full_scan=True,
+    ),
+    # Archive
+    "stale_node_ids": Query(f"SELECT node_id FROM nodes WHERE {LAST_UPDATED_SQL} < datetime('now', ?) LIMIT ?"),
+    "archive_nodes": Query(
+        f"INSERT INTO nodes_archive ({ARCHIVED_COLUMNS}, archived_by, reason) "
+        f"SELECT {ARCHIVED_COLUMNS}, ?, ? FROM nodes WHERE node_id IN ({{in_list}})"
+    ),
+    "delete_nodes": Query("DELETE FROM nodes WHERE node_id IN ({in_list})"),
+    "latest_archived": Query(
+        "SELECT archive_id, discord_id FROM nodes_archive WHERE node_id = ? ORDER BY archive_id DESC LIMIT 1"
+    ),
+    # A restore is a write like any other: it bumps the version, so forms opened before the delete can't save over it
+    "restore_archived": Query(
+        f"INSERT INTO nodes ({ARCHIVED_COLUMNS}) "
+        "SELECT node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json, version + 1, "
+        f"CURRENT_TIMESTAMP FROM nodes_archive WHERE archive_id = ? RETURNING {NODE_COLUMNS}"
+    ),
+    "delete_archived": Query("DELETE FROM nodes_archive WHERE archive_id = ?"),
+    "recent_archived": Query(
+        "SELECT node_id, short_name, long_name, archived_at, reason FROM nodes_archive ORDER BY archive_id DESC LIMIT ?"
+    ),
+    "recent_archived_by_owner": Query(
+        "SELECT node_id, short_name, long_name, archived_at, reason FROM nodes_archive WHERE discord_id = ? "
+        "ORDER BY archive_id DESC LIMIT ?"
+    ),
+    # Statistics
+    "total_nodes": Query("SELECT count FROM node_stats WHERE dimension = ? AND value = ''"),
+    "node_stats": Query("SELECT dimension, value, count FROM node_stats WHERE count > 0 OR dimension = ?"),
+    "node_growth": Query("SELECT month, added, removed FROM node_growth ORDER BY month"),
+    # Change journal; a change stores a snapshot of the node row after it, built inside SQLite
+    "record_change": Query("""
+        INSERT INTO node_changes (node_id, action, actor_id, node_json)
+        SELECT :node_id, :action, :actor_id, json_object(
+            'node_id', node_id,
+            'discord_id', CAST(discord_id AS TEXT),  -- snowflakes overflow JSON number precision in most readers
+            'timestamp', timestamp,
+            'short_name', short_name,
+            'long_name', long_name,
+            'additional_node_data', CASE WHEN json_valid(additional_node_data_json) THEN json(additional_node_data_json) END
+        )
+        FROM nodes WHERE node_id = :node_id
+        """),
+    "record_tombstone": Query(
+        "INSERT INTO node_changes (node_id, action, actor_id, node_json) VALUES (:node_id, :action, :actor_id, NULL)"
+    ),
+    "changes_since_seq": Query(
+        "SELECT seq, changed_at, node_id, action, actor_id, node_json FROM node_changes WHERE seq > ? ORDER BY seq LIMIT ?"
+    ),
+    "changes_since_date": Query(
+        "SELECT seq, changed_at, node_id, action, actor_id, node_json FROM node_changes "
+        "WHERE changed_at >= ? ORDER BY seq LIMIT ?"
+    ),
+    "change_owner_ids": Query(
+        "SELECT DISTINCT json_extract(node_json, '$.discord_id') FROM node_changes WHERE seq BETWEEN ? AND ?"
+    ),
+    "latest_seq": Query("SELECT COALESCE(MAX(seq), 0) FROM node_changes"),
+    "journal_checkpoint_seq": Query("SELECT MAX(seq) FROM node_changes WHERE changed_at < ?"),
+    # Older entries shrink to the latest per node; tombstones of removed nodes go entirely
+    "compact_journal": Query("""
+        DELETE FROM node_changes
+        WHERE seq <= :checkpoint AND (
+            action IN ('delete', 'archive')
+            OR seq < (SELECT MAX(latest.seq) FROM node_changes AS latest WHERE latest.node_id = node_changes.node_id)
+        )
+        """),
+    "journal_meta": Query("SELECT value FROM journal_meta WHERE key = ?"),
+    "set_journal_meta": Query(
+        "INSERT INTO journal_meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+    ),
+    # Only ever moves a counter forwards
+    "raise_journal_meta": Query(
+        "INSERT INTO journal_meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))"
+    ),
+    "delete_journal_meta": Query("DELETE FROM journal_meta WHERE key = ?"),
+    # Sheet mirror
+    "sheet_sync_state": Query("SELECT node_id, row_number, row_hash FROM sheet_sync_state"),
+    "upsert_sheet_sync_state": Query(
+        "INSERT INTO sheet_sync_state (node_id, row_number, row_hash) VALUES (?, ?, ?) "
+        "ON CONFLICT (node_id) DO UPDATE SET row_number = excluded.row_number, row_hash = excluded.row_hash"
+    ),
+    "delete_sheet_sync_state": Query("DELETE FROM sheet_sync_state WHERE node_id = ?"),
+    "clear_sheet_sync_state": Query("DELETE FROM sheet_sync_state"),
+    # Additional info questionnaires in progress
+    "questionnaire_session": Query(f"SELECT {SESSION_COLUMNS} FROM questionnaire_sessions WHERE session_id = ?"),
+    "questionnaire_index_rows": Query("SELECT session_id, user_id, expires_at FROM questionnaire_sessions"),
+    "insert_questionnaire": Query(
+        "INSERT INTO questionnaire_sessions (user_id, guild_id, node_id, owner_id, version, existing_json, expires_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) RETURNING session_id"
+    ),
+    "save_questionnaire": Query(
+        "UPDATE questionnaire_sessions SET answers_json = ?, page = ?, expires_at = ? WHERE session_id = ?"
+    ),
+    "rebase_questionnaire": Query(
+        "UPDATE questionnaire_sessions SET version = ?, existing_json = ?, expires_at = ? WHERE session_id = ?"
+    ),
+    "set_questionnaire_message": Query("UPDATE questionnaire_sessions SET channel_id = ?, message_id = ? WHERE session_id = ?"),
+    "delete_questionnaire": Query("DELETE FROM questionnaire_sessions WHERE session_id = ?"),
+    "delete_user_questionnaire": Query("DELETE FROM questionnaire_sessions WHERE user_id = ? RETURNING channel_id, message_id"),
+    "expire_questionnaires": Query(
+        "DELETE FROM questionnaire_sessions WHERE expires_at <= ? RETURNING session_id, channel_id, message_id"
+    ),
+}
+
+
+def query_sql(name: str, count: int = None) -> str:
+    """A registered statement's text, with `count` placeholders in its {in_list} if it has one."""
+    sql = QUERIES[name].sql
+    if "{in_list}" in sql:
+        return sql.format(in_list=", ".join("?" * count))
+    return sql
+
+
+def execute_many(cursor, name: str, rows):
+    """Runs a registered statement once per parameter row, like cursor.executemany."""
+    return cursor.executemany(QUERIES[name].sql, rows)
+
+
+def execute(cursor, name: str, params=()):
+    """Runs a registered statement on `cursor` (or a connection) and returns the cursor."""
+    sql = QUERIES[name].sql
+    # Any fixed parameters come before the ID list
+    count = len(params) - sql.count("?") if "{in_list}" in sql else None
+    return cursor.execute(query_sql(name, count), params)
+
+
+def explain(conn, name: str) -> list[str]:
+    """The query plan of a registered statement, one line per step, with every parameter bound to NULL."""
+    sql = query_sql(name, SAMPLE_LIST_SIZE)
+    named = _NAMED_PARAMETER.findall(sql)
+    params = dict.fromkeys(named) if named else (None,) * sql.count("?")
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(conn) -> list[tuple[str, list[str], bool]]:
+    """(name, plan, flagged) for every registered statement; flagged ones scan nodes without being meant to."""
+    results = []
+    for name, query in QUERIES.items():
+        plan = explain(conn, name)
+        flagged = not query.full_scan and any(_SCAN_PATTERN.match(step) for step in plan)
+        results.append((name, plan, flagged))
+    return results
+
+
+def main(argv) -> int:
+    if len(argv) != 2:
+        print("Usage: python -m MeshNodes.shared.Queries <path to meshnodes.db>")
+        return 2
+    conn = sqlite3.connect(f"file:{argv[1]}?mode=ro", uri=True)
+    try:
+        results = check_query_plans(conn)
+    finally:
+        conn.close()
+    for name, plan, flagged in results:
+        print(f"{'SCAN' if flagged else 'ok  '} {name}: {'; '.join(plan)}")
+    flagged = [name for name, _, is_flagged in results if is_flagged]
+    print(f"{len(results)} statements checked, {len(flagged)} scan the nodes table: {', '.join(flagged) or 'none'}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,188 @@
+"""
+Additional info questionnaires in progress. Each is a row in questionnaire_sessions holding the answers given so far,
+so a questionnaire survives restarts and can be re-sent with !paperwork resume. Components carry custom IDs of the
+form mnq:<guild>:<session>:<action> and are all handled by one listener, so no View is kept per open questionnaire;
+memory only holds a SessionIndex entry per session, and expired sessions are swept out of both.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from MeshNodes.shared.Queries import execute
+
+CUSTOM_ID_PREFIX = "mnq"
+
+# How long an untouched questionnaire stays resumable; every answer extends it
+SESSION_TTL = 24 * 60 * 60
+
+SESSION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS questionnaire_sessions (
+        session_id INTEGER PRIMARY KEY AUTOINCREMENT,  -- never reused, so a stale message can't reach a newer session
+        user_id INTEGER NOT NULL UNIQUE,
+        guild_id INTEGER NOT NULL,  -- the guild it was started from (0 in DMs), for its questions and custom IDs
+        node_id TEXT NOT NULL,
+        owner_id INTEGER,
+        version INTEGER,
+        existing_json TEXT NOT NULL,
+        answers_json TEXT NOT NULL DEFAULT '{}',
+        page INTEGER NOT NULL DEFAULT 0,
+        channel_id INTEGER,
+        message_id INTEGER,
+        expires_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_questionnaire_sessions_expires_at ON questionnaire_sessions (expires_at)",
+]
+
+
+def create_session_schema(cursor):
+    for statement in SESSION_SCHEMA:
+        cursor.execute(statement)
+
+
+@dataclass
+class QuestionnaireSession:
+    session_id: int
+    user_id: int
+    guild_id: int
+    node_id: str
+    owner_id: Optional[int]  # None skips the ownership check on save, e.g. straight after registering
+    version: Optional[int]
+    existing: dict  # the node's additional info when the questionnaire started
+    answers: dict = field(default_factory=dict)
+    page: int = 0
+    channel_id: Optional[int] = None
+    message_id: Optional[int] = None
+    expires_at: float = 0.0
+
+    def current_data(self) -> dict:
+        return {**self.existing, **self.answers}
+
+    def custom_id(self, action: str) -> str:
+        return f"{CUSTOM_ID_PREFIX}:{self.guild_id}:{self.session_id}:{action}"
+
+
+def parse_custom_id(custom_id: str):
+    """(guild_id, session_id, action) for a questionnaire component's custom ID, or None for anything else."""
+    parts = custom_id.split(":", 3)
+    if len(parts) != 4 or parts[0] != CUSTOM_ID_PREFIX or not parts[1].isdigit() or not parts[2].isdigit():
+        return None
+    return int(parts[1]), int(parts[2]), parts[3]
+
+
+class SessionIndex:
+    """
+    The open questionnaires of one node directory: who has one and when it expires. Lets interactions with
+    expired sessions and sweeps with nothing to do skip the database; the answers themselves stay in SQLite.
+    """
+
+    def __init__(self):
+        self.sessions = {}  # session id -> (user id, expires at)
+        self.by_user = {}  # user id -> session id
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def load(self, rows):
+        """Replaces the index with (session_id, user_id, expires_at) rows."""
+        self.sessions = {session_id: (user_id, expires_at) for session_id, user_id, expires_at in rows}
+        self.by_user = {user_id: session_id for session_id, (user_id, _) in self.sessions.items()}
+
+    def add(self, session_id: int, user_id: int, expires_at: float):
+        previous = self.by_user.get(user_id)
+        if previous is not None:
+            self.sessions.pop(previous, None)
+        self.sessions[session_id] = (user_id, expires_at)
+        self.by_user[user_id] = session_id
+
+    def touch(self, session_id: int, expires_at: float):
+        if session_id in self.sessions:
+            self.sessions[session_id] = (self.sessions[session_id][0], expires_at)
+
+    def remove(self, session_id: int):
+        entry = self.sessions.pop(session_id, None)
+        if entry is not None and self.by_user.get(entry[0]) == session_id:
+            del self.by_user[entry[0]]
+
+    def session_of(self, user_id: int) -> Optional[int]:
+        return self.by_user.get(user_id)
+
+    def is_live(self, session_id: int, now: float = None) -> bool:
+        entry = self.sessions.get(session_id)
+        return entry is not None and entry[1] > (time.time() if now is None else now)
+
+    def clear(self):
+        self.sessions.clear()
+        self.by_user.clear()
+
+    def pop_expired(self, now: float = None) -> list[int]:
+        """Removes and returns the sessions past their expiry."""
+        now = time.time() if now is None else now
+        expired = [session_id for session_id, (_, expires_at) in self.sessions.items() if expires_at <= now]
+        for session_id in expired:
+            self.remove(session_id)
+        return expired
+
+
+def _session_from_row(row) -> QuestionnaireSession:
+    *columns, existing_json, answers_json, page, channel_id, message_id, expires_at = row
+    return QuestionnaireSession(
+        *columns, json.loads(existing_json), json.loads(answers_json), page, channel_id, message_id, expires_at
+    )
+
+
+def start_session(conn, user_id: int, guild_id: int, node_id: str, owner_id, version, existing: dict):
+    """
+    Opens a questionnaire, replacing the user's previous one in this directory.
+    Returns (session, (channel_id, message_id) of the replaced session's message or None).
+    """
+    cursor = conn.cursor()
+    replaced = next(iter(execute(cursor, "delete_user_questionnaire", (user_id,)).fetchall()), None)
+    expires_at = time.time() + SESSION_TTL
+    params = (user_id, guild_id, node_id, owner_id, version, json.dumps(existing), expires_at)
+    session_id = execute(cursor, "insert_questionnaire", params).fetchall()[0][0]
+    conn.commit()
+    session = QuestionnaireSession(session_id, user_id, guild_id, node_id, owner_id, version, existing)
+    session.expires_at = expires_at
+    return session, replaced
+
+
+def load_session(conn, session_id: int) -> Optional[QuestionnaireSession]:
+    row = execute(conn, "questionnaire_session", (session_id,)).fetchone()
+    return _session_from_row(row) if row else None
+
+
+def save_session(conn, session: QuestionnaireSession):
+    """Stores the session's answers and page and extends its expiry."""
+    session.expires_at = time.time() + SESSION_TTL
+    execute(conn, "save_questionnaire", (json.dumps(session.answers), session.page, session.expires_at, session.session_id))
+    conn.commit()
+
+
+def rebase_session(conn, session: QuestionnaireSession, version, existing: dict):
+    """Moves the session onto the node's current version and info, keeping the answers, and extends its expiry."""
+    session.version, session.existing = version, existing
+    session.expires_at = time.time() + SESSION_TTL
+    execute(conn, "rebase_questionnaire", (version, json.dumps(existing), session.expires_at, session.session_id))
+    conn.commit()
+
+
+def set_session_message(conn, session: QuestionnaireSession, channel_id: int, message_id: int):
+    session.channel_id, session.message_id = channel_id, message_id
+    execute(conn, "set_questionnaire_message", (channel_id, message_id, session.session_id))
+    conn.commit()
+
+
+def delete_session(conn, session_id: int):
+    execute(conn, "delete_questionnaire", (session_id,))
+    conn.commit()
+
+
+def expire_sessions(conn, now: float = None) -> list[tuple]:
+    """Deletes every expired session in one statement. Returns their (session_id, channel_id, message_id)."""
+    rows = execute(conn, "expire_questionnaires", (time.time() if now is None else now,)).fetchall()
+    conn.commit()
+    return rows
@@ -0,0 +1,262 @@
+import json
+import os
+import hashlib
+from dataclasses import dataclass, field
+
+from MeshNodes.shared.AdditionalNodeInfo import additional_info_questions
+from MeshNodes.shared.Queries import execute, execute_many
+
+CORE_COLUMNS = ["node_id", "discord_id", "owner_name", "timestamp", "short_name", "long_name"]
+SHEET_HEADERS = CORE_COLUMNS + [q.json_name for q in additional_info_questions]
+
+# Keep each batchUpdate request comfortably inside the Sheets API payload limits
+MAX_ROWS_PER_REQUEST = 5000
+
+SHEET_SYNC_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sheet_sync_state (
+        node_id TEXT PRIMARY KEY,
+        row_number INTEGER NOT NULL,
+        row_hash TEXT NOT NULL
+    )
+    """,
+]
+
+
+def create_sheet_sync_schema(cursor):
+    for statement in SHEET_SYNC_SCHEMA:
+        cursor.execute(statement)
+
+
+class SheetBackend:
+    """A spreadsheet the nodes table is mirrored into. Row 1 is the header, node rows start at row 2."""
+
+    def clear(self):
+        raise NotImplementedError
+
+    def batch_update(self, updates: list[tuple[int, list[list[str]]]]):
+        """Write several blocks of rows in one request. Each update is (first row number, rows)."""
+        raise NotImplementedError
+
+
+class MemorySheetBackend(SheetBackend):
+    """In-memory stand-in for a spreadsheet, counting requests so sync behaviour can be checked locally."""
+
+    def __init__(self):
+        self.rows = []
+        self.requests = 0
+        self.rows_written = 0
+
+    def clear(self):
+        self.rows = []
+        self.requests += 1
+
+    def batch_update(self, updates):
+        self.requests += 1
+        for start_row, rows in updates:
+            end = start_row - 1 + len(rows)
+            if len(self.rows) < end:
+                self.rows.extend([] for _ in range(end - len(self.rows)))
+            self.rows[start_row - 1 : end] = [list(row) for row in rows]
+            self.rows_written += len(rows)
+
+
+class FileSheetBackend(MemorySheetBackend):
+    """Local stand-in that keeps the "spreadsheet" in a JSON file, for testing without Google credentials."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.rows = json.load(f)
+
+    def _save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.rows, f)
+
+    def clear(self):
+        super().clear()
+        self._save()
+
+    def batch_update(self, updates):
+        super().batch_update(updates)
+        self._save()
+
+
+class GoogleSheetsBackend(SheetBackend):
+    """Google Sheets via google-api-python-client and a service account credentials file."""
+
+    SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+    def __init__(self, credentials_path, sheet_id, sheet_name):
+        try:
+            from google.oauth2.service_account import Credentials
+            from googleapiclient.discovery import build
+        except ImportError as e:
+            raise RuntimeError("google-api-python-client and google-auth are required for Google Sheets sync") from e
+
+        credentials = Credentials.from_service_account_file(credentials_path, scopes=self.SCOPES)
+        self.values = build("sheets", "v4", credentials=credentials, cache_discovery=False).spreadsheets().values()
+        self.sheet_id = sheet_id
+        self.sheet_name = sheet_name
+
+    def clear(self):
+        self.values.clear(spreadsheetId=self.sheet_id, range=f"'{self.sheet_name}'").execute()
+
+    def batch_update(self, updates):
+        data = [{"range": f"'{self.sheet_name}'!A{start_row}", "values": rows} for start_row, rows in updates]
+        self.values.batchUpdate(spreadsheetId=self.sheet_id, body={"valueInputOption": "RAW", "data": data}).execute()
+
+
+@dataclass
+class SheetSyncResult:
+    changed: int = 0
+    added: int = 0
+    removed: int = 0
+    requests: int = 0
+    full_resync: bool = False
+    skipped: bool = False
+    ranges: list = field(default_factory=list)
+
+
+def node_to_sheet_row(
+    node_id, discord_id, timestamp, short_name, long_name, additional_node_data_json, owner_names: dict = None
+) -> list[str]:
+    """One sheet row. `owner_names` maps owner IDs to display names; owners missing from it get an empty name."""
+    try:
+        extra = json.loads(additional_node_data_json) if additional_node_data_json else {}
+    except ValueError:
+        extra = {}
+    owner_name = (owner_names or {}).get(discord_id) or ""
+    row = [node_id, str(discord_id), owner_name, str(timestamp or ""), short_name, long_name]
+    for q in additional_info_questions:
+        value = extra.get(q.json_name)
+        row.append("" if value is None else str(value))
+    return row
+
+
+def _row_hash(row: list[str]) -> str:
+    return hashlib.sha1("\x1f".join(row).encode("utf-8")).hexdigest()
+
+
+def compute_sheet_diff(current: dict, state: dict):
+    """
+    Diff the current rows against the last synced state.
+    `current` is node_id -> row, `state` is node_id -> (row_number, row_hash).
+    Returns (row_number -> row to write, new state). Rows of removed nodes are blanked and reused for new ones.
+    """
+    writes = {}
+    new_state = {}
+    free_rows = []
+    for node_id, (row_number, _) in state.items():
+        if node_id not in current:
+            writes[row_number] = [""] * len(SHEET_HEADERS)
+            free_rows.append(row_number)
+    free_rows.sort(reverse=True)
+    next_row = max((row_number for row_number, _ in state.values()), default=1) + 1
+
+    for node_id in sorted(current):
+        row = current[node_id]
+        row_hash = _row_hash(row)
+        if node_id in state:
+            row_number, old_hash = state[node_id]
+            if row_hash != old_hash:
+                writes[row_number] = row
+        else:
+            if free_rows:
+                row_number = free_rows.pop()
+            else:
+                row_number = next_row
+                next_row += 1
+            writes[row_number] = row
+        new_state[node_id] = (row_number, row_hash)
+    return writes, new_state
+
+
+def group_row_ranges(writes: dict) -> list[tuple[int, list[list[str]]]]:
+    """Merge writes to consecutive rows into contiguous blocks so each becomes a single range."""
+    ranges = []
+    for row_number in sorted(writes):
+        if ranges and ranges[-1][0] + len(ranges[-1][1]) == row_number:
+            ranges[-1][1].append(writes[row_number])
+        else:
+            ranges.append((row_number, [writes[row_number]]))
+    return ranges
+
+
+def _send_in_batches(backend: SheetBackend, ranges) -> int:
+    requests = 0
+    batch, batch_rows = [], 0
+    for start_row, rows in ranges:
+        # Split oversized blocks so no single request exceeds the limit
+        for offset in range(0, len(rows), MAX_ROWS_PER_REQUEST):
+            chunk = rows[offset : offset + MAX_ROWS_PER_REQUEST]
+            if batch and batch_rows + len(chunk) > MAX_ROWS_PER_REQUEST:
+                backend.batch_update(batch)
+                requests += 1
+                batch, batch_rows = [], 0
+            batch.append((start_row + offset, chunk))
+            batch_rows += len(chunk)
+    if batch:
+        backend.batch_update(batch)
+        requests += 1
+    return requests
+
+
+def sync_nodes_to_sheet(conn, backend: SheetBackend, full: bool = False, owner_names: dict = None) -> SheetSyncResult:
+    """
+    Mirror the nodes table into `backend`, sending only the rows that changed since the last sync.
+    The change journal's latest sequence number short-circuits syncs when nothing has been written, so a renamed
+    owner shows up with the next write to the directory (or a full sync). A changed column layout rewrites the sheet.
+    """
+    cursor = conn.cursor()
+    head_seq = execute(cursor, "latest_seq").fetchone()[0]
+    synced = execute(cursor, "journal_meta", ("sheet_synced_seq",)).fetchone()
+    synced_headers = execute(cursor, "journal_meta", ("sheet_headers",)).fetchone()
+    headers = "\t".join(SHEET_HEADERS)
+    if synced_headers is None or synced_headers[0] != headers:
+        full = True
+
+    result = SheetSyncResult()
+    if not full and synced is not None and int(synced[0]) == head_seq:
+        result.skipped = True
+        return result
+
+    state = {node_id: (row_number, row_hash) for node_id, row_number, row_hash in execute(cursor, "sheet_sync_state")}
+    if full or synced is None:
+        # First sync (or forced): start from an empty sheet and rewrite everything
+        state = {}
+        result.full_resync = True
+
+    current = {row[0]: node_to_sheet_row(*row, owner_names) for row in execute(cursor, "sheet_rows").fetchall()}
+
+    writes, new_state = compute_sheet_diff(current, state)
+    removed_ids = [node_id for node_id in state if node_id not in current]
+    dirty_state = [(node_id, entry) for node_id, entry in new_state.items() if state.get(node_id) != entry]
+    result.removed = len(removed_ids)
+    result.added = sum(1 for node_id in current if node_id not in state)
+    result.changed = len(dirty_state) - result.added
+
+    if result.full_resync:
+        backend.clear()
+        result.requests += 1
+        writes[1] = SHEET_HEADERS
+    ranges = group_row_ranges(writes)
+    result.ranges = [(start_row, len(rows)) for start_row, rows in ranges]
+    if ranges:
+        result.requests += _send_in_batches(backend, ranges)
+
+    # Only record the new state once the sheet has accepted every update
+    if result.full_resync:
+        execute(cursor, "clear_sheet_sync_state")
+    execute_many(cursor, "delete_sheet_sync_state", [(node_id,) for node_id in removed_ids])
+    execute_many(
+        cursor,
+        "upsert_sheet_sync_state",
+        [(node_id, row_number, row_hash) for node_id, (row_number, row_hash) in dirty_state],
+    )
+    execute(cursor, "set_journal_meta", ("sheet_synced_seq", str(head_seq)))
+    execute(cursor, "set_journal_meta", ("sheet_headers", headers))
+    conn.commit()
+    return result
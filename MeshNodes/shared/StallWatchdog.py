@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import linecache
+from collections import deque
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# How often the loop checks in, and how long past that it may be late before it counts as stalled
+TICK_INTERVAL = 0.1
+DEFAULT_THRESHOLD_MS = 250
+STALL_HISTORY = 50
+MAX_STACK_FRAMES = 12
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class Stall:
+    at: float  # wall clock time the stall started
+    duration: float  # seconds the loop was blocked
+    entry: str = "unknown"  # command, listener or task that was running, if the stack showed one
+    site: str = ""  # innermost cog frame, usually the blocking call
+    stack: list = field(default_factory=list)  # (filename, line number, function) frames, outermost first
+
+
+class StallWatchdog:
+    """
+    Opt-in event loop lag monitor. A ticker on the loop checks in every TICK_INTERVAL; a watcher thread notices
+    when a check-in is overdue by more than the threshold and, while the loop is still blocked, captures the loop
+    thread's stack. When the loop gets going again the ticker records the stall, how long it took and which
+    command it happened in, in a ring buffer for !stalls.
+    """
+
+    def __init__(self, entry_points: dict, threshold_ms: int = DEFAULT_THRESHOLD_MS, history: int = STALL_HISTORY):
+        self.entry_points = entry_points  # code object -> label, for attributing stalls to commands
+        self.threshold = threshold_ms / 1000
+        self.stalls = deque(maxlen=history)
+        self.max_lag = 0.0
+        self.last_tick = time.monotonic()
+        self._captured = None  # (tick, stack) captured by the watcher for the stall in progress
+        self._ticker = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self._loop_thread_id = None
+
+    @property
+    def running(self) -> bool:
+        return self._ticker is not None and not self._ticker.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self.last_tick = time.monotonic()
+        self._ticker = asyncio.get_running_loop().create_task(self._tick())
+        self._watcher = threading.Thread(target=self._watch, name="MeshNodes stall watchdog", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+
+    async def _tick(self):
+        while True:
+            tick = time.monotonic()
+            self.last_tick = tick
+            await asyncio.sleep(TICK_INTERVAL)
+            lag = time.monotonic() - tick - TICK_INTERVAL
+            self.max_lag = max(self.max_lag, lag)
+            if lag < self.threshold:
+                continue
+            captured, self._captured = self._captured, None
+            stall = Stall(at=time.time() - lag, duration=lag)
+            if captured is not None and captured[0] == tick:
+                stall.entry, stall.site, stall.stack = self._attribute(captured[1])
+            self.stalls.append(stall)
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms in {stall.entry} at {stall.site or 'unknown'}")
+
+    def _watch(self):
+        # Checks a few times per threshold, so the stack is captured well before a typical stall ends
+        while not self._stop.wait(min(self.threshold / 4, TICK_INTERVAL)):
+            tick = self.last_tick
+            if time.monotonic() - tick < TICK_INTERVAL + self.threshold:
+                continue
+            if self._captured is not None and self._captured[0] == tick:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            # Code objects are kept (not the frames), so nothing of the blocked call outlives the stall
+            self._captured = (tick, [(f.f_code, f.f_lineno) for f in reversed(frames)])
+
+    def _attribute(self, frames):
+        """(entry, site, stack) for frames captured outermost first."""
+        entry_index = next((i for i, (code, _) in enumerate(frames) if code in self.entry_points), None)
+        entry = self.entry_points[frames[entry_index][0]] if entry_index is not None else "unknown"
+        stack = [(code.co_filename, line, code.co_name) for code, line in frames[entry_index or 0 :]]
+        ours = [frame for frame in stack if frame[0].startswith(PACKAGE_DIR)]
+        site = format_frame(ours[-1]) if ours else ""
+        return entry, site, stack[-MAX_STACK_FRAMES:]
+
+
+def format_frame(frame) -> str:
+    filename, line, name = frame
+    if filename.startswith(PACKAGE_DIR):
+        filename = os.path.relpath(filename, PACKAGE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{line} in {name}"
+
+
+def format_stack(stall: Stall) -> str:
+    """The captured stack, innermost frame last, with each frame's source line."""
+    lines = []
+    for frame in stall.stack:
+        lines.append(format_frame(frame))
+        source = linecache.getline(frame[0], frame[1]).strip()
+        if source:
+            lines.append(f"    {source}")
+    return "\n".join(lines)
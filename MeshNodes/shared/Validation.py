@@ -0,0 +1,200 @@
+"""
+Validators compiled from the AdditionalInfoQuestion definitions.
+
+Each question becomes a closure that takes a raw answer (a CSV cell, modal text or select value) and returns the
+typed value to store, None for a blank answer, or raises ValueError with a message for the user. The interactive
+questionnaire and !importnodes share them, so imported rows hold the same canonical values as answered ones.
+"""
+
+import re
+from typing import Any, Callable
+
+from MeshNodes.shared.ParsingTools import parse_csv_string
+from MeshNodes.shared.AdditionalNodeInfo import (
+    AdditionalInfoQuestion,
+    StringQuestion,
+    BooleanQuestion,
+    NumberQuestion,
+    ChoiceQuestion,
+    additional_info_questions,
+)
+
+TRUE_VALUES = frozenset({"yes", "y", "true", "t", "1", "on"})
+FALSE_VALUES = frozenset({"no", "n", "false", "f", "0", "off"})
+
+# Core node fields, with the same limits as the registration modal
+NODE_ID_PATTERN = re.compile(r"^[0-9A-F]{8}$")
+SHORT_NAME_MAX_LENGTH = 4
+LONG_NAME_MAX_LENGTH = 64
+CORE_FIELDS = ("node_id", "discord_id", "short_name", "long_name")
+
+Validator = Callable[[Any], Any]
+
+
+def _compile_string(q: StringQuestion) -> Validator:
+    min_length, max_length = q.min_length, q.max_length
+    message = f"must be {min_length}-{max_length} characters"
+    pattern = re.compile(q.pattern) if q.pattern else None
+    pattern_message = f"must be {q.format_hint or 'in the expected format'}"
+
+    def validate(value):
+        value = str(value).strip()
+        if not value:
+            return None
+        if not min_length <= len(value) <= max_length:
+            raise ValueError(message)
+        if pattern is not None and not pattern.fullmatch(value):
+            raise ValueError(pattern_message)
+        return value
+
+    return validate
+
+
+def _compile_boolean(q: BooleanQuestion) -> Validator:
+    def validate(value):
+        if isinstance(value, bool):
+            return value
+        value = str(value).strip().lower()
+        if not value:
+            return None
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        raise ValueError("must be yes or no")
+
+    return validate
+
+
+def _compile_number(q: NumberQuestion) -> Validator:
+    min_value, max_value = q.min_value, q.max_value
+    message = f"must be a number from {min_value} to {max_value}"
+
+    def validate(value):
+        if isinstance(value, bool):
+            raise ValueError(message)
+        if isinstance(value, int):
+            number = value
+        else:
+            value = str(value).strip()
+            if not value:
+                return None
+            try:
+                number = int(value)
+            except ValueError:
+                raise ValueError(message) from None
+        if not min_value <= number <= max_value:
+            raise ValueError(message)
+        return number
+
+    return validate
+
+
+def _compile_choice(q: ChoiceQuestion) -> Validator:
+    # Matching is case-insensitive, but the stored value is always the canonical spelling
+    canonical = {choice.casefold(): choice for choice in q.choices}
+    message = f"must be one of: {', '.join(q.choices)}"
+
+    def validate(value):
+        value = str(value).strip()
+        if not value:
+            return None
+        try:
+            return canonical[value.casefold()]
+        except KeyError:
+            raise ValueError(message) from None
+
+    return validate
+
+
+_COMPILERS = {
+    StringQuestion: _compile_string,
+    BooleanQuestion: _compile_boolean,
+    NumberQuestion: _compile_number,
+    ChoiceQuestion: _compile_choice,
+}
+
+
+def compile_validator(q: AdditionalInfoQuestion) -> Validator:
+    return _COMPILERS[type(q)](q)
+
+
+def compile_validators(questions: list[AdditionalInfoQuestion]) -> dict[str, Validator]:
+    return {q.json_name: compile_validator(q) for q in questions}
+
+
+VALIDATORS = compile_validators(additional_info_questions)
+HUMAN_NAMES = {q.json_name: q.human_name for q in additional_info_questions}
+
+
+def validate_answers(data: dict, validators: dict[str, Validator] = VALIDATORS) -> tuple[dict, list[str]]:
+    """
+    Validate and coerce answers to known questions; unknown keys and blank answers are dropped.
+    Returns (clean answers, error messages).
+    """
+    clean = {}
+    errors = []
+    for json_name, value in data.items():
+        validate = validators.get(json_name)
+        if validate is None or value is None:
+            continue
+        try:
+            value = validate(value)
+        except ValueError as e:
+            errors.append(f"{HUMAN_NAMES.get(json_name, json_name)}: {e}")
+            continue
+        if value is not None:
+            clean[json_name] = value
+    return clean, errors
+
+
+def validate_core_fields(entry: dict) -> tuple[tuple, list[str]]:
+    """Normalize node_id/discord_id/short_name/long_name from an import row. Returns (values, error messages)."""
+    node_id = entry.get("node_id", "").strip().lstrip("!").upper()
+    discord_id = entry.get("discord_id", "").strip()
+    short_name = entry.get("short_name", "").strip()
+    long_name = entry.get("long_name", "").strip()
+
+    errors = []
+    if not NODE_ID_PATTERN.match(node_id):
+        errors.append(f"Node ID: `{node_id}` is not 8 hex characters")
+    if not discord_id.isdigit():
+        errors.append("Discord ID: must be a numeric user ID")
+    if not 1 <= len(short_name) <= SHORT_NAME_MAX_LENGTH:
+        errors.append(f"Short Name: must be 1-{SHORT_NAME_MAX_LENGTH} characters")
+    if not 1 <= len(long_name) <= LONG_NAME_MAX_LENGTH:
+        errors.append(f"Long Name: must be 1-{LONG_NAME_MAX_LENGTH} characters")
+    return (node_id, int(discord_id) if discord_id.isdigit() else discord_id, short_name, long_name), errors
+
+
+def validate_import_rows(
+    rows: list[dict], validators: dict[str, Validator] = VALIDATORS, first_row_number: int = 2
+) -> tuple[list[tuple], list[tuple[int, list[str]]]]:
+    """
+    Validate parsed CSV rows in one pass against a guild's validators.
+    Returns (valid rows as (node_id, discord_id, short_name, long_name, answers), [(row number, errors)]).
+    """
+    valid = []
+    invalid = []
+    for row_number, entry in enumerate(rows, start=first_row_number):
+        core, errors = validate_core_fields(entry)
+        answers, answer_errors = validate_answers({k: v for k, v in entry.items() if k not in CORE_FIELDS}, validators)
+        errors.extend(answer_errors)
+        if errors:
+            invalid.append((row_number, errors))
+        else:
+            valid.append((*core, answers))
+    return valid, invalid
+
+
+def validate_csv_chunk(header: str, chunk: str, first_record: int, questions: list[AdditionalInfoQuestion]):
+    """
+    Worker-process entry point for !importnodes: parse and validate one chunk of records from split_csv_records,
+    so each worker only receives and parses its own share of the file.
+    Validators are closures, so they are compiled here from the (picklable) questions.
+    Returns (rows in the chunk, valid rows, invalid rows) like validate_import_rows.
+    """
+    first_row_number = first_record + 2
+    rows = parse_csv_string(f"{header}\n{chunk}", first_row_number)
+    valid, invalid = validate_import_rows(rows, compile_validators(questions), first_row_number)
+    return len(rows), valid, invalid